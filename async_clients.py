@@ -0,0 +1,212 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+import httpx
+from github_client import GitHubClient
+from issue_table import IssueRow, IssueTable, build_issue_table
+from models import Card
+from profiling import StageProfiler
+from project_client import (
+    ADD_ITEM_MUTATION,
+    PROJECT_ITEMS_QUERY,
+    GitHubProjectClient,
+    parse_project_items_page
+)
+from rate_limit import GRAPHQL, REQUEST_TIMEOUT_S, RateLimitGovernor, get_governor
+
+
+# Requisições simultâneas por serviço no event loop (as escritas no GitHub continuam
+# espaçadas pelo intervalo mínimo do RateLimitGovernor)
+GITHUB_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", "4"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "2"))
+
+# Status e Área num único request (duas mutations com alias), em vez de uma escrita por campo
+UPDATE_STATUS_AND_AREA_MUTATION = """
+mutation($projectId: ID!, $itemId: ID!, $statusFieldId: ID!, $statusOptionId: String!, $areaFieldId: ID!, $areaOptionId: String!) {
+    status: updateProjectV2ItemFieldValue(input: {
+        projectId: $projectId
+        itemId: $itemId
+        fieldId: $statusFieldId
+        value: { singleSelectOptionId: $statusOptionId }
+    }) {
+        projectV2Item { id }
+    }
+    area: updateProjectV2ItemFieldValue(input: {
+        projectId: $projectId
+        itemId: $itemId
+        fieldId: $areaFieldId
+        value: { singleSelectOptionId: $areaOptionId }
+    }) {
+        projectV2Item { id }
+    }
+}
+"""
+
+
+class ServiceLimiters:
+    """Semáforos por serviço, compartilhados por todas as tarefas do event loop."""
+
+    def __init__(self, github: int = GITHUB_CONCURRENCY, gemini: int = GEMINI_CONCURRENCY):
+        self.github = asyncio.Semaphore(max(github, 1))
+        self.gemini = asyncio.Semaphore(max(gemini, 1))
+
+
+class AsyncGitHubSession:
+    """
+    Um único `httpx.AsyncClient` para as chamadas ao GitHub, com o orçamento e as novas
+    tentativas do RateLimitGovernor e o limite de concorrência do serviço.
+    """
+
+    def __init__(self, limiter: asyncio.Semaphore, governor: Optional[RateLimitGovernor] = None):
+        self.limiter = limiter
+        self.governor = governor or get_governor()
+        self.client = httpx.AsyncClient(timeout=REQUEST_TIMEOUT_S)
+
+    async def request(self, method: str, url: str, bucket: str, **kwargs) -> httpx.Response:
+        async with self.limiter:
+            return await self.governor.request_async(self.client, method, url, bucket, **kwargs)
+
+    async def post_graphql(self, url: str, query: str, variables: dict, headers: dict) -> httpx.Response:
+        return await self.request("POST", url, GRAPHQL, json={"query": query, "variables": variables}, headers=headers)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class AsyncProjectClient:
+    """Variante assíncrona das operações do GitHubProjectClient usadas no pipeline."""
+
+    def __init__(self, client: GitHubProjectClient, session: AsyncGitHubSession):
+        self.client = client
+        self.session = session
+
+    async def _graphql(self, query: str, variables: dict) -> dict:
+        response = await self.session.post_graphql(self.client.graphql_url, query, variables, self.client.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def list_existing_project_issues(self) -> IssueTable:
+        """
+        Lista as issues já presentes no Project (mesma IssueTable da versão síncrona).
+        Com GITHUB_PROJECT_NUMBER a leitura REST com cache condicional (SQLite) roda numa
+        thread; senão as páginas GraphQL são lidas no event loop.
+        """
+        if self.client.project_number:
+            return await asyncio.to_thread(self.client.list_existing_project_issues)
+
+        rows: List[IssueRow] = []
+        cursor = None
+        try:
+            while True:
+                data = await self._graphql(PROJECT_ITEMS_QUERY, {
+                    "projectId": self.client.project_id,
+                    "first": 100,
+                    "after": cursor
+                })
+                page, cursor = parse_project_items_page(data)
+                if page is None:
+                    break
+                rows.extend(page)
+                if not cursor:
+                    break
+        except Exception as e:
+            print(f"Aviso: não foi possível listar issues do Project: {e}")
+        return build_issue_table(rows, cache_key=self.client.project_id)
+
+    async def add_issue_to_project(self, issue_number: str, card: Card, issue_id: Optional[str] = None) -> bool:
+        """
+        Adiciona a issue ao Project e define Status=Backlog e a Área numa segunda requisição.
+
+        Returns:
+            True se bem-sucedido, False caso contrário
+        """
+        client = self.client
+        if not issue_id:
+            issue_id = await asyncio.to_thread(client.get_project_item_id, issue_number)
+        if not issue_id:
+            print(f"Não foi possível obter ID da issue #{issue_number}")
+            return False
+
+        try:
+            add_data = await self._graphql(ADD_ITEM_MUTATION, {"projectId": client.project_id, "contentId": issue_id})
+            if "errors" in add_data:
+                print(f"Erro GraphQL ao adicionar issue #{issue_number} ao Project: {add_data['errors']}")
+                return False
+            item_id = (((add_data.get("data") or {}).get("addProjectV2ItemById") or {}).get("item") or {}).get("id")
+            if not item_id:
+                print(f"Erro: não foi possível obter ID do item do Project para issue #{issue_number}")
+                return False
+
+            area_option_id = client.area_frontend_option_id if card.type.value == "Front-End" else client.area_backend_option_id
+            fields_data = await self._graphql(UPDATE_STATUS_AND_AREA_MUTATION, {
+                "projectId": client.project_id,
+                "itemId": item_id,
+                "statusFieldId": client.status_field_id,
+                "statusOptionId": client.status_backlog_option_id,
+                "areaFieldId": client.area_field_id,
+                "areaOptionId": area_option_id
+            })
+            if "errors" in fields_data:
+                print(f"Aviso: erro ao atualizar status/área da issue #{issue_number}: {fields_data['errors']}")
+
+            print(f"Issue #{issue_number} adicionada ao Project com Status='Backlog' e Area='{card.type.value}'")
+            return True
+        except Exception as e:
+            print(f"Erro ao adicionar issue #{issue_number} ao Project: {e}")
+            return False
+
+
+async def create_and_add_issues(
+    github: GitHubClient,
+    project: AsyncProjectClient,
+    cards: List[Card],
+    profiler: Optional[StageProfiler] = None
+) -> Tuple[List[str], int]:
+    """
+    ETAPAS 4 e 5 em pipeline: as issues são criadas em lote pelo GraphQL (`create_issues_bulk`,
+    numa thread) e as de cada lote são adicionadas ao Project assim que o lote é confirmado,
+    enquanto os próximos lotes ainda estão sendo criados.
+
+    A criação não passa pelo AsyncGitHubSession de propósito: ela roda a mesma implementação
+    síncrona (requests) do `publish`, com a consulta das issues de um lote que falhou antes
+    de recriá-las e a referência ao pai, em vez de uma segunda cópia dessa lógica que
+    precisaria ser mantida igual. Como são escritas sequenciais espaçadas pelo
+    RateLimitGovernor (o mesmo, compartilhado com a sessão assíncrona), a thread não limita a
+    vazão; só as chamadas ao Project, que correm em paralelo, usam o httpx.
+
+    Args:
+        profiler: Quando informado, a criação em lote é perfilada dentro da sua thread
+            (etapa "etapa4-criacao-issues") e as adições ao Project no event loop
+            (etapa "etapa5-adicao-project")
+
+    Returns:
+        (números das issues criadas, quantidade adicionada ao Project)
+    """
+    loop = asyncio.get_running_loop()
+    tasks: List[asyncio.Task] = []
+
+    def schedule(index: int, number: str) -> None:
+        issue_id = github.issue_node_ids.get(number)
+        tasks.append(asyncio.create_task(project.add_issue_to_project(number, cards[index], issue_id=issue_id)))
+
+    def on_created(index: int, number: str) -> None:
+        # Chamado na thread da criação em lote; a tarefa é criada no event loop
+        loop.call_soon_threadsafe(schedule, index, number)
+
+    print(f"\nCriando {len(cards)} issues no GitHub e adicionando ao Project conforme são criadas...")
+    profiler = profiler or StageProfiler()
+    with profiler.stage("etapa5-adicao-project"):
+        numbers, uncertain = await asyncio.to_thread(
+            profiler.run, "etapa4-criacao-issues", github.create_issues_bulk, cards, on_created=on_created
+        )
+        # Os agendamentos feitos pela thread entram no loop antes do resultado de to_thread
+        added = sum(1 for ok in await asyncio.gather(*tasks) if ok)
+    created = [n for n in numbers if n]
+    print(f"\nTotal de issues criadas: {len(created)}")
+    print(f"Total de issues adicionadas ao Project: {added}/{len(created)}")
+    if uncertain:
+        print(
+            f"Aviso: {len(uncertain)} issue(s) com criação incerta; confira o repositório antes de "
+            "executar novamente: " + ", ".join(f'"{cards[i].title}"' for i in uncertain)
+        )
+    return created, added
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from local_cache import cache_dir
+from models import Card
+
+
+BATCH_POLL_INTERVAL_S = 30
+BATCH_TIMEOUT_S = 24 * 3600
+
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+PENDING = "PENDING"
+
+
+@dataclass
+class BatchRequest:
+    key: str      # identifica o documento de origem
+    prompt: str
+
+
+@dataclass
+class BatchResult:
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchBackend(ABC):
+    """
+    Interface de um serviço de predição em lote.
+    Implementações: GeminiBatchBackend (API de batch do Gemini) e LocalBatchBackend (offline).
+    """
+
+    @abstractmethod
+    def submit(self, model: str, requests: List[BatchRequest]) -> str:
+        """Envia as requisições como um único job e retorna o identificador do job."""
+
+    @abstractmethod
+    def status(self, job_id: str) -> str:
+        """Retorna SUCCEEDED, FAILED ou PENDING (ainda na fila ou executando)."""
+
+    @abstractmethod
+    def results(self, job_id: str, requests: List[BatchRequest]) -> Dict[str, BatchResult]:
+        """Retorna o resultado de cada requisição, indexado pela chave."""
+
+
+class GeminiBatchBackend(BatchBackend):
+    """Usa `client.batches` do google-genai com requisições inline (respostas na mesma ordem do envio)."""
+
+    _STATES = {
+        "JOB_STATE_SUCCEEDED": SUCCEEDED,
+        "JOB_STATE_FAILED": FAILED,
+        "JOB_STATE_CANCELLED": FAILED,
+        "JOB_STATE_EXPIRED": FAILED
+    }
+
+    def __init__(self, client, generation_config=None):
+        self.client = client
+        self.generation_config = generation_config  # GenerateContentConfig aplicado a cada requisição
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> str:
+        src = [{
+            "contents": [{"role": "user", "parts": [{"text": r.prompt}]}],
+            "config": self.generation_config
+        } for r in requests]
+        job = self.client.batches.create(
+            model=model,
+            src=src,
+            config={"display_name": f"card-creator-{time.strftime('%Y%m%d-%H%M%S')}"}
+        )
+        return job.name
+
+    def status(self, job_id: str) -> str:
+        job = self.client.batches.get(name=job_id)
+        state = getattr(job.state, "name", str(job.state))
+        return self._STATES.get(state, PENDING)
+
+    def results(self, job_id: str, requests: List[BatchRequest]) -> Dict[str, BatchResult]:
+        job = self.client.batches.get(name=job_id)
+        responses = list(getattr(job.dest, "inlined_responses", None) or [])
+        results = {}
+        for request, item in zip(requests, responses):
+            # Um documento com erro (ou sem resposta) falha sozinho, sem derrubar o lote
+            error = getattr(item, "error", None)
+            response = getattr(item, "response", None)
+            if error or response is None:
+                results[request.key] = BatchResult(error=str(error or "resposta vazia no resultado do job"))
+                continue
+            try:
+                text = response.text
+            except Exception as e:
+                results[request.key] = BatchResult(error=f"resposta ilegível: {e}")
+                continue
+            if text is None:
+                results[request.key] = BatchResult(error="resposta sem texto (ex.: bloqueada pelo filtro de segurança)")
+            else:
+                results[request.key] = BatchResult(text=text)
+        for request in requests[len(responses):]:
+            results[request.key] = BatchResult(error="sem resposta no resultado do job")
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    Substituto local para testes offline: executa `respond(model, prompt)` para cada requisição
+    ao enviar o job. Exceções viram erros individuais, como na API real.
+    """
+
+    def __init__(self, respond: Callable[[str, str], str]):
+        self.respond = respond
+        self.jobs: Dict[str, Dict[str, BatchResult]] = {}
+
+    def submit(self, model: str, requests: List[BatchRequest]) -> str:
+        job_id = f"local-{len(self.jobs) + 1}"
+        results = {}
+        for request in requests:
+            try:
+                results[request.key] = BatchResult(text=self.respond(model, request.prompt))
+            except Exception as e:
+                results[request.key] = BatchResult(error=str(e))
+        self.jobs[job_id] = results
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        return SUCCEEDED if job_id in self.jobs else FAILED
+
+    def results(self, job_id: str, requests: List[BatchRequest]) -> Dict[str, BatchResult]:
+        return self.jobs.get(job_id, {})
+
+
+def _job_state_path(model: str, requests: List[BatchRequest]):
+    h = hashlib.sha256(model.encode("utf-8"))
+    for request in requests:
+        h.update(request.key.encode("utf-8") + b"\x00" + request.prompt.encode("utf-8"))
+    return cache_dir("batches") / f"{h.hexdigest()[:24]}.json"
+
+
+def run_batch(
+    backend: BatchBackend,
+    model: str,
+    requests: List[BatchRequest],
+    poll_interval_s: float = BATCH_POLL_INTERVAL_S,
+    timeout_s: float = BATCH_TIMEOUT_S,
+    sleep: Callable[[float], None] = time.sleep
+) -> Dict[str, BatchResult]:
+    """
+    Envia as requisições como um job, aguarda a conclusão e retorna os resultados por chave.
+    O identificador do job fica registrado no cache local: rodar de novo com as mesmas
+    requisições retoma o job em vez de enviá-lo outra vez.
+    """
+    state_path = _job_state_path(model, requests)
+    job_id = None
+    if state_path.exists():
+        try:
+            job_id = json.loads(state_path.read_text(encoding="utf-8")).get("job_id")
+            print(f"Retomando job em lote {job_id}")
+        except (OSError, ValueError):
+            job_id = None
+
+    if job_id is None or backend.status(job_id) == FAILED:
+        job_id = backend.submit(model, requests)
+        state_path.write_text(json.dumps({
+            "job_id": job_id,
+            "model": model,
+            "keys": [r.key for r in requests],
+            "submitted_at": time.time()
+        }, indent=2), encoding="utf-8")
+        print(f"Job em lote enviado: {job_id} ({len(requests)} documentos, modelo {model})")
+
+    started = time.monotonic()
+    while True:
+        state = backend.status(job_id)
+        if state == SUCCEEDED:
+            break
+        if state == FAILED:
+            state_path.unlink(missing_ok=True)
+            raise RuntimeError(f"Job em lote {job_id} falhou")
+        if time.monotonic() - started > timeout_s:
+            raise TimeoutError(f"Job em lote {job_id} não terminou em {timeout_s:.0f}s (rode de novo para retomar)")
+        print(f"Job em lote {job_id} em andamento; nova verificação em {poll_interval_s:.0f}s...")
+        sleep(poll_interval_s)
+
+    results = backend.results(job_id, requests)
+    state_path.unlink(missing_ok=True)
+    return results
+
+
+def generate_cards_batch(
+    prompts: List[Tuple[str, str]],
+    backend: BatchBackend,
+    model: str,
+    parse: Callable[[str], List[Card]],
+    poll_interval_s: float = BATCH_POLL_INTERVAL_S
+) -> Dict[str, Optional[List[Card]]]:
+    """
+    Gera cards para vários documentos num único job em lote.
+
+    Args:
+        prompts: Lista de (chave do documento, prompt completo)
+        backend: Serviço de lote (Gemini ou local)
+        model: Modelo usado no job
+        parse: Converte o texto de resposta em cards
+
+    Returns:
+        Cards de cada documento, por chave (None para documentos cuja geração falhou)
+    """
+    requests = [BatchRequest(key=key, prompt=prompt) for key, prompt in prompts]
+    if not requests:
+        return {}
+
+    results = run_batch(backend, model, requests, poll_interval_s=poll_interval_s)
+
+    cards_by_key: Dict[str, Optional[List[Card]]] = {}
+    for request in requests:
+        result = results.get(request.key) or BatchResult(error="sem resultado")
+        if result.error:
+            print(f"Erro no lote para {request.key}: {result.error}")
+            cards_by_key[request.key] = None
+            continue
+        print(f"\nResultado do lote: {request.key}")
+        try:
+            cards_by_key[request.key] = parse(result.text)
+        except ValueError as e:
+            print(f"Erro ao interpretar a resposta para {request.key}: {e}")
+            cards_by_key[request.key] = None
+    return cards_by_key
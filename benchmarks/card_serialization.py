@@ -0,0 +1,141 @@
+"""
+Microbenchmark da serialização de cards: implementação por card (`to_dict`/`from_dict` +
+`json.dumps`/`json.loads` por linha, sobre um dataclass sem slots, como era antes) contra
+o Card com slots e `encode_cards_jsonl`/`decode_cards_jsonl`.
+
+Uso:
+    python -m benchmarks.card_serialization [--cards 20000] [--repeat 5]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional
+
+from models import Card, CardType, decode_cards_jsonl, encode_cards_jsonl
+
+
+@dataclass
+class DictCard:
+    """Card sem slots, com a serialização por card da implementação anterior."""
+    title: str
+    description: str
+    type: CardType
+    acceptance_criteria: List[str]
+    parent_index: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        d = {
+            "title": self.title,
+            "description": self.description,
+            "type": self.type.value,
+            "acceptance_criteria": self.acceptance_criteria
+        }
+        if self.parent_index is not None:
+            d["parent_index"] = self.parent_index
+        return d
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DictCard":
+        raw_parent = data.get("parent_index")
+        parent_index = None
+        if raw_parent is not None:
+            try:
+                parent_index = int(raw_parent)
+            except (TypeError, ValueError):
+                parent_index = None
+        return cls(
+            title=data["title"],
+            description=data["description"],
+            type=CardType(data["type"]),
+            acceptance_criteria=data.get("acceptance_criteria", []),
+            parent_index=parent_index
+        )
+
+
+def legacy_encode(cards: List[DictCard]) -> str:
+    return "".join(json.dumps(card.to_dict(), ensure_ascii=False) + "\n" for card in cards)
+
+
+def legacy_decode(lines) -> List[DictCard]:
+    return [DictCard.from_dict(json.loads(line)) for line in lines if line.strip()]
+
+
+def sample_cards(count: int, cls=Card) -> list:
+    cards = []
+    for i in range(count):
+        parent = i - 1 if i % 4 else None
+        cards.append(cls(
+            title=f"Implementar regra de negócio nº {i} — validação de cadastro",
+            description=(
+                f"Como usuário, quero que o sistema valide o cadastro {i} para evitar dados inconsistentes. "
+                "Inclui mensagens de erro e integração com a API de clientes."
+            ),
+            type=CardType.BACKEND if i % 2 else CardType.FRONTEND,
+            acceptance_criteria=[f"Critério {j} do card {i}" for j in range(4)],
+            parent_index=parent
+        ))
+    return cards
+
+
+def _best(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _peak_bytes(fn) -> int:
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark da serialização de cards em JSONL")
+    parser.add_argument("--cards", type=int, default=20000, help="Quantidade de cards")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições (vale o menor tempo)")
+    args = parser.parse_args(argv)
+
+    legacy_cards = sample_cards(args.cards, DictCard)
+    cards = sample_cards(args.cards)
+
+    legacy_text = legacy_encode(legacy_cards)
+    text = encode_cards_jsonl(cards)
+    if text != legacy_text or decode_cards_jsonl(text.splitlines(True)) != cards:
+        print("Erro: as duas implementações não produzem o mesmo JSONL", file=sys.stderr)
+        sys.exit(1)
+    lines = text.splitlines(True)
+
+    rows = [
+        ("encode", _best(lambda: legacy_encode(legacy_cards), args.repeat), _best(lambda: encode_cards_jsonl(cards), args.repeat)),
+        ("decode", _best(lambda: legacy_decode(lines), args.repeat), _best(lambda: decode_cards_jsonl(lines), args.repeat)),
+    ]
+    memory = (
+        _peak_bytes(lambda: legacy_decode(lines)),
+        _peak_bytes(lambda: decode_cards_jsonl(lines))
+    )
+    instance = (
+        sys.getsizeof(legacy_cards[0]) + sys.getsizeof(legacy_cards[0].__dict__),
+        sys.getsizeof(cards[0])
+    )
+
+    print(f"{args.cards} cards, {len(text) / 1024 / 1024:.1f} MiB de JSONL, melhor de {args.repeat}\n")
+    print(f"{'operação':<10} {'anterior':>12} {'slots+lote':>12} {'speedup':>8}")
+    for name, legacy, current in rows:
+        print(f"{name:<10} {legacy * 1000:>10.1f}ms {current * 1000:>10.1f}ms {legacy / current:>7.2f}x")
+    print(f"{'pico dec.':<10} {memory[0] / 1024 / 1024:>9.1f}MiB {memory[1] / 1024 / 1024:>9.1f}MiB {memory[0] / memory[1]:>7.2f}x")
+    print(f"{'instância':<10} {instance[0]:>11}B {instance[1]:>11}B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compara os backends de extração de PDF em velocidade e fidelidade.
+
+Uso:
+    python -m benchmarks.extractors specs/ [--backends pdfplumber,pypdfium2,hybrid] [--repeat 3] [--json resultado.json]
+
+A fidelidade é medida contra o backend de referência (padrão: pdfplumber):
+  - texto: F1 das palavras (multiconjunto, sem diferenciar maiúsculas)
+  - tabelas: fração das células das tabelas de referência encontradas nas tabelas do backend
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from pdf_reader import EXTRACTORS, get_extractor
+from pipeline import collect_inputs
+
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(pages: List[str]) -> Counter:
+    return Counter(w.lower() for page in pages for w in WORD_RE.findall(page))
+
+
+def text_f1(reference: List[str], candidate: List[str]) -> float:
+    ref, cand = _words(reference), _words(candidate)
+    if not ref and not cand:
+        return 1.0
+    common = sum((ref & cand).values())
+    if not common:
+        return 0.0
+    precision = common / sum(cand.values())
+    recall = common / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def _cells(tables: List[Dict]) -> Counter:
+    cells = Counter()
+    for table in tables:
+        for row in [table.get("headers") or []] + (table.get("rows") or []):
+            for cell in row:
+                value = " ".join(str(cell or "").split()).lower()
+                if value:
+                    cells[value] += 1
+    return cells
+
+
+def table_recall(reference: List[Dict], candidate: List[Dict]) -> float:
+    ref = _cells(reference)
+    if not ref:
+        return 1.0
+    return sum((ref & _cells(candidate)).values()) / sum(ref.values())
+
+
+def run(pdf_paths: List[Path], backends: List[str], reference: str, repeat: int) -> Dict:
+    names = [reference] + [b for b in backends if b != reference]
+    results = {"reference": reference, "documents": []}
+    for pdf_path in pdf_paths:
+        doc = {"pdf": str(pdf_path), "backends": {}}
+        outputs = {}
+        for name in names:
+            timings = []
+            for _ in range(repeat):
+                extractor = get_extractor(name)
+                started = time.perf_counter()
+                pages, tables = extractor.extract(str(pdf_path))
+                timings.append(time.perf_counter() - started)
+            outputs[name] = (pages, tables)
+            doc["backends"][name] = {
+                "seconds": min(timings),
+                "pages": len(pages),
+                "chars": sum(len(p) for p in pages),
+                "tables": len(tables)
+            }
+        ref_pages, ref_tables = outputs[reference]
+        for name in names:
+            pages, tables = outputs[name]
+            doc["backends"][name]["text_f1"] = text_f1(ref_pages, pages)
+            doc["backends"][name]["table_recall"] = table_recall(ref_tables, tables)
+        results["documents"].append(doc)
+        print(f"{pdf_path}: " + ", ".join(
+            f"{name} {doc['backends'][name]['seconds'] * 1000:.0f}ms" for name in names
+        ), file=sys.stderr)
+    return results
+
+
+def print_report(results: Dict) -> None:
+    reference = results["reference"]
+    documents = results["documents"]
+    if not documents:
+        print("Nenhum PDF encontrado.")
+        return
+    names = list(documents[0]["backends"])
+    ref_total = sum(d["backends"][reference]["seconds"] for d in documents)
+    pages = sum(d["backends"][reference]["pages"] for d in documents)
+
+    print(f"\n{len(documents)} documento(s), {pages} página(s); referência: {reference}\n")
+    print(f"{'backend':<12} {'tempo (s)':>10} {'págs/s':>8} {'speedup':>8} {'F1 texto':>9} {'F1 mín':>7} {'tabelas':>8} {'células':>8}")
+    for name in names:
+        stats = [d["backends"][name] for d in documents]
+        total = sum(s["seconds"] for s in stats)
+        f1s = [s["text_f1"] for s in stats]
+        print(
+            f"{name:<12} {total:>10.3f} {pages / total if total else 0:>8.1f} "
+            f"{ref_total / total if total else 0:>7.1f}x {sum(f1s) / len(f1s):>9.3f} {min(f1s):>7.3f} "
+            f"{sum(s['tables'] for s in stats):>8} {sum(s['table_recall'] for s in stats) / len(stats):>8.1%}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark e fidelidade dos backends de extração de PDF")
+    parser.add_argument("inputs", nargs="+", help="PDFs ou pastas com PDFs (corpus de especificações)")
+    parser.add_argument("--backends", default=",".join(EXTRACTORS), help="Backends a comparar, separados por vírgula")
+    parser.add_argument("--reference", default="pdfplumber", help="Backend usado como referência de fidelidade")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por documento (vale o menor tempo)")
+    parser.add_argument("--json", type=Path, help="Grava os resultados detalhados em JSON")
+    args = parser.parse_args(argv)
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    for name in backends + [args.reference]:
+        get_extractor(name)  # valida os nomes antes de começar
+
+    results = run(collect_inputs(args.inputs, ".pdf"), backends, args.reference, max(args.repeat, 1))
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResultados detalhados: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
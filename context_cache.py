@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from google.genai import types
+from local_cache import cache_dir
+from model_router import estimate_tokens
+
+
+CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE", "1") not in ("0", "false", "no")
+CONTEXT_CACHE_TTL_S = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_S", "3600"))
+# Abaixo disso o Gemini recusa criar o cache (o mínimo varia por modelo)
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# Renova o TTL quando faltar menos que isso para expirar, em vez de arriscar usar um cache expirado
+REFRESH_MARGIN_S = 120
+# Projeto cujas issues formam o prefixo: execuções de outros projetos não apagam os caches deste
+CONTEXT_CACHE_SCOPE = os.getenv("GITHUB_PROJECT_ID", "")
+
+
+def _prefix_key(model: str, prefix: str) -> str:
+    return hashlib.sha256(f"{model}\x00{prefix}".encode("utf-8")).hexdigest()[:24]
+
+
+class PromptCache:
+    """
+    Mantém o prefixo estático do prompt (instruções, formato de resposta e issues existentes)
+    no cache de contexto do Gemini (cached contents), um por modelo.
+
+    O registro local (nome do cache, hash do prefixo, expiração) é persistido para que
+    execuções seguidas de um lote reaproveitem o mesmo cache. Quando o prefixo muda (ex.:
+    a lista de issues do Project mudou), o cache antigo do modelo é apagado e outro é criado,
+    desde que tenha sido criado por este processo ou para o mesmo Project (`scope`): outra
+    execução sobre outro Project não tem os seus caches apagados, e eles expiram pelo TTL.
+
+    `get` e `invalidate` podem ser chamados de várias threads (`asyncio.to_thread`).
+    """
+
+    def __init__(
+        self,
+        client,
+        registry_path: Optional[Path] = None,
+        ttl_s: int = CONTEXT_CACHE_TTL_S,
+        scope: str = CONTEXT_CACHE_SCOPE
+    ):
+        self.client = client
+        self.ttl_s = ttl_s
+        self.scope = scope
+        self.registry_path = Path(registry_path) if registry_path else cache_dir() / "gemini_context_cache.json"
+        self.registry: Dict[str, dict] = self._load()
+        self.unsupported = set()  # modelos em que a criação falhou nesta execução
+        self.hits = 0
+        self.created = 0
+        self._own: Set[str] = set()  # caches criados por este processo
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.registry_path.exists():
+            return {}
+        try:
+            return json.loads(self.registry_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        # Nome temporário único: outro processo gravando o registro não sobrescreve o arquivo no meio
+        tmp = self.registry_path.with_name(f"{self.registry_path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            tmp.write_text(json.dumps(self.registry, indent=2), encoding="utf-8")
+            tmp.replace(self.registry_path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _replaceable(self, entry: dict) -> bool:
+        """Se o cache de outro prefixo pode ser apagado por este processo."""
+        return entry.get("name") in self._own or bool(self.scope and entry.get("scope") == self.scope)
+
+    def _delete_remote(self, name: str) -> None:
+        try:
+            self.client.caches.delete(name=name)
+        except Exception as e:
+            # Já expirado ou apagado: nada a fazer
+            print(f"Aviso: não foi possível apagar o cache de contexto {name}: {e}")
+
+    def get(self, model: str, prefix: str) -> Optional[str]:
+        """
+        Retorna o nome do cache de contexto com o prefixo para o modelo, criando ou
+        renovando quando necessário.
+
+        Returns:
+            Nome do cached content ou None (prefixo pequeno demais, cache desabilitado ou indisponível)
+        """
+        if not CONTEXT_CACHE_ENABLED or model in self.unsupported:
+            return None
+        if estimate_tokens(prefix) < CONTEXT_CACHE_MIN_TOKENS:
+            return None
+        with self._lock:
+            return self._get(model, prefix)
+
+    def _get(self, model: str, prefix: str) -> Optional[str]:
+        key = _prefix_key(model, prefix)
+        now = time.time()
+        # Relido a cada chamada: outro processo pode ter gravado o registro desde a última
+        self.registry = self._load()
+
+        for other_key, entry in list(self.registry.items()):
+            if other_key == key:
+                continue
+            if entry.get("expire_at", 0) <= now:
+                # Já expirado no Gemini: só sai do registro
+                del self.registry[other_key]
+                self._save()
+            elif entry.get("model") == model and self._replaceable(entry):
+                # Outro prefixo do mesmo modelo e Project significa que as issues existentes mudaram
+                print("Cache de contexto do Gemini: lista de issues mudou; descartando o cache anterior.")
+                self._delete_remote(entry["name"])
+                del self.registry[other_key]
+                self._save()
+
+        entry = self.registry.get(key)
+        if entry and entry.get("expire_at", 0) - now > REFRESH_MARGIN_S:
+            self.hits += 1
+            return entry["name"]
+
+        if entry and entry.get("expire_at", 0) > now:
+            try:
+                self.client.caches.update(
+                    name=entry["name"],
+                    config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_s}s")
+                )
+                entry["expire_at"] = now + self.ttl_s
+                self._save()
+                self.hits += 1
+                return entry["name"]
+            except Exception as e:
+                print(f"Aviso: não foi possível renovar o cache de contexto: {e}")
+
+        if entry:
+            del self.registry[key]
+
+        try:
+            cached = self.client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    display_name=f"card-creator-{key[:8]}",
+                    ttl=f"{self.ttl_s}s"
+                )
+            )
+        except Exception as e:
+            print(f"Aviso: cache de contexto indisponível para {model} ({e}); enviando o prompt completo.")
+            self.unsupported.add(model)
+            self._save()
+            return None
+
+        self.registry[key] = {"name": cached.name, "model": model, "scope": self.scope, "expire_at": now + self.ttl_s}
+        self._own.add(cached.name)
+        self._save()
+        self.created += 1
+        print(f"Cache de contexto do Gemini criado para {model} (~{estimate_tokens(prefix)} tokens, TTL {self.ttl_s}s).")
+        return cached.name
+
+    def invalidate(self, model: str, name: str) -> None:
+        """Descarta um cache que o Gemini não reconheceu mais (ex.: expirou antes do previsto)."""
+        with self._lock:
+            self.registry = self._load()
+            for key, entry in list(self.registry.items()):
+                if entry.get("model") == model and entry.get("name") == name:
+                    del self.registry[key]
+            self._save()
+
+
+class LocalGeminiError(Exception):
+    """Erro do LocalGeminiClient, com `code` HTTP como os erros da API (ex.: 404, 429)."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(part.text or "" for part in getattr(content, "parts", None) or [])
+
+
+class LocalGeminiClient:
+    """
+    Substituto local do cliente do Gemini para testes offline do caminho com cache de contexto
+    (mesmo papel do LocalBatchBackend no modo em lote). Implementa `caches.create/update/delete`
+    e `models.generate_content` (também em `aio`): uma chamada com `cached_content` recebe o
+    prefixo guardado no cache antes do conteúdo, e um cache inexistente ou apagado gera erro
+    404, como na API real.
+
+    `respond(model, prompt)` recebe o prompt completo, como o modelo o veria, e devolve o texto
+    da resposta; exceções (ex.: LocalGeminiError(429, ...)) são repassadas a quem chamou.
+    `calls` registra (modelo, nome do cache ou None) de cada geração.
+    """
+
+    def __init__(self, respond: Callable[[str, str], str]):
+        self.respond = respond
+        self.cached: Dict[str, Tuple[str, str]] = {}  # nome -> (modelo, prefixo)
+        self.created = 0
+        self.calls: List[Tuple[str, Optional[str]]] = []
+        self.caches = SimpleNamespace(create=self._create_cache, update=self._update_cache, delete=self._delete_cache)
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content_async))
+
+    def _create_cache(self, model: str, config) -> SimpleNamespace:
+        self.created += 1
+        name = f"cachedContents/local-{self.created}"
+        self.cached[name] = (model, "".join(_content_text(c) for c in config.contents))
+        return SimpleNamespace(name=name, model=model)
+
+    def _update_cache(self, name: str, config) -> SimpleNamespace:
+        if name not in self.cached:
+            raise LocalGeminiError(404, f"cache {name} não encontrado")
+        return SimpleNamespace(name=name, model=self.cached[name][0])
+
+    def _delete_cache(self, name: str) -> None:
+        if self.cached.pop(name, None) is None:
+            raise LocalGeminiError(404, f"cache {name} não encontrado")
+
+    def _generate_content(self, model: str, contents, config=None) -> SimpleNamespace:
+        cache_name = getattr(config, "cached_content", None)
+        prompt = _content_text(contents)
+        if cache_name:
+            cached_model, prefix = self.cached.get(cache_name, (None, None))
+            if prefix is None or cached_model != model:
+                raise LocalGeminiError(404, f"cache {cache_name} não encontrado para {model}")
+            prompt = prefix + prompt
+        self.calls.append((model, cache_name))
+        return SimpleNamespace(text=self.respond(model, prompt))
+
+    async def _generate_content_async(self, model: str, contents, config=None) -> SimpleNamespace:
+        return self._generate_content(model, contents, config)
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from models import Card
+from issue_table import (
+    IssueTable,
+    _normalize_for_compare,
+    _similar_normalized_description,
+    _similar_normalized_title,
+    normalize_issue
+)
+
+
+@dataclass
+class DedupReport:
+    kept: int = 0
+    merged: int = 0           # duplicatas de outro card do lote, fundidas nele
+    existing: int = 0         # duplicatas de issues já no Project, descartadas
+    orphaned: int = 0         # filhos cujo pai foi descartado e não pôde ser reapontado
+    messages: List[str] = field(default_factory=list)
+
+    def print_summary(self) -> None:
+        for message in self.messages:
+            print(f"  - {message}")
+        print(
+            f"Deduplicação do lote: {self.kept} cards mantidos, {self.merged} fundidos com outro card do lote, "
+            f"{self.existing} já existentes no Project"
+            + (f", {self.orphaned} filhos sem pai" if self.orphaned else "")
+        )
+
+
+@dataclass
+class _Candidate:
+    key: str                  # documento de origem
+    index: int                # posição do card na lista final do documento
+    card: Card
+    norm_title: str
+    norm_body: str            # prefixo normalizado da descrição
+
+
+class CandidateIndex:
+    """
+    Índice de candidatos do lote: issues já existentes no Project e cards já aceitos de
+    todos os documentos processados até agora. Um card novo é duplicata quando título e
+    descrição são similares (mesma regra de `IssueTable.find_similar_normalized`). As
+    comparações recebem título e descrição já normalizados (`normalize_issue`), uma vez por card.
+    """
+
+    def __init__(self, existing_issues: Optional[IssueTable] = None):
+        self.existing = existing_issues if existing_issues is not None else IssueTable()
+        self.candidates: List[_Candidate] = []
+        # Títulos normalizados idênticos resolvem a maioria dos casos sem varrer a lista
+        self._by_title: Dict[str, List[int]] = {}
+
+    def find_existing(self, normalized: Tuple[str, str]) -> Optional[str]:
+        """Título da issue do Project similar ao card, se houver."""
+        position = self.existing.find_similar_normalized(*normalized)
+        return self.existing.titles[position] if position is not None else None
+
+    def find_candidate(self, normalized: Tuple[str, str]) -> Optional[_Candidate]:
+        """Card já aceito no lote similar ao card, se houver."""
+        norm_title, norm_body = normalized
+        for position in self._by_title.get(norm_title, ()):
+            candidate = self.candidates[position]
+            if _similar_normalized_description(candidate.norm_body, norm_body):
+                return candidate
+        for candidate in self.candidates:
+            if _similar_normalized_title(candidate.norm_title, norm_title) \
+                    and _similar_normalized_description(candidate.norm_body, norm_body):
+                return candidate
+        return None
+
+    def add(self, key: str, index: int, card: Card, normalized: Tuple[str, str]) -> None:
+        norm_title, norm_body = normalized
+        self._by_title.setdefault(norm_title, []).append(len(self.candidates))
+        self.candidates.append(_Candidate(key=key, index=index, card=card, norm_title=norm_title, norm_body=norm_body))
+
+
+def _merge_into(target: Card, duplicate: Card) -> None:
+    """Une os critérios de aceite da duplicata no card mantido (sem repetir critérios)."""
+    seen = {_normalize_for_compare(c) for c in target.acceptance_criteria}
+    for criterion in duplicate.acceptance_criteria:
+        normalized = _normalize_for_compare(criterion)
+        if normalized not in seen:
+            seen.add(normalized)
+            target.acceptance_criteria.append(criterion)
+
+
+def dedupe_batch(
+    documents: List[Tuple[str, List[Card]]],
+    existing_issues: Optional[IssueTable] = None
+) -> Tuple[Dict[str, List[Card]], DedupReport]:
+    """
+    Remove duplicatas entre os cards de todos os documentos de um lote e em relação às
+    issues já existentes no Project, antes de qualquer issue ser criada.
+
+    - Duplicata de issue do Project: descartada
+    - Duplicata de card de outro (ou do mesmo) documento do lote: fundida no primeiro
+      (critérios de aceite unidos) e descartada
+    - Filhos de um card descartado passam a apontar para o card mantido quando ele está
+      no mesmo documento; caso contrário ficam sem pai
+
+    Args:
+        documents: Lista de (chave do documento, cards), na ordem de publicação
+        existing_issues: Issues já no Project (de `list_existing_project_issues`)
+
+    Returns:
+        (cards restantes por documento, relatório)
+    """
+    index = CandidateIndex(existing_issues)
+    report = DedupReport()
+    result: Dict[str, List[Card]] = {}
+
+    for key, cards in documents:
+        kept: List[Card] = []
+        # posição original → posição na lista final (ou None se descartado sem substituto no documento)
+        new_position: Dict[int, Optional[int]] = {}
+
+        for position, card in enumerate(cards):
+            normalized = normalize_issue(card.title, card.description)
+            existing_title = index.find_existing(normalized)
+            if existing_title is not None:
+                report.existing += 1
+                report.messages.append(f"\"{card.title}\" ({key}) já existe no Project como \"{existing_title}\"")
+                new_position[position] = None
+                continue
+
+            candidate = index.find_candidate(normalized)
+            if candidate is not None and candidate.key == key and card.parent_index is not None \
+                    and candidate.index == new_position.get(card.parent_index):
+                # Um card refinando o próprio pai não é duplicata dele
+                candidate = None
+            if candidate is not None:
+                _merge_into(candidate.card, card)
+                report.merged += 1
+                report.messages.append(
+                    f"\"{card.title}\" ({key}) fundido com \"{candidate.card.title}\" ({candidate.key})"
+                )
+                new_position[position] = candidate.index if candidate.key == key else None
+                continue
+
+            new_position[position] = len(kept)
+            index.add(key, len(kept), card, normalized)
+            kept.append(card)
+
+        for card in kept:
+            if card.parent_index is None:
+                continue
+            parent = new_position.get(card.parent_index)
+            if parent is None:
+                report.orphaned += 1
+            card.parent_index = parent
+
+        report.kept += len(kept)
+        result[key] = kept
+
+    return result, report
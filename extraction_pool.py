@@ -0,0 +1,352 @@
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from models import PDFContent
+
+
+# Workers do pool de extração no comando extract (0 = extração sequencial, sem pool;
+# um ExtractionPool criado sem tamanho usa um worker por CPU)
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+# Um worker é reciclado depois de N documentos ou quando a memória residente passa do limite
+# (o pdfplumber acumula cache por documento aberto ao longo da vida do processo)
+WORKER_MAX_DOCS = int(os.getenv("PDF_WORKER_MAX_DOCS", "50"))
+WORKER_MAX_RSS_MB = int(os.getenv("PDF_WORKER_MAX_RSS_MB", "1024"))
+# Intervalo para verificar workers que morreram sem responder (ex.: OOM killer)
+WORKER_POLL_S = 1.0
+# Prazo de um documento num worker; passado dele o worker é encerrado e substituído (0 = sem prazo)
+WORKER_JOB_TIMEOUT_S = float(os.getenv("PDF_WORKER_JOB_TIMEOUT_S", "600"))
+WORKER_SHUTDOWN_TIMEOUT_S = 5.0
+
+
+def _current_rss_mb() -> float:
+    """Memória residente do processo atual em MiB (pico, fora do Linux; 0 se indisponível)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _page_count(pdf_path: str) -> int:
+    """Quantidade de páginas (só o trailer/xref pelo PDFium, sem ler o conteúdo); 0 se não der para abrir."""
+    try:
+        import pypdfium2
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:
+        return 0
+
+
+def _worker_main(worker_id, tasks, results, backend, max_docs, max_rss_mb):
+    """Laço do processo worker: importa o pdfplumber e o backend uma vez e extrai até ser reciclado."""
+    started = time.perf_counter()
+    from pdf_reader import get_extractor, read_pdf
+    extractor = get_extractor(backend)
+    results.put(("ready", worker_id, time.perf_counter() - started))
+
+    documents = 0
+    while True:
+        job = tasks.get()
+        if job is None:
+            return
+        job_id, pdf_path = job
+        job_started = time.perf_counter()
+        content, error = None, None
+        try:
+            content = read_pdf(pdf_path, extractor)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        documents += 1
+        rss_mb = _current_rss_mb()
+        retire = documents >= max_docs or (max_rss_mb > 0 and rss_mb >= max_rss_mb)
+        results.put(("done", worker_id, job_id, content, error, time.perf_counter() - job_started, rss_mb, retire))
+        if retire:
+            return
+
+
+@dataclass
+class PoolMetrics:
+    workers: int
+    documents: int = 0
+    failed: int = 0
+    recycled: int = 0                                         # aposentados por limite de documentos ou memória
+    crashed: int = 0                                          # morreram sem responder e foram substituídos
+    timed_out: int = 0                                        # encerrados por passar do prazo de um documento
+    busy_s: float = 0.0                                       # soma do tempo de extração em todos os workers
+    warmup_s: List[float] = field(default_factory=list)       # import + backend, por worker iniciado
+    queue_waits_s: List[float] = field(default_factory=list)  # da submissão até um worker pegar o documento
+    started: float = field(default_factory=time.perf_counter)
+
+    def utilization(self) -> float:
+        """Fração do tempo de vida do pool em que os workers estiveram extraindo."""
+        elapsed = time.perf_counter() - self.started
+        return self.busy_s / (self.workers * elapsed) if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        waits = sorted(self.queue_waits_s)
+        return {
+            "workers": self.workers,
+            "documents": self.documents,
+            "failed": self.failed,
+            "recycled": self.recycled,
+            "crashed": self.crashed,
+            "timed_out": self.timed_out,
+            "utilization": round(self.utilization(), 3),
+            "busy_s": round(self.busy_s, 3),
+            "warmup_avg_s": round(sum(self.warmup_s) / len(self.warmup_s), 3) if self.warmup_s else 0.0,
+            "queue_wait_avg_s": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "queue_wait_p95_s": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            "queue_wait_max_s": round(waits[-1], 3) if waits else 0.0
+        }
+
+    def print_summary(self) -> None:
+        m = self.as_dict()
+        print(
+            f"Pool de extração: {m['documents']} documentos em {m['workers']} workers "
+            f"(utilização {m['utilization']:.0%}, {m['recycled']} reciclados, {m['crashed']} caídos, "
+            f"{m['timed_out']} encerrados por prazo, {m['failed']} falhas)"
+        )
+        print(
+            f"  Espera na fila: média {m['queue_wait_avg_s']:.2f}s, p95 {m['queue_wait_p95_s']:.2f}s, "
+            f"máx {m['queue_wait_max_s']:.2f}s; aquecimento médio por worker {m['warmup_avg_s']:.2f}s"
+        )
+
+
+class _Worker:
+    def __init__(self, worker_id: int, process, tasks):
+        self.id = worker_id
+        self.process = process
+        self.tasks = tasks
+        self.ready = False
+        self.job: Optional[int] = None
+        self.job_started = 0.0
+
+
+class ExtractionPool:
+    """
+    Pool persistente de processos de extração de PDF, já aquecidos (pdfplumber e backend
+    importados), reaproveitado entre lotes enquanto o pool estiver aberto.
+
+    - Os documentos de cada lote são distribuídos do maior para o menor (em páginas),
+      para que um PDF grande não fique por último segurando o lote inteiro
+    - Cada worker é reciclado depois de `max_docs` documentos ou quando a memória residente
+      passa de `max_rss_mb`; o substituto já é iniciado na hora
+    - Um worker que passa de `PDF_WORKER_JOB_TIMEOUT_S` num documento é encerrado e
+      substituído, e o documento é dado como falha
+    - `metrics` acumula utilização, espera na fila, falhas, reciclagens e workers que caíram
+
+    Uso:
+        with ExtractionPool(workers=4) as pool:
+            for pdf_path, content in pool.extract_many(paths):
+                ...
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        backend: Optional[str] = None,
+        max_docs: int = WORKER_MAX_DOCS,
+        max_rss_mb: int = WORKER_MAX_RSS_MB
+    ):
+        self.size = max(workers or EXTRACT_WORKERS or os.cpu_count() or 1, 1)
+        self.backend = backend
+        self.max_docs = max(max_docs, 1)
+        self.max_rss_mb = max_rss_mb
+        self.metrics = PoolMetrics(workers=self.size)
+        self._context = multiprocessing.get_context()
+        self._results = None
+        self._workers: Dict[int, _Worker] = {}
+        self._next_worker_id = 0
+        self._next_job_id = 0
+
+    def __enter__(self) -> "ExtractionPool":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._results is not None:
+            return
+        self._results = self._context.Queue()
+        self.metrics.started = time.perf_counter()
+        for _ in range(self.size):
+            self._spawn()
+
+    def close(self) -> None:
+        for worker in self._workers.values():
+            worker.tasks.put(None)
+        for worker in self._workers.values():
+            worker.process.join(WORKER_SHUTDOWN_TIMEOUT_S)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+        self._workers.clear()
+        if self._results is not None:
+            self._results.close()
+            self._results = None
+
+    def _spawn(self) -> None:
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        tasks = self._context.SimpleQueue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, tasks, self._results, self.backend, self.max_docs, self.max_rss_mb),
+            name=f"pdf-extract-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = _Worker(worker_id, process, tasks)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Remove o worker (já encerrado ou encerrando) e inicia um substituto."""
+        del self._workers[worker.id]
+        worker.process.join(WORKER_SHUTDOWN_TIMEOUT_S)
+        self._spawn()
+
+    def _dispatch(self, pending: deque, jobs: Dict[int, str], submitted: float) -> None:
+        for worker in list(self._workers.values()):
+            if not pending:
+                return
+            if worker.ready and worker.job is None:
+                job_id = pending.popleft()
+                worker.job = job_id
+                worker.job_started = time.perf_counter()
+                worker.tasks.put((job_id, jobs[job_id]))
+                self.metrics.queue_waits_s.append(time.perf_counter() - submitted)
+
+    def _reap_crashed(self) -> List[int]:
+        """
+        Substitui workers que morreram sem responder; retorna os jobs que estavam com eles.
+
+        Raises:
+            RuntimeError: Worker morreu antes de ficar pronto (erro de import ou de backend)
+        """
+        lost = []
+        for worker in list(self._workers.values()):
+            # Saída 0 é reciclagem normal, tratada pela mensagem "done"
+            if worker.process.exitcode not in (None, 0):
+                if not worker.ready:
+                    # Falha no import/backend: um substituto falharia do mesmo jeito
+                    raise RuntimeError(
+                        f"Worker de extração {worker.id} não iniciou (código {worker.process.exitcode})"
+                    )
+                print(f"Aviso: worker de extração {worker.id} terminou com código {worker.process.exitcode}")
+                if worker.job is not None:
+                    lost.append(worker.job)
+                self.metrics.crashed += 1
+                self._replace(worker)
+        return lost
+
+    def _reap_hung(self, timeout_s: float) -> List[int]:
+        """Encerra e substitui workers que passaram do prazo no documento atual; retorna os jobs deles."""
+        lost = []
+        if timeout_s <= 0:
+            return lost
+        now = time.perf_counter()
+        for worker in list(self._workers.values()):
+            if worker.job is not None and now - worker.job_started > timeout_s:
+                print(f"Aviso: worker de extração {worker.id} sem resposta há {now - worker.job_started:.0f}s; encerrando")
+                lost.append(worker.job)
+                self.metrics.timed_out += 1
+                worker.process.kill()
+                self._replace(worker)
+        return lost
+
+    def extract_many(self, pdf_paths: List[Path]) -> Iterator[Tuple[Path, Optional[PDFContent]]]:
+        """
+        Extrai os PDFs no pool, na ordem em que terminam.
+
+        Args:
+            pdf_paths: Caminhos dos PDFs
+
+        Returns:
+            Iterador de (caminho, PDFContent), com None no lugar do conteúdo quando a extração falhou
+        """
+        self.start()
+        paths = {str(p): Path(p) for p in pdf_paths}
+        # Ids únicos na vida do pool: respostas de um lote abandonado no meio não se confundem com as do próximo
+        jobs = dict(enumerate(paths, start=self._next_job_id))
+        self._next_job_id += len(jobs)
+        # Maior primeiro (páginas; tamanho do arquivo desempata e cobre PDFs que o PDFium não abre)
+        order = sorted(jobs, key=lambda j: (_page_count(jobs[j]), os.path.getsize(jobs[j])), reverse=True)
+        pending = deque(order)
+        submitted = time.perf_counter()
+        remaining = len(jobs)
+        # Jobs já entregues (com resultado ou perdidos): uma resposta tardia de um worker
+        # já substituído não é contada de novo
+        settled: Set[int] = set()
+        last_check = time.perf_counter()
+
+        self._dispatch(pending, jobs, submitted)
+        while remaining:
+            try:
+                message = self._results.get(timeout=WORKER_POLL_S)
+            except queue.Empty:
+                message = None
+
+            # Verificado também entre mensagens: outros workers respondendo não escondem um travado
+            if message is None or time.perf_counter() - last_check >= WORKER_POLL_S:
+                last_check = time.perf_counter()
+                lost = self._reap_crashed() + self._reap_hung(WORKER_JOB_TIMEOUT_S)
+                self._dispatch(pending, jobs, submitted)
+                for job_id in lost:
+                    if job_id in settled:
+                        continue
+                    settled.add(job_id)
+                    remaining -= 1
+                    self.metrics.failed += 1
+                    print(f"Aviso: falha ao extrair {jobs[job_id]}: worker encerrado durante a extração")
+                    yield paths[jobs[job_id]], None
+            if message is None:
+                continue
+
+            if message[0] == "ready":
+                _, worker_id, warmup_s = message
+                if worker_id in self._workers:
+                    self._workers[worker_id].ready = True
+                self.metrics.warmup_s.append(warmup_s)
+                self._dispatch(pending, jobs, submitted)
+                continue
+
+            _, worker_id, job_id, content, error, busy_s, rss_mb, retire = message
+            worker = self._workers.get(worker_id)
+            if worker is None:
+                # Worker já substituído (caiu ou passou do prazo): o job dele já foi dado como perdido
+                continue
+            worker.job = None
+            self.metrics.documents += 1
+            self.metrics.busy_s += busy_s
+            if retire:
+                print(f"Worker de extração {worker_id} reciclado ({rss_mb:.0f} MiB residentes)")
+                self.metrics.recycled += 1
+                self._replace(worker)
+            self._dispatch(pending, jobs, submitted)
+
+            if job_id not in jobs or job_id in settled:
+                continue
+            settled.add(job_id)
+            remaining -= 1
+            if error:
+                self.metrics.failed += 1
+                print(f"Aviso: falha ao extrair {jobs[job_id]}: {error}")
+                yield paths[jobs[job_id]], None
+            else:
+                yield paths[jobs[job_id]], content
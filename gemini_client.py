@@ -1,13 +1,131 @@
+import asyncio
 import os
-import json
 import time
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import google.genai as genai
-from google.genai.errors import ClientError
+from google.genai import types
 from models import Card, PDFContent
+from model_router import ModelRouter, estimate_tokens
+from response_parser import parse_cards_tolerant, save_raw_response
+from context_cache import PromptCache
+from token_budget import PromptPart, effective_budget, fit_parts, truncate_to_tokens
+from batch_generation import BatchBackend, GeminiBatchBackend, generate_cards_batch
+from issue_table import SNIPPET_CHARS, IssueTable
 
 
 DEFAULT_GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash-lite")
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "120"))
+# Permite apontar o cliente para outro endpoint (ex.: um servidor fake local nos testes)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+# Rodadas por todos os modelos candidatos antes de desistir, com espera crescente entre elas
+GENERATION_ROUNDS = 3
+ROUND_RETRY_DELAY_S = 5
+# Parcela do orçamento reservada ao documento antes de reduzir o bloco de issues existentes
+DOCUMENT_MIN_SHARE = float(os.getenv("GEMINI_DOCUMENT_MIN_SHARE", "0.5"))
+
+_default_router: Optional[ModelRouter] = None
+_prompt_cache: Optional[PromptCache] = None
+
+
+def get_default_router() -> ModelRouter:
+    """Roteador compartilhado pelas chamadas do processo (estatísticas acumulam ao longo do lote)."""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter.from_env(DEFAULT_GEMINI_MODEL)
+    return _default_router
+
+
+def make_client(api_key: str) -> genai.Client:
+    """Cria o cliente do Gemini com o timeout por chamada e, se configurado, o endpoint alternativo."""
+    http_options = types.HttpOptions(timeout=int(GEMINI_TIMEOUT_S * 1000))
+    if GEMINI_BASE_URL:
+        http_options.base_url = GEMINI_BASE_URL
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def make_batch_backend(api_key: str) -> GeminiBatchBackend:
+    """Backend de predição em lote do Gemini, com o mesmo formato de resposta (JSON) das chamadas diretas."""
+    return GeminiBatchBackend(make_client(api_key), _generation_config())
+
+
+def get_prompt_cache(client: genai.Client) -> PromptCache:
+    """Cache de contexto compartilhado pelas chamadas do processo."""
+    global _prompt_cache
+    if _prompt_cache is None:
+        _prompt_cache = PromptCache(client)
+    else:
+        _prompt_cache.client = client
+    return _prompt_cache
+
+
+def _generation_config(**extra) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=Card.response_schema(),
+        **extra
+    )
+
+
+def _generate_content(client: genai.Client, model: str, prefix: str, suffix: str, prompt_cache: Optional[PromptCache]):
+    """
+    Chama o modelo usando o prefixo do cache de contexto quando disponível; se o cache
+    falhar (ex.: expirou), descarta-o e envia o prompt completo.
+    """
+    cache_name = prompt_cache.get(model, prefix) if prompt_cache else None
+    if cache_name:
+        try:
+            return client.models.generate_content(
+                model=model,
+                contents=suffix,
+                config=_generation_config(cached_content=cache_name)
+            )
+        except Exception as e:
+            if _classify_error(e) in ("rate_limit", "timeout"):
+                raise
+            print(f"Aviso: falha ao usar o cache de contexto ({e}); enviando o prompt completo.")
+            prompt_cache.invalidate(model, cache_name)
+    
+    return client.models.generate_content(
+        model=model,
+        contents=prefix + suffix,
+        config=_generation_config()
+    )
+
+
+async def _generate_content_async(client: genai.Client, model: str, prefix: str, suffix: str, prompt_cache: Optional[PromptCache]):
+    """Versão assíncrona de `_generate_content` (client.aio)."""
+    cache_name = await asyncio.to_thread(prompt_cache.get, model, prefix) if prompt_cache else None
+    if cache_name:
+        try:
+            return await client.aio.models.generate_content(
+                model=model,
+                contents=suffix,
+                config=_generation_config(cached_content=cache_name)
+            )
+        except Exception as e:
+            if _classify_error(e) in ("rate_limit", "timeout"):
+                raise
+            print(f"Aviso: falha ao usar o cache de contexto ({e}); enviando o prompt completo.")
+            prompt_cache.invalidate(model, cache_name)
+    
+    return await client.aio.models.generate_content(
+        model=model,
+        contents=prefix + suffix,
+        config=_generation_config()
+    )
+
+
+def _classify_error(e: Exception) -> str:
+    """Classifica erros da API do Gemini em 'rate_limit', 'timeout', 'not_found' ou 'other'."""
+    error_code = getattr(e, 'status_code', None) or getattr(e, 'code', None)
+    error_message = str(e)
+    if error_code == 429 or '429' in error_message or 'RESOURCE_EXHAUSTED' in error_message:
+        return "rate_limit"
+    if isinstance(e, TimeoutError) or 'timed out' in error_message.lower() or 'timeout' in type(e).__name__.lower():
+        return "timeout"
+    if error_code == 404 or '404' in error_message or 'not found' in error_message.lower():
+        return "not_found"
+    return "other"
 
 
 def list_available_models(client: genai.Client):
@@ -72,55 +190,13 @@ def list_available_models(client: genai.Client):
         print("\nConsulte a documentação: https://ai.google.dev/gemini-api/docs/models\n")
 
 
-def generate_cards(
-    pdf_content: PDFContent,
-    api_key: str,
-    existing_issues: Optional[List[Tuple[str, str]]] = None
-) -> List[Card]:
-    """
-    Envia o conteúdo do PDF para o Gemini e gera cards estruturados.
-    
-    Args:
-        pdf_content: Conteúdo extraído do PDF
-        api_key: Chave da API do Google Gemini
-        existing_issues: Lista de (título, descrição) das issues já no Project, para o modelo não gerar duplicatas
-        
-    Returns:
-        Lista de Cards gerados
-    """
-    client = genai.Client(api_key=api_key)
-    model_to_use = DEFAULT_GEMINI_MODEL
-    
-    existing_block = ""
-    if existing_issues:
-        lines = []
-        for i, (title, body) in enumerate(existing_issues, 1):
-            desc_snippet = (body or "").strip()[:280].replace("\n", " ")
-            if desc_snippet:
-                lines.append(f"{i}. Título: {title}\n   Descrição (resumo): {desc_snippet}...")
-            else:
-                lines.append(f"{i}. Título: {title}")
-        existing_block = """
-CARTÕES JÁ EXISTENTES NO PROJETO (não gere cards duplicados ou equivalentes a estes):
-""" + "\n".join(lines) + """
+PROMPT_INTRO = """Você é um assistente especializado em análise de especificações técnicas de software.
 
-- Verificação de duplicação RIGOROSA: compare cada requisito do documento com a lista acima. Se um requisito do PDF já está coberto (mesmo tema, mesmo escopo, mesma funcionalidade) por alguma issue existente, NÃO crie card para ele.
-- NÃO crie cards que sejam "mais internos", sub-itens, detalhes de implementação ou desdobramentos de requisitos JÁ COBERTOS pelas issues existentes. Se um card existente já cobre um fluxo/problema inteiro, NÃO crie novos cards que sejam apenas partes, etapas ou sub-tarefas desse mesmo fluxo — eles não serão utilizados.
-- Um card novo só é válido se representar um requisito TOTALMENTE NOVO (outro fluxo/feature), não uma subdivisão de algo que já está na lista.
-- Se NENHUM requisito do documento for realmente novo em relação à lista, retorne um array vazio: []
-- NÃO tente "achar" issues ao redor do que já existe nem inventar fluxos que não estão documentados no PDF. Se não houver nada novo a criar, retorne [].
-- Gere APENAS cards para requisitos que sejam CLARAMENTE NOVOS e EXPLICITAMENTE documentados no PDF. Em dúvida (requisito pode ser parte de um card existente), NÃO crie o card — retorne [].
-"""
-    else:
-        existing_block = ""
-    
-    prompt = f"""Você é um assistente especializado em análise de especificações técnicas de software.
+Analise o conteúdo de um PDF de especificação técnica (fornecido ao final, após as instruções) e gere cards de desenvolvimento estruturados.
 
-Analise o seguinte conteúdo de um PDF de especificação técnica e gere cards de desenvolvimento estruturados.
+"""
 
-{pdf_content.to_prompt()}
-{existing_block}
-DOCUMENTO A RISCA:
+PROMPT_INSTRUCTIONS = """DOCUMENTO A RISCA:
 - O documento deve ser seguido À RISCA. Gere cards SOMENTE para o que está EXPLICITAMENTE descrito no PDF (texto e tabelas).
 - NÃO extrapole, NÃO invente requisitos, NÃO inclua fluxos ou funcionalidades que não estejam documentados no conteúdo fornecido.
 - Cada card deve corresponder a um requisito que aparece de forma clara no documento.
@@ -150,7 +226,7 @@ INSTRUÇÕES:
 
 FORMATO DE RESPOSTA (JSON válido):
 [
-  {{
+  {
     "title": "Título do card",
     "description": "Descrição TÉCNICA do requisito (endpoints, componentes, regras, payloads, validações, etc.)",
     "type": "Front-End" ou "Back-End",
@@ -160,7 +236,7 @@ FORMATO DE RESPOSTA (JSON válido):
       "Critério técnico 3"
     ],
     "parent_index": null ou número (índice 0-based do card pai nesta lista; o pai deve vir antes do filho)
-  }}
+  }
 ]
 
 IMPORTANTE:
@@ -174,101 +250,410 @@ IMPORTANTE:
 - parent_index: use apenas quando o card tiver um "pai" na mesma lista (índice 0-based); o card pai deve aparecer antes no array
 - description e acceptance_criteria devem ser técnicos (não genéricos)
 """
+
+
+def build_existing_block(
+    existing_issues: Optional[IssueTable],
+    snippet_chars: int = SNIPPET_CHARS,
+    limit: Optional[int] = None
+) -> str:
+    """
+    Monta o bloco de contexto com as issues já existentes no Project.
     
-    max_retries = 3
-    retry_delay = 5
+    Args:
+        existing_issues: Issues já no Project (resumos já calculados na listagem)
+        snippet_chars: Tamanho do resumo da descrição de cada issue (0 = só o título; no máximo SNIPPET_CHARS)
+        limit: Quantidade máxima de issues no bloco (None = todas)
+        
+    Returns:
+        Bloco de texto para o prompt (vazio se não houver issues)
+    """
+    titles = existing_issues.titles[:limit] if existing_issues else []
+    if not titles:
+        return ""
     
-    for attempt in range(max_retries):
-        try:
-            if attempt > 0:
-                wait_time = retry_delay * (2 ** (attempt - 1))
-                print(f"Aguardando {wait_time} segundos antes de tentar novamente (tentativa {attempt + 1}/{max_retries})...")
-                time.sleep(wait_time)
-            
-            print(f"Enviando conteúdo para o Gemini (modelo: {model_to_use})...")
-            response = client.models.generate_content(
-                model=model_to_use,
-                contents=prompt
-            )
-            
-            response_text = response.text.strip()
-            
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.startswith("```"):
-                response_text = response_text[3:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            cards_data = json.loads(response_text)
-            
-            if not isinstance(cards_data, list):
-                raise ValueError("Resposta do Gemini não é uma lista")
-            
-            cards = [Card.from_dict(card_data) for card_data in cards_data]
-            
-            print(f"Cards gerados: {len(cards)}")
-            for i, card in enumerate(cards, 1):
-                print(f"  {i}. [{card.type.value}] {card.title}")
-            
-            return cards
+    lines = []
+    for i, (title, snippet) in enumerate(zip(titles, existing_issues.snippets), 1):
+        desc_snippet = snippet[:snippet_chars]
+        if desc_snippet:
+            lines.append(f"{i}. Título: {title}\n   Descrição (resumo): {desc_snippet}...")
+        else:
+            lines.append(f"{i}. Título: {title}")
+    return """
+CARTÕES JÁ EXISTENTES NO PROJETO (não gere cards duplicados ou equivalentes a estes):
+""" + "\n".join(lines) + """
+
+- Verificação de duplicação RIGOROSA: compare cada requisito do documento com a lista acima. Se um requisito do PDF já está coberto (mesmo tema, mesmo escopo, mesma funcionalidade) por alguma issue existente, NÃO crie card para ele.
+- NÃO crie cards que sejam "mais internos", sub-itens, detalhes de implementação ou desdobramentos de requisitos JÁ COBERTOS pelas issues existentes. Se um card existente já cobre um fluxo/problema inteiro, NÃO crie novos cards que sejam apenas partes, etapas ou sub-tarefas desse mesmo fluxo — eles não serão utilizados.
+- Um card novo só é válido se representar um requisito TOTALMENTE NOVO (outro fluxo/feature), não uma subdivisão de algo que já está na lista.
+- Se NENHUM requisito do documento for realmente novo em relação à lista, retorne um array vazio: []
+- NÃO tente "achar" issues ao redor do que já existe nem inventar fluxos que não estão documentados no PDF. Se não houver nada novo a criar, retorne [].
+- Gere APENAS cards para requisitos que sejam CLARAMENTE NOVOS e EXPLICITAMENTE documentados no PDF. Em dúvida (requisito pode ser parte de um card existente), NÃO crie o card — retorne [].
+"""
+
+
+def _existing_block_shrinker(existing_issues: IssueTable):
+    """
+    Reduz o bloco de issues existentes encurtando os resumos das descrições e, se ainda
+    não couber, mantendo só parte das issues (as duplicatas restantes são barradas na publicação).
+    """
+    def shrink(block: str, target_tokens: int) -> str:
+        for snippet_chars in (160, 80, 0):
+            block = build_existing_block(existing_issues, snippet_chars)
+            if estimate_tokens(block) <= target_tokens:
+                return block
+        keep = len(existing_issues) * target_tokens // max(estimate_tokens(block), 1)
+        return build_existing_block(existing_issues, 0, limit=keep)
+    return shrink
+
+
+def document_tokens(pdf_content: PDFContent) -> int:
+    """Tokens estimados do conteúdo de um documento no prompt (texto e tabelas)."""
+    return estimate_tokens(pdf_content.text) + estimate_tokens(str(pdf_content.tables_json))
+
+
+def fit_existing_block(
+    existing_issues: Optional[IssueTable],
+    largest_document_tokens: int,
+    router: Optional[ModelRouter] = None
+) -> str:
+    """
+    Monta o bloco de issues existentes uma única vez por execução ou lote, dimensionado
+    para o maior documento, para que o prefixo do prompt seja idêntico em todas as chamadas
+    e o cache de contexto não seja recriado a cada documento.
+    
+    O conteúdo do documento é o primeiro a ser reduzido: o bloco só encolhe quando nem
+    reservando ao documento DOCUMENT_MIN_SHARE do orçamento ele cabe.
+    
+    Args:
+        existing_issues: Issues já no Project (de `list_existing_project_issues`)
+        largest_document_tokens: Tokens do maior documento da execução (`document_tokens`)
+        router: Roteador de modelos usado para definir o orçamento (None = só GEMINI_PROMPT_TOKEN_BUDGET)
         
-        except json.JSONDecodeError as e:
-            print(f"Erro ao decodificar JSON do Gemini: {e}")
-            print(f"Resposta recebida: {response_text[:500]}")
-            raise
+    Returns:
+        Bloco de texto para o prompt (vazio se não houver issues)
+    """
+    block = build_existing_block(existing_issues)
+    if not block:
+        return block
+    
+    parts = [
+        PromptPart("instruções", PROMPT_INTRO + PROMPT_INSTRUCTIONS),
+        PromptPart("issues existentes", block, shrink=_existing_block_shrinker(existing_issues))
+    ]
+    model = None
+    model_limit = None
+    if router:
+        spec = router.budget_for(sum(p.tokens for p in parts) + largest_document_tokens)
+        model, model_limit = spec.name, spec.max_prompt_tokens
+    budget = effective_budget(model_limit)
+    if not budget:
+        return block
+    
+    reserved = min(largest_document_tokens, int(budget * DOCUMENT_MIN_SHARE))
+    report = fit_parts(parts, budget - reserved, model)
+    if report.shrunk:
+        _, original, final = report.parts[1]
+        print(
+            f"Bloco de issues existentes reduzido de ~{original} para ~{final} tokens "
+            f"(dimensionado para o maior documento, ~{largest_document_tokens} tokens)"
+        )
+    return parts[1].text
+
+
+def build_prompt_parts(
+    pdf_content: PDFContent,
+    existing_block: str = "",
+    router: Optional[ModelRouter] = None
+) -> Tuple[str, str]:
+    """
+    Monta o prompt em duas partes: um prefixo igual para todos os PDFs de um lote
+    (instruções, formato de resposta e issues existentes), que pode ir para o cache de
+    contexto do Gemini, e um sufixo com o conteúdo do documento.
+    
+    Antes de montar, estima os tokens de cada parte (instruções, issues existentes, texto
+    e tabelas do PDF) e, se o total passar do orçamento do modelo preferido (limite em
+    GEMINI_MODELS e GEMINI_PROMPT_TOKEN_BUDGET), reduz as maiores partes do documento.
+    O prefixo não é alterado aqui: o bloco de issues já vem dimensionado por `fit_existing_block`.
+    
+    Args:
+        pdf_content: Conteúdo extraído do PDF
+        existing_block: Bloco de issues existentes (de `fit_existing_block`)
+        router: Roteador de modelos usado para definir o orçamento (None = só GEMINI_PROMPT_TOKEN_BUDGET)
         
-        except ClientError as e:
-            error_code = getattr(e, 'status_code', None)
-            error_message = str(e)
-            
-            if error_code == 429 or 'RESOURCE_EXHAUSTED' in error_message:
-                if attempt < max_retries - 1:
-                    print(f"\nErro 429 (Rate Limit): Limite de requisições atingido.")
-                    print(f"Tentando novamente em {retry_delay * (2 ** attempt)} segundos...")
+    Returns:
+        (prefixo, sufixo)
+    """
+    parts = [
+        PromptPart("instruções", PROMPT_INTRO + PROMPT_INSTRUCTIONS),
+        PromptPart("issues existentes", existing_block),
+        PromptPart("texto do PDF", pdf_content.text, shrink=truncate_to_tokens),
+        PromptPart("tabelas do PDF", str(pdf_content.tables_json), shrink=truncate_to_tokens)
+    ]
+    model = None
+    model_limit = None
+    if router:
+        spec = router.budget_for(sum(p.tokens for p in parts))
+        model, model_limit = spec.name, spec.max_prompt_tokens
+    report = fit_parts(parts, effective_budget(model_limit), model)
+    report.print_breakdown()
+    
+    _, _, text, tables_text = (p.text for p in parts)
+    prefix = PROMPT_INTRO + existing_block + PROMPT_INSTRUCTIONS
+    suffix = "\nCONTEÚDO DO PDF A ANALISAR:\n\n" + PDFContent.format_prompt(text, tables_text)
+    return prefix, suffix
+
+
+def generate_cards(
+    pdf_content: PDFContent,
+    api_key: str,
+    existing_issues: Optional[IssueTable] = None,
+    router: Optional[ModelRouter] = None,
+    existing_block: Optional[str] = None,
+    client: Optional[genai.Client] = None
+) -> List[Card]:
+    """
+    Envia o conteúdo do PDF para o Gemini e gera cards estruturados.
+    
+    Args:
+        pdf_content: Conteúdo extraído do PDF
+        api_key: Chave da API do Google Gemini
+        existing_issues: Issues já no Project (de `list_existing_project_issues`), para o modelo não gerar duplicatas
+        router: Roteador de modelos (padrão: roteador compartilhado do processo, configurado por GEMINI_MODELS)
+        existing_block: Bloco de issues já dimensionado para a execução (`fit_existing_block`),
+            para manter o prefixo idêntico entre documentos; None = dimensionar só para este documento
+        client: Cliente do Gemini (padrão: `make_client(api_key)`; LocalGeminiClient para testes offline)
+        
+    Returns:
+        Lista de Cards gerados
+    """
+    client = client or make_client(api_key)
+    router = router or get_default_router()
+    prompt_cache = get_prompt_cache(client)
+    
+    if existing_block is None:
+        existing_block = fit_existing_block(existing_issues, document_tokens(pdf_content), router)
+    prefix, suffix = build_prompt_parts(pdf_content, existing_block, router)
+    prompt_tokens = estimate_tokens(prefix + suffix)
+    last_error: Optional[Exception] = None
+    
+    for attempt in range(GENERATION_ROUNDS):
+        if attempt > 0:
+            time.sleep(_round_wait(attempt))
+        
+        candidates = router.route(prompt_tokens)
+        for position, model_to_use in enumerate(candidates):
+            next_model = candidates[position + 1] if position + 1 < len(candidates) else None
+            started = time.monotonic()
+            try:
+                print(f"Enviando conteúdo para o Gemini (modelo: {model_to_use})...")
+                response = _generate_content(client, model_to_use, prefix, suffix, prompt_cache)
+            except Exception as e:
+                last_error = e
+                if _handle_generation_error(client, router, model_to_use, next_model, e, time.monotonic() - started):
                     continue
-                else:
-                    print(f"\nErro 429 (Rate Limit): Limite de requisições atingido após {max_retries} tentativas.")
-                    print("\nSoluções possíveis:")
-                    print("  1. Aguarde alguns minutos e tente novamente")
-                    print("  2. Verifique seus limites de quota na API do Gemini")
-                    print("  3. Considere usar um modelo diferente ou reduzir o tamanho do conteúdo")
-                    print("  4. Se estiver na conta gratuita, considere fazer upgrade")
-                    raise
+                break
             
-            print(f"\nErro ao gerar cards com Gemini: {e}")
-            
-            if error_code == 404 or 'not found' in error_message.lower():
-                print("\nModelo não encontrado. Listando modelos disponíveis...")
-                list_available_models(client)
-                print("\nDica: você pode setar `GEMINI_MODEL` no .env (ex: GEMINI_MODEL=models/gemini-2.0-flash-lite).")
-            
-            raise
+            router.record_success(model_to_use, time.monotonic() - started)
+            return parse_cards_response(response.text)
+    
+    _raise_exhausted(last_error)
+
+
+async def generate_cards_async(
+    pdf_content: PDFContent,
+    api_key: str,
+    existing_issues: Optional[IssueTable] = None,
+    router: Optional[ModelRouter] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+    existing_block: Optional[str] = None,
+    client: Optional[genai.Client] = None
+) -> List[Card]:
+    """
+    Versão assíncrona de `generate_cards` (client.aio), com o mesmo roteamento de modelos,
+    cache de contexto e orçamento de tokens.
+    
+    Args:
+        pdf_content: Conteúdo extraído do PDF
+        api_key: Chave da API do Google Gemini
+        existing_issues: Issues já no Project (de `list_existing_project_issues`)
+        router: Roteador de modelos (padrão: o compartilhado do processo)
+        limiter: Semáforo que limita as chamadas simultâneas ao Gemini
+        existing_block: Bloco de issues já dimensionado para a execução (`fit_existing_block`)
+        client: Cliente do Gemini (padrão: `make_client(api_key)`; LocalGeminiClient para testes offline)
         
-        except Exception as e:
-            error_str = str(e)
-            
-            if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str:
-                if attempt < max_retries - 1:
-                    print(f"\nErro 429 detectado. Tentando novamente em {retry_delay * (2 ** attempt)} segundos...")
+    Returns:
+        Lista de Cards gerados
+    """
+    client = client or make_client(api_key)
+    router = router or get_default_router()
+    prompt_cache = get_prompt_cache(client)
+    limiter = limiter or asyncio.Semaphore(1)
+    
+    if existing_block is None:
+        existing_block = fit_existing_block(existing_issues, document_tokens(pdf_content), router)
+    prefix, suffix = build_prompt_parts(pdf_content, existing_block, router)
+    prompt_tokens = estimate_tokens(prefix + suffix)
+    last_error: Optional[Exception] = None
+    
+    for attempt in range(GENERATION_ROUNDS):
+        if attempt > 0:
+            await asyncio.sleep(_round_wait(attempt))
+        
+        candidates = router.route(prompt_tokens)
+        for position, model_to_use in enumerate(candidates):
+            next_model = candidates[position + 1] if position + 1 < len(candidates) else None
+            started = time.monotonic()
+            try:
+                async with limiter:
+                    print(f"Enviando conteúdo para o Gemini (modelo: {model_to_use})...")
+                    response = await _generate_content_async(client, model_to_use, prefix, suffix, prompt_cache)
+            except Exception as e:
+                last_error = e
+                if _handle_generation_error(client, router, model_to_use, next_model, e, time.monotonic() - started):
                     continue
-                else:
-                    print(f"\nErro 429 após {max_retries} tentativas.")
-                    print("\nSoluções possíveis:")
-                    print("  1. Aguarde alguns minutos e tente novamente")
-                    print("  2. Verifique seus limites de quota na API do Gemini")
-                    print("  3. Considere usar um modelo diferente ou reduzir o tamanho do conteúdo")
-                    raise
-            
-            print(f"Erro ao gerar cards com Gemini: {e}")
-            
-            if '404' in error_str or 'not found' in error_str.lower():
-                print("\nErro 404 detectado. Listando modelos disponíveis...")
-                list_available_models(client)
-                print("\nDica: você pode setar `GEMINI_MODEL` no .env (ex: GEMINI_MODEL=models/gemini-2.0-flash-lite).")
+                break
             
-            raise
+            router.record_success(model_to_use, time.monotonic() - started)
+            return parse_cards_response(response.text)
+    
+    _raise_exhausted(last_error)
+
+
+def _round_wait(attempt: int) -> float:
+    wait_time = ROUND_RETRY_DELAY_S * (2 ** (attempt - 1))
+    print(f"Todos os modelos indisponíveis. Aguardando {wait_time} segundos antes de tentar novamente (tentativa {attempt + 1}/{GENERATION_ROUNDS})...")
+    return wait_time
+
+
+def _handle_generation_error(
+    client: genai.Client,
+    router: ModelRouter,
+    model_to_use: str,
+    next_model: Optional[str],
+    e: Exception,
+    elapsed: float
+) -> bool:
+    """
+    Registra a falha de uma chamada ao Gemini e decide o próximo passo.
+    
+    Returns:
+        True para tentar o próximo modelo, False para encerrar a rodada
+        (erros que não se resolvem trocando de modelo são relançados)
+    """
+    kind = _classify_error(e)
+    router.record_failure(
+        model_to_use,
+        elapsed,
+        rate_limited=(kind == "rate_limit"),
+        timeout=(kind == "timeout")
+    )
+    
+    if kind in ("rate_limit", "timeout"):
+        reason = "limitado (429)" if kind == "rate_limit" else f"sem resposta em {elapsed:.0f}s"
+        if next_model:
+            router.record_fallback(model_to_use, next_model, reason)
+            return True
+        print(f"\nModelo {model_to_use} {reason}; nenhum outro modelo disponível.")
+        return False
+    
+    print(f"\nErro ao gerar cards com Gemini (modelo: {model_to_use}): {e}")
+    
+    if kind == "not_found":
+        print("\nModelo não encontrado. Listando modelos disponíveis...")
+        list_available_models(client)
+        print("\nDica: você pode setar `GEMINI_MODEL` ou `GEMINI_MODELS` no .env (ex: GEMINI_MODEL=models/gemini-2.0-flash-lite).")
+        if next_model:
+            router.record_fallback(model_to_use, next_model, "não encontrado")
+            return True
     
+    raise e
+
+
+def _raise_exhausted(last_error: Optional[Exception]):
+    print(f"\nErro 429 (Rate Limit): todos os modelos limitados após {GENERATION_ROUNDS} tentativas.")
+    print("\nSoluções possíveis:")
+    print("  1. Aguarde alguns minutos e tente novamente")
+    print("  2. Verifique seus limites de quota na API do Gemini")
+    print("  3. Adicione modelos de reserva em GEMINI_MODELS ou reduza o tamanho do conteúdo")
+    print("  4. Se estiver na conta gratuita, considere fazer upgrade")
+    if last_error:
+        raise last_error
     raise Exception("Falha após todas as tentativas")
+
+
+def generate_cards_in_batch(
+    documents: List[Tuple[str, PDFContent]],
+    api_key: Optional[str] = None,
+    existing_issues: Optional[IssueTable] = None,
+    backend: Optional[BatchBackend] = None,
+    router: Optional[ModelRouter] = None
+) -> Dict[str, Optional[List[Card]]]:
+    """
+    Gera cards para vários documentos num único job de predição em lote do Gemini,
+    em vez de uma chamada síncrona por PDF. Indicado para processamentos grandes em que
+    vazão e custo importam mais que a latência de cada documento.
+    
+    Args:
+        documents: Lista de (chave do documento, conteúdo extraído)
+        api_key: Chave da API do Google Gemini (dispensável quando `backend` é informado)
+        existing_issues: Issues já no Project (de `list_existing_project_issues`)
+        backend: Serviço de lote (padrão: API de batch do Gemini; LocalBatchBackend para testes offline)
+        router: Roteador de modelos; o job usa o modelo preferido para o maior prompt do lote
+        
+    Returns:
+        Cards de cada documento, por chave (None para documentos cuja geração falhou)
+    """
+    if not documents:
+        return {}
+    backend = backend or make_batch_backend(api_key)
+    router = router or get_default_router()
+    
+    existing_block = fit_existing_block(
+        existing_issues,
+        max(document_tokens(content) for _, content in documents),
+        router
+    )
+    prompts = []
+    for key, content in documents:
+        print(f"\n{key}:")
+        prefix, suffix = build_prompt_parts(content, existing_block, router)
+        prompts.append((key, prefix + suffix))
+    
+    largest = max(estimate_tokens(prompt) for _, prompt in prompts)
+    model = router.route(largest)[0]
+    return generate_cards_batch(prompts, backend, model, parse_cards_response)
+
+
+def parse_cards_response(response_text: str) -> List[Card]:
+    """
+    Converte o texto da resposta do Gemini em Cards.
+    Usa o parser tolerante: objetos válidos de uma resposta truncada ou levemente
+    malformada são aproveitados, sem uma nova chamada com o prompt completo.
+    
+    Args:
+        response_text: Texto retornado pelo modelo
+        
+    Returns:
+        Lista de Cards
+    """
+    cards, report = parse_cards_tolerant(response_text)
+    
+    if not report.clean:
+        raw_path = save_raw_response(response_text)
+        for message in report.messages:
+            print(f"Aviso: {message}")
+        if report.no_json:
+            print(f"Resposta recebida: {(response_text or '')[:500]}")
+            raise ValueError(f"Resposta do Gemini não contém JSON (resposta salva em {raw_path})")
+        print(
+            f"Aviso: resposta do Gemini reparada ({report.recovered} cards recuperados, "
+            f"{report.skipped} ignorados{', resposta truncada' if report.truncated else ''}); "
+            f"resposta bruta salva em {raw_path}"
+        )
+    
+    print(f"Cards gerados: {len(cards)}")
+    for i, card in enumerate(cards, 1):
+        print(f"  {i}. [{card.type.value}] {card.title}")
+    
+    return cards
@@ -1,11 +1,34 @@
 import os
+import time
+from datetime import datetime, timezone
 import requests
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from models import Card
+from rate_limit import REST, RateLimitGovernor, get_governor
+
+
+# Mutations createIssue por requisição GraphQL; mantém cada requisição bem abaixo do timeout de 10s do GitHub
+BULK_CREATE_CHUNK_SIZE = int(os.getenv("GITHUB_BULK_CREATE_CHUNK_SIZE", "10"))
+# Limite de bytes de títulos+bodies por requisição (evita payloads grandes com cards muito descritivos)
+BULK_CREATE_MAX_BYTES = 200_000
+# Folga para diferença entre o relógio local e o do GitHub ao procurar issues criadas por um lote que falhou
+LOOKUP_CLOCK_SKEW_S = 300
+
+
+class IssueCreationError(Exception):
+    """
+    Falha ao criar uma issue. `uncertain` indica que a requisição pode ter sido aplicada
+    mesmo assim (conexão caída, timeout, 5xx ou resposta ilegível): a issue não deve ser
+    recriada sem antes conferir se ela já existe.
+    """
+    
+    def __init__(self, message: str, uncertain: bool = False):
+        super().__init__(message)
+        self.uncertain = uncertain
 
 
 class GitHubClient:
-    def __init__(self, token: str, owner: str, repo: str):
+    def __init__(self, token: str, owner: str, repo: str, governor: Optional[RateLimitGovernor] = None):
         """
         Inicializa o cliente do GitHub.
         
@@ -13,6 +36,7 @@ class GitHubClient:
             token: Token de autenticação do GitHub
             owner: Proprietário do repositório
             repo: Nome do repositório
+            governor: Controle de rate limit (padrão: o compartilhado do processo)
         """
         self.token = token
         self.owner = owner
@@ -22,17 +46,25 @@ class GitHubClient:
             "Authorization": f"token {token}",
             "Accept": "application/vnd.github.v3+json"
         }
+        self.graphql_url = f"{self.base_url}/graphql"
+        self.graphql_headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        self.governor = governor or get_governor()
+        self.repository_id: Optional[str] = None
+        self.issue_node_ids: Dict[str, str] = {}  # número da issue -> node ID (reaproveitado ao adicionar ao Project)
     
-    def create_issue(self, card: Card, parent_issue_number: Optional[str] = None) -> Optional[str]:
+    def build_issue_body(self, card: Card, parent_issue_number: Optional[str] = None) -> str:
         """
-        Cria uma issue no GitHub a partir de um card.
+        Monta o body (Markdown) da issue de um card.
         
         Args:
             card: Card a ser convertido em issue
-            parent_issue_number: Número da issue pai (#), se houver (para incluir no body)
+            parent_issue_number: Número da issue pai (#), se houver
             
         Returns:
-            ID da issue criada (número como string) ou None em caso de erro
+            Body da issue
         """
         acceptance_criteria_text = "\n".join([
             f"- [ ] {criterion}" for criterion in card.acceptance_criteria
@@ -42,7 +74,7 @@ class GitHubClient:
         if parent_issue_number:
             parent_line = f"\n**Issue pai:** #{parent_issue_number}\n"
         
-        body = f"""## Descrição
+        return f"""## Descrição
 {parent_line}
 {card.description}
 
@@ -53,55 +85,373 @@ class GitHubClient:
 ---
 *Gerado automaticamente a partir da especificação técnica*
 """
+    
+    def create_issue(self, card: Card, parent_issue_number: Optional[str] = None) -> str:
+        """
+        Cria uma issue no GitHub a partir de um card.
         
+        Args:
+            card: Card a ser convertido em issue
+            parent_issue_number: Número da issue pai (#), se houver (para incluir no body)
+            
+        Returns:
+            ID da issue criada (número como string)
+            
+        Raises:
+            IssueCreationError: A issue não foi criada ou o resultado é incerto (`uncertain`)
+        """
         issue_data = {
             "title": card.title,
-            "body": body
+            "body": self.build_issue_body(card, parent_issue_number)
         }
         
         url = f"{self.base_url}/repos/{self.owner}/{self.repo}/issues"
         
         try:
-            response = requests.post(url, json=issue_data, headers=self.headers)
+            response = self.governor.request("POST", url, REST, json=issue_data, headers=self.headers)
             response.raise_for_status()
             
             issue = response.json()
             issue_number = str(issue["number"])
-            issue_url = issue["html_url"]
-            
-            print(f"Issue criada: #{issue_number} - {card.title} ({issue_url})")
-            return issue_number
         
-        except requests.exceptions.RequestException as e:
+        except requests.exceptions.HTTPError as e:
+            raise IssueCreationError(
+                f"{e}\nResposta: {e.response.text}",
+                uncertain=e.response.status_code >= 500
+            ) from e
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            # Conexão caída, timeout ou resposta ilegível: a issue pode ter sido criada
+            raise IssueCreationError(str(e), uncertain=True) from e
+        
+        if issue.get("node_id"):
+            self.issue_node_ids[issue_number] = issue["node_id"]
+        print(f"Issue criada: #{issue_number} - {card.title} ({issue.get('html_url')})")
+        return issue_number
+    
+    def _create_issue_reported(
+        self,
+        cards: List[Card],
+        index: int,
+        numbers: List[Optional[str]],
+        uncertain: List[int]
+    ) -> None:
+        """Cria a issue de `cards[index]` pela API REST, registrando o número ou a falha."""
+        card = cards[index]
+        try:
+            numbers[index] = self.create_issue(card, parent_issue_number=self._parent_number(card, numbers))
+        except IssueCreationError as e:
             print(f"Erro ao criar issue '{card.title}': {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Resposta: {e.response.text}")
+            if e.uncertain:
+                print("Aviso: a issue pode ter sido criada mesmo assim; confira no GitHub antes de publicar de novo.")
+                uncertain.append(index)
+    
+    def get_repository_id(self) -> Optional[str]:
+        """
+        Obtém (uma vez) o node ID do repositório, necessário para a mutation createIssue.
+        
+        Returns:
+            Node ID do repositório ou None em caso de erro
+        """
+        if self.repository_id:
+            return self.repository_id
+        
+        query = """
+        query($owner: String!, $repo: String!) {
+            repository(owner: $owner, name: $repo) {
+                id
+            }
+        }
+        """
+        
+        try:
+            response = self.governor.post_graphql(
+                self.graphql_url,
+                query,
+                {"owner": self.owner, "repo": self.repo},
+                self.graphql_headers
+            )
+            response.raise_for_status()
+            data = response.json()
+            if "errors" in data:
+                print(f"Erro GraphQL ao buscar o repositório: {data['errors']}")
+                return None
+            self.repository_id = ((data.get("data") or {}).get("repository") or {}).get("id")
+            return self.repository_id
+        
+        except Exception as e:
+            print(f"Erro ao buscar o repositório: {e}")
+            return None
+    
+    def _run_aliased_mutations(
+        self,
+        field: str,
+        inputs: List[dict],
+        selection: str
+    ) -> Tuple[List[Optional[dict]], bool]:
+        """
+        Executa várias mutations do mesmo tipo numa única requisição, com aliases m0, m1, ...
+        
+        Args:
+            field: Nome da mutation (ex.: "createIssue")
+            inputs: Input de cada mutation
+            selection: Campos retornados por cada mutation
+            
+        Returns:
+            (resultado de cada mutation na ordem de `inputs`, ou None se ela falhou;
+             False se a requisição inteira falhou)
+        """
+        input_type = field[0].upper() + field[1:] + "Input"
+        variable_defs = ", ".join(f"$input{i}: {input_type}!" for i in range(len(inputs)))
+        fields = "\n".join(
+            f"    m{i}: {field}(input: $input{i}) {{ {selection} }}" for i in range(len(inputs))
+        )
+        mutation = f"mutation({variable_defs}) {{\n{fields}\n}}"
+        variables = {f"input{i}": item for i, item in enumerate(inputs)}
+        
+        try:
+            response = self.governor.post_graphql(self.graphql_url, mutation, variables, self.graphql_headers)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            print(f"Erro na requisição GraphQL em lote ({field}): {e}")
+            return [None] * len(inputs), False
+        
+        for error in data.get("errors") or []:
+            path = error.get("path") or ["?"]
+            print(f"Erro GraphQL em {field} ({path[0]}): {error.get('message')}")
+        
+        results = data.get("data") or {}
+        if not results:
+            return [None] * len(inputs), False
+        return [results.get(f"m{i}") for i in range(len(inputs))], True
+    
+    def find_created_issues(self, cards: List[Card], since: float) -> Optional[List[Optional[dict]]]:
+        """
+        Procura no repositório as issues com o título de cada card criadas a partir de `since`,
+        para saber o que uma criação com resultado incerto chegou a fazer. Usa a listagem REST
+        de issues (ordenada pela criação), que, ao contrário da busca, não tem atraso de indexação.
+        
+        Args:
+            cards: Cards cujas issues são procuradas
+            since: Instante (epoch) do envio; a busca recua LOOKUP_CLOCK_SKEW_S
+            
+        Returns:
+            Issue (formato REST) de cada card, na mesma ordem, ou None para as que não existem;
+            None se a consulta falhou
+        """
+        since_iso = datetime.fromtimestamp(since - LOOKUP_CLOCK_SKEW_S, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        wanted = {card.title.strip() for card in cards}
+        by_title: Dict[str, List[dict]] = {}
+        url = f"{self.base_url}/repos/{self.owner}/{self.repo}/issues"
+        params = {"state": "all", "sort": "created", "direction": "desc", "since": since_iso, "per_page": 100}
+        
+        try:
+            while url:
+                response = self.governor.request("GET", url, REST, params=params, headers=self.headers)
+                response.raise_for_status()
+                page = response.json()
+                older = False
+                for issue in page:
+                    if issue["created_at"] < since_iso:
+                        older = True
+                        break
+                    title = issue["title"].strip()
+                    if "pull_request" not in issue and title in wanted:
+                        by_title.setdefault(title, []).append(issue)
+                # A URL da próxima página já traz os parâmetros
+                url = None if older else response.links.get("next", {}).get("url")
+                params = None
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"Aviso: não foi possível conferir as issues criadas no repositório: {e}")
             return None
+        
+        # Títulos repetidos: a issue mais antiga fica com o primeiro card
+        for issues in by_title.values():
+            issues.sort(key=lambda issue: issue["number"])
+        return [(by_title.get(card.title.strip()) or [None]).pop(0) for card in cards]
+    
+    @staticmethod
+    def _chunks(items: List[int], payloads: List[int]) -> List[List[int]]:
+        """Divide os índices em lotes limitados por quantidade e por bytes de payload."""
+        chunks, current, size = [], [], 0
+        for item, payload in zip(items, payloads):
+            if current and (len(current) >= BULK_CREATE_CHUNK_SIZE or size + payload > BULK_CREATE_MAX_BYTES):
+                chunks.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += payload
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def create_issues_bulk(
+        self,
+        cards: List[Card],
+        numbers: Optional[List[Optional[str]]] = None,
+        only: Optional[List[int]] = None,
+        on_created: Optional[Callable[[int, str], None]] = None
+    ) -> Tuple[List[Optional[str]], List[int]]:
+        """
+        Cria as issues em lote com mutations createIssue com alias (várias por requisição).
+        
+        Filhos cujo pai foi criado num lote anterior já saem com a referência ao pai no body;
+        filhos criados no mesmo lote do pai recebem a referência num lote de updateIssue em seguida.
+        
+        Um lote que falha por inteiro (ex.: timeout) pode ter criado parte das issues mesmo assim:
+        elas são procuradas no repositório (`find_created_issues`) e só os cards que comprovadamente
+        não viraram issue são criados pela API REST. Se a consulta falhar, os cards do lote ficam
+        com resultado incerto e não são recriados.
+        
+        Args:
+            cards: Lista de cards (o pai sempre antes do filho)
+            numbers: Issue já existente de cada card (ex.: de uma publicação anterior), usada
+                como referência ao pai; None = nenhuma
+            only: Índices dos cards a criar (padrão: todos os que ainda não têm issue)
+            on_created: Chamado com (índice, número) de cada issue assim que o lote dela é
+                confirmado, para que as etapas seguintes comecem sem esperar os outros lotes
+            
+        Returns:
+            (número da issue de cada card, na mesma ordem, ou None para os que não existem;
+             índices dos cards cuja criação tem resultado incerto)
+        """
+        numbers = list(numbers) if numbers is not None else [None] * len(cards)
+        todo = [i for i in (range(len(cards)) if only is None else only) if numbers[i] is None]
+        uncertain: List[int] = []
+        
+        def notify(indices: List[int]) -> None:
+            if on_created:
+                for i in indices:
+                    if numbers[i]:
+                        on_created(i, numbers[i])
+        
+        if not todo:
+            return numbers, uncertain
+        repository_id = self.get_repository_id()
+        if not repository_id:
+            print("Aviso: repositório não encontrado via GraphQL; criando issues pela API REST.")
+            for i in todo:
+                self._create_issue_reported(cards, i, numbers, uncertain)
+                notify([i])
+            return numbers, uncertain
+        
+        payloads = {i: len(cards[i].title.encode("utf-8")) + len(self.build_issue_body(cards[i]).encode("utf-8")) for i in todo}
+        pending_parent_updates: List[int] = []
+        requests_made = 0
+        
+        for chunk in self._chunks(todo, [payloads[i] for i in todo]):
+            inputs = []
+            for i in chunk:
+                parent_num = self._parent_number(cards[i], numbers)
+                if cards[i].parent_index is not None and parent_num is None and cards[i].parent_index in chunk:
+                    pending_parent_updates.append(i)
+                inputs.append({
+                    "repositoryId": repository_id,
+                    "title": cards[i].title,
+                    "body": self.build_issue_body(cards[i], parent_num)
+                })
+            
+            sent_at = time.time()
+            results, ok = self._run_aliased_mutations("createIssue", inputs, "issue { id number url }")
+            requests_made += 1
+            if not ok:
+                print(f"Aviso: lote de {len(chunk)} issues falhou; conferindo quais chegaram a ser criadas...")
+                found = self.find_created_issues([cards[i] for i in chunk], sent_at)
+                if found is None:
+                    print(f"Aviso: {len(chunk)} issues ficam com resultado incerto e não são recriadas; confira no GitHub.")
+                    uncertain.extend(chunk)
+                    pending_parent_updates = [i for i in pending_parent_updates if i not in chunk]
+                    continue
+                recreated = []
+                for i, issue in zip(chunk, found):
+                    if issue:
+                        number = str(issue["number"])
+                        numbers[i] = number
+                        if issue.get("node_id"):
+                            self.issue_node_ids[number] = issue["node_id"]
+                        print(f"Issue já criada pelo lote: #{number} - {cards[i].title} ({issue.get('html_url')})")
+                    else:
+                        # Criada pela REST já com a referência ao pai, quando ele existe
+                        self._create_issue_reported(cards, i, numbers, uncertain)
+                        recreated.append(i)
+                pending_parent_updates = [i for i in pending_parent_updates if i not in recreated]
+                notify(chunk)
+                continue
+            
+            for i, result in zip(chunk, results):
+                issue = (result or {}).get("issue")
+                if not issue:
+                    print(f"Erro ao criar issue '{cards[i].title}'")
+                    continue
+                number = str(issue["number"])
+                numbers[i] = number
+                self.issue_node_ids[number] = issue["id"]
+                print(f"Issue criada: #{number} - {cards[i].title} ({issue.get('url')})")
+            notify(chunk)
+        
+        # Referência ao pai para filhos criados no mesmo lote do pai
+        updates = [i for i in pending_parent_updates if numbers[i] and self._parent_number(cards[i], numbers)]
+        # Issues recuperadas sem node id (ex.: pela consulta REST) não podem ser editadas pelo GraphQL
+        for i in [i for i in updates if not self.issue_node_ids.get(numbers[i])]:
+            print(f"Aviso: ID da issue #{numbers[i]} desconhecido; não foi possível incluir a issue pai")
+        updates = [i for i in updates if self.issue_node_ids.get(numbers[i])]
+        update_payloads = [payloads[i] for i in updates]
+        for chunk in self._chunks(updates, update_payloads):
+            inputs = [{
+                "id": self.issue_node_ids.get(numbers[i]),
+                "body": self.build_issue_body(cards[i], self._parent_number(cards[i], numbers))
+            } for i in chunk]
+            results, _ = self._run_aliased_mutations("updateIssue", inputs, "issue { number }")
+            requests_made += 1
+            for i, result in zip(chunk, results):
+                if not result:
+                    print(f"Aviso: não foi possível incluir a issue pai em #{numbers[i]}")
+        
+        print(f"Criação em lote: {sum(1 for i in todo if numbers[i])} issues em {requests_made} requisições GraphQL")
+        return numbers, uncertain
+    
+    @staticmethod
+    def _parent_number(card: Card, numbers: List[Optional[str]]) -> Optional[str]:
+        pi = getattr(card, "parent_index", None)
+        if pi is not None and 0 <= pi < len(numbers):
+            return numbers[pi]
+        return None
     
     def create_issues_from_cards(
         self, 
-        cards: List[Card]
-    ) -> List[str]:
+        cards: List[Card],
+        bulk: bool = True,
+        numbers: Optional[List[Optional[str]]] = None,
+        only: Optional[List[int]] = None,
+        on_created: Optional[Callable[[int, str], None]] = None
+    ) -> Tuple[List[Optional[str]], List[int]]:
         """
         Cria múltiplas issues a partir de uma lista de cards.
         
         Args:
             cards: Lista de cards para converter em issues
+            bulk: Cria em lote via GraphQL (padrão); False cria uma issue por requisição REST
+            numbers: Issue já existente de cada card (ver `create_issues_bulk`)
+            only: Índices dos cards a criar (padrão: todos os que ainda não têm issue)
+            on_created: Chamado com (índice, número) de cada issue assim que ela é confirmada
             
         Returns:
-            Lista de IDs das issues criadas
-        """
-        print(f"\nCriando {len(cards)} issues no GitHub...")
-        
-        issue_numbers = []
-        for i, card in enumerate(cards):
-            parent_num = None
-            pi = getattr(card, "parent_index", None)
-            if pi is not None and 0 <= pi < len(issue_numbers):
-                parent_num = issue_numbers[pi]
-            issue_number = self.create_issue(card, parent_issue_number=parent_num)
-            if issue_number:
-                issue_numbers.append(issue_number)
-        
-        print(f"\nTotal de issues criadas: {len(issue_numbers)}")
-        return issue_numbers
+            (número da issue de cada card ou None, índices com resultado incerto)
+        """
+        numbers = list(numbers) if numbers is not None else [None] * len(cards)
+        todo = [i for i in (range(len(cards)) if only is None else only) if numbers[i] is None]
+        print(f"\nCriando {len(todo)} issues no GitHub...")
+        
+        if bulk:
+            numbers, uncertain = self.create_issues_bulk(cards, numbers, todo, on_created)
+        else:
+            uncertain: List[int] = []
+            for i in todo:
+                self._create_issue_reported(cards, i, numbers, uncertain)
+                if numbers[i] and on_created:
+                    on_created(i, numbers[i])
+        
+        created = sum(1 for i in todo if numbers[i])
+        print(f"\nTotal de issues criadas: {created}")
+        if created < len(todo):
+            print(f"Falhas: {len(todo) - created} ({len(uncertain)} com resultado incerto)")
+        return numbers, uncertain
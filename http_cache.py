@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+from local_cache import cache_dir
+from rate_limit import REST, RateLimitGovernor
+
+
+MAX_CACHE_BYTES = int(os.getenv("GITHUB_HTTP_CACHE_MAX_MB", "64")) * 1024 * 1024
+# Headers guardados junto do body (o 304 não traz o Link de paginação de volta de forma garantida)
+STORED_HEADERS = ("Link", "Content-Type", "ETag", "Last-Modified")
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    from_cache: bool = False
+
+    def json(self):
+        return json.loads(self.content.decode("utf-8"))
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"GitHub respondeu {self.status_code}: {self.content[:300]!r}")
+
+    @property
+    def next_url(self) -> Optional[str]:
+        """URL da próxima página (header Link rel="next"), se houver."""
+        for part in (self.headers.get("Link") or "").split(","):
+            section = part.split(";")
+            if len(section) >= 2 and 'rel="next"' in section[1]:
+                return section[0].strip().strip("<>")
+        return None
+
+
+class HTTPCache:
+    """
+    Cache persistente (SQLite) de leituras REST do GitHub com validação condicional.
+
+    Respostas com ETag/Last-Modified são guardadas; na próxima leitura a requisição sai com
+    If-None-Match/If-Modified-Since e, se nada mudou, o GitHub responde 304 (que não conta
+    no rate limit primário) e o body vem do cache. O tamanho total é limitado, removendo
+    primeiro as entradas acessadas há mais tempo.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = Path(path) if path else cache_dir() / "http_cache.sqlite3"
+        self.max_bytes = max_bytes
+        self.hits = 0          # 304: body servido do cache
+        self.misses = 0        # 200: body baixado (e guardado, se tiver validadores)
+        self.uncacheable = 0   # 200 sem validadores ou erro
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(url: str, headers: dict) -> str:
+        # O token entra na chave: tokens diferentes podem enxergar conteúdos diferentes
+        auth = hashlib.sha256((headers.get("Authorization") or "").encode("utf-8")).hexdigest()[:16]
+        accept = headers.get("Accept") or ""
+        return hashlib.sha256(f"{url}\x00{accept}\x00{auth}".encode("utf-8")).hexdigest()
+
+    def _load(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._db.execute("SELECT headers, body FROM entries WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _store(self, key: str, url: str, headers: dict, body: bytes) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, url, headers, body, size, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(headers), body, len(body), time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def get(self, governor: RateLimitGovernor, url: str, headers: dict) -> CachedResponse:
+        """
+        GET condicional de uma URL REST do GitHub (parâmetros de query devem estar na URL).
+
+        Args:
+            governor: Controle de rate limit usado para a requisição
+            url: URL completa
+            headers: Headers da requisição (Authorization, Accept...)
+
+        Returns:
+            CachedResponse (from_cache=True quando o body veio do cache após um 304)
+        """
+        key = self._key(url, headers)
+        cached = self._load(key)
+        request_headers = dict(headers)
+        if cached:
+            stored_headers = cached[0]
+            if stored_headers.get("ETag"):
+                request_headers["If-None-Match"] = stored_headers["ETag"]
+            if stored_headers.get("Last-Modified"):
+                request_headers["If-Modified-Since"] = stored_headers["Last-Modified"]
+
+        response = governor.request("GET", url, REST, headers=request_headers)
+
+        if response.status_code == 304 and cached:
+            self.hits += 1
+            self._touch(key)
+            return CachedResponse(status_code=200, headers=cached[0], content=cached[1], from_cache=True)
+
+        stored = {name: response.headers[name] for name in STORED_HEADERS if response.headers.get(name)}
+        if response.status_code == 200 and ("ETag" in stored or "Last-Modified" in stored):
+            self.misses += 1
+            self._store(key, url, stored, response.content)
+        else:
+            self.uncacheable += 1
+        return CachedResponse(status_code=response.status_code, headers=stored, content=response.content)
+
+    def summary(self) -> Optional[str]:
+        total = self.hits + self.misses + self.uncacheable
+        if not total:
+            return None
+        return (
+            f"{self.hits}/{total} leituras servidas do cache (304, {self.hits / total:.0%}), "
+            f"{self.misses} baixadas e guardadas, {self.uncacheable} sem validadores, {self.evictions} removidas"
+        )
+
+    def print_summary(self) -> None:
+        line = self.summary()
+        if line:
+            print(f"Cache HTTP do GitHub: {line}")
+
+
+_default_cache: Optional[HTTPCache] = None
+
+
+def get_http_cache() -> HTTPCache:
+    """Cache HTTP compartilhado por todos os clientes do GitHub do processo."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HTTPCache()
+    return _default_cache
+
+
+def print_http_cache_summary() -> None:
+    """Imprime as métricas do cache compartilhado, se ele chegou a ser usado."""
+    if _default_cache is not None:
+        _default_cache.print_summary()
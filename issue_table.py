@@ -0,0 +1,180 @@
+import hashlib
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from local_cache import cache_dir
+
+
+ISSUE_TABLE_FORMAT = "card-creator/issue-table"
+ISSUE_TABLE_VERSION = 1
+
+# Prefixo da descrição comparado na detecção de duplicatas e tamanho do resumo enviado ao Gemini
+COMPARE_PREFIX_CHARS = 500
+SNIPPET_CHARS = 280
+
+# (id, updatedAt, título, descrição) de uma issue, como vem da listagem do Project
+IssueRow = Tuple[Optional[str], Optional[str], str, str]
+
+
+def _normalize_for_compare(s: str) -> str:
+    if not s:
+        return ""
+    return " ".join(s.lower().split())
+
+
+def _similar_normalized_title(a: str, b: str) -> bool:
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    if a in b or b in a:
+        return True
+    return False
+
+
+def _similar_normalized_description(a: str, b: str) -> bool:
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    if len(a) > 50 and len(b) > 50 and (a in b or b in a):
+        return True
+    return False
+
+
+def normalize_issue(title: str, body: str) -> Tuple[str, str]:
+    """Título normalizado e prefixo normalizado da descrição, na forma usada pelas comparações."""
+    return _normalize_for_compare(title), _normalize_for_compare((body or "")[:COMPARE_PREFIX_CHARS])
+
+
+def fingerprint(norm_title: str, norm_body: str) -> int:
+    """Impressão digital de 64 bits do conteúdo normalizado (título + prefixo da descrição)."""
+    digest = hashlib.blake2b(f"{norm_title}\0{norm_body}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class IssueTable:
+    """
+    Issues já existentes no Project em colunas paralelas (uma lista por campo e as impressões
+    digitais num `array`), com título e descrição já normalizados e o resumo do prompt pronto.
+    Montada uma vez por listagem e lida tanto pela detecção de duplicatas quanto pelo prompt.
+    """
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.updated_at: List[Optional[str]] = []
+        self.titles: List[str] = []
+        self.norm_titles: List[str] = []
+        self.norm_bodies: List[str] = []
+        self.snippets: List[str] = []
+        self.fingerprints = array("Q")
+        # Título e descrição normalizados idênticos resolvem a busca sem varrer a tabela
+        self._by_fingerprint: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def append(
+        self,
+        issue_id: Optional[str],
+        updated_at: Optional[str],
+        title: str,
+        norm_title: str,
+        norm_body: str,
+        snippet: str,
+        digest: int
+    ) -> None:
+        self._by_fingerprint.setdefault(digest, len(self.titles))
+        self.ids.append(issue_id)
+        self.updated_at.append(updated_at)
+        self.titles.append(title)
+        self.norm_titles.append(norm_title)
+        self.norm_bodies.append(norm_body)
+        self.snippets.append(snippet)
+        self.fingerprints.append(digest)
+
+    def add_issue(self, issue_id: Optional[str], updated_at: Optional[str], title: str, body: str) -> None:
+        norm_title, norm_body = normalize_issue(title, body)
+        snippet = (body or "").strip()[:SNIPPET_CHARS].replace("\n", " ")
+        self.append(issue_id, updated_at, title, norm_title, norm_body, snippet, fingerprint(norm_title, norm_body))
+
+    def find_similar_normalized(self, norm_title: str, norm_body: str) -> Optional[int]:
+        """Posição de uma issue com título e descrição similares (entradas já normalizadas), se houver."""
+        if not norm_title or not norm_body:
+            return None
+        position = self._by_fingerprint.get(fingerprint(norm_title, norm_body))
+        if position is not None and self.norm_titles[position] == norm_title and self.norm_bodies[position] == norm_body:
+            return position
+        norm_titles = self.norm_titles
+        norm_bodies = self.norm_bodies
+        for position in range(len(norm_titles)):
+            if _similar_normalized_title(norm_titles[position], norm_title) \
+                    and _similar_normalized_description(norm_bodies[position], norm_body):
+                return position
+        return None
+
+
+def _cache_path(cache_key: str):
+    return cache_dir("issues") / f"{hashlib.sha256(cache_key.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def _load_cached(cache_key: str) -> Dict[str, list]:
+    try:
+        with open(_cache_path(cache_key), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("format") != ISSUE_TABLE_FORMAT or data.get("version") != ISSUE_TABLE_VERSION:
+        return {}
+    return data.get("issues") or {}
+
+
+def _save_cached(cache_key: str, issues: Dict[str, list]) -> None:
+    try:
+        with open(_cache_path(cache_key), "w", encoding="utf-8") as f:
+            json.dump({"format": ISSUE_TABLE_FORMAT, "version": ISSUE_TABLE_VERSION, "issues": issues}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"Aviso: não foi possível salvar o cache de issues existentes: {e}")
+
+
+def build_issue_table(rows: Iterable[IssueRow], cache_key: Optional[str] = None) -> IssueTable:
+    """
+    Monta a tabela das issues listadas. Com `cache_key`, reaproveita os registros do cache
+    local cujo updatedAt não mudou e grava o cache atualizado (só com as issues listadas).
+
+    Args:
+        rows: (id, updatedAt, título, descrição) de cada issue
+        cache_key: Identifica o Project no cache (None = sem cache)
+
+    Returns:
+        IssueTable na ordem da listagem
+    """
+    cached = _load_cached(cache_key) if cache_key else {}
+    table = IssueTable()
+    fresh: Dict[str, list] = {}
+    reused = 0
+
+    for issue_id, updated_at, title, body in rows:
+        record = cached.get(issue_id) if issue_id else None
+        if record is not None and updated_at and record[0] == updated_at:
+            _, title, norm_title, norm_body, snippet, digest = record
+            table.append(issue_id, updated_at, title, norm_title, norm_body, snippet, digest)
+            reused += 1
+        else:
+            table.add_issue(issue_id, updated_at, title, body)
+        if issue_id and updated_at:
+            position = len(table) - 1
+            fresh[issue_id] = [
+                updated_at,
+                table.titles[position],
+                table.norm_titles[position],
+                table.norm_bodies[position],
+                table.snippets[position],
+                table.fingerprints[position]
+            ]
+
+    if cache_key and fresh != cached:
+        _save_cached(cache_key, fresh)
+    if reused:
+        print(f"Issues existentes reaproveitadas do cache local: {reused}/{len(table)}")
+    return table
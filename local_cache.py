@@ -0,0 +1,20 @@
+import os
+from pathlib import Path
+
+
+DEFAULT_CACHE_DIR = os.getenv("CARD_CREATOR_CACHE_DIR", ".card_creator")
+
+
+def cache_dir(*parts: str) -> Path:
+    """
+    Retorna uma subpasta do diretório de cache local, criando-a se necessário.
+
+    Args:
+        parts: Nomes das subpastas dentro do diretório de cache
+
+    Returns:
+        Caminho da pasta
+    """
+    path = Path(DEFAULT_CACHE_DIR).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -1,18 +1,71 @@
 #!/usr/bin/env python3
 import sys
 import os
+import argparse
+import asyncio
+import time
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 from pdf_reader import read_pdf
-from gemini_client import generate_cards
+from extraction_pool import EXTRACT_WORKERS, ExtractionPool
+from gemini_client import (
+    document_tokens,
+    fit_existing_block,
+    generate_cards,
+    generate_cards_async,
+    generate_cards_in_batch,
+    get_default_router
+)
 from github_client import GitHubClient
+from async_clients import (
+    AsyncGitHubSession,
+    AsyncProjectClient,
+    ServiceLimiters,
+    create_and_add_issues
+)
 from project_client import GitHubProjectClient
-from models import Card
+from models import Card, PDFContent
+from profiling import StageProfiler
+from rate_limit import get_governor
+from http_cache import print_http_cache_summary
+from dedup import dedupe_batch
+from revision import RevisionStore, build_snapshot, diff_revision, split_sections
+from pipeline import (
+    CARDS_SUFFIX,
+    EXTRACTED_SUFFIX,
+    PublishState,
+    collect_inputs,
+    default_artifacts_dir,
+    extract_stage,
+    generate_stage,
+    generate_stage_batch,
+    publish_stage,
+    read_extracted
+)
 
 
-def load_environment():
-    """Carrega variáveis de ambiente do arquivo .env"""
+GEMINI_VARS = ["GEMINI_API_KEY"]
+GITHUB_VARS = ["GITHUB_TOKEN", "GITHUB_OWNER", "GITHUB_REPO"]
+PROJECT_VARS = [
+    "GITHUB_PROJECT_ID",
+    "GITHUB_STATUS_FIELD_ID",
+    "STATUS_BACKLOG_OPTION_ID",
+    "GITHUB_AREA_FIELD_ID",
+    "AREA_FRONTEND_OPTION_ID",
+    "AREA_BACKEND_OPTION_ID"
+]
+SUBCOMMANDS = ("run", "extract", "generate", "publish")
+
+
+def load_environment(required_vars: Optional[List[str]] = None):
+    """
+    Carrega variáveis de ambiente do arquivo .env
+
+    Args:
+        required_vars: Variáveis obrigatórias para a etapa (padrão: todas)
+    """
     env_path = Path(__file__).parent / ".env"
     if not env_path.exists():
         print("Erro: arquivo .env não encontrado!")
@@ -20,26 +73,16 @@ def load_environment():
         sys.exit(1)
     
     load_dotenv(env_path)
-    
-    required_vars = [
-        "GEMINI_API_KEY",
-        "GITHUB_TOKEN",
-        "GITHUB_OWNER",
-        "GITHUB_REPO",
-        "GITHUB_PROJECT_ID",
-        "GITHUB_STATUS_FIELD_ID",
-        "STATUS_BACKLOG_OPTION_ID",
-        "GITHUB_AREA_FIELD_ID",
-        "AREA_FRONTEND_OPTION_ID",
-        "AREA_BACKEND_OPTION_ID"
-    ]
-    
+
+    if required_vars is None:
+        required_vars = GEMINI_VARS + GITHUB_VARS + PROJECT_VARS
+
     missing_vars = [var for var in required_vars if not os.getenv(var)]
-    
+
     if missing_vars:
         print(f"Erro: variáveis de ambiente faltando: {', '.join(missing_vars)}")
         sys.exit(1)
-    
+
     return {
         "gemini_api_key": os.getenv("GEMINI_API_KEY"),
         "github_token": os.getenv("GITHUB_TOKEN"),
@@ -50,29 +93,15 @@ def load_environment():
         "status_backlog_option_id": os.getenv("STATUS_BACKLOG_OPTION_ID"),
         "github_area_field_id": os.getenv("GITHUB_AREA_FIELD_ID"),
         "area_frontend_option_id": os.getenv("AREA_FRONTEND_OPTION_ID"),
-        "area_backend_option_id": os.getenv("AREA_BACKEND_OPTION_ID")
+        "area_backend_option_id": os.getenv("AREA_BACKEND_OPTION_ID"),
+        "github_project_number": os.getenv("GITHUB_PROJECT_NUMBER"),
+        "github_project_owner": os.getenv("GITHUB_PROJECT_OWNER"),
+        "github_project_owner_type": os.getenv("GITHUB_PROJECT_OWNER_TYPE", "orgs")
     }
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Uso: python main.py <caminho_do_pdf>")
-        sys.exit(1)
-    
-    pdf_path = sys.argv[1]
-    
-    if not os.path.exists(pdf_path):
-        print(f"Erro: arquivo PDF não encontrado: {pdf_path}")
-        sys.exit(1)
-    
-    print("=" * 60)
-    print("Sistema de Automação: PDF → GitHub Projects")
-    print("=" * 60)
-    print()
-    
-    env = load_environment()
-    
-    project_client = GitHubProjectClient(
+def build_project_client(env: dict) -> GitHubProjectClient:
+    return GitHubProjectClient(
         token=env["github_token"],
         owner=env["github_owner"],
         repo=env["github_repo"],
@@ -81,67 +110,432 @@ def main():
         status_backlog_option_id=env["status_backlog_option_id"],
         area_field_id=env["github_area_field_id"],
         area_frontend_option_id=env["area_frontend_option_id"],
-        area_backend_option_id=env["area_backend_option_id"]
+        area_backend_option_id=env["area_backend_option_id"],
+        project_number=env["github_project_number"],
+        project_owner=env["github_project_owner"],
+        project_owner_type=env["github_project_owner_type"]
     )
-    
+
+
+def build_github_client(env: dict) -> GitHubClient:
+    return GitHubClient(
+        token=env["github_token"],
+        owner=env["github_owner"],
+        repo=env["github_repo"]
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Gera issues no GitHub Project a partir de PDFs de especificação técnica."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PASTA",
+        help="Perfila cada etapa (cProfile, pilhas collapsed para flamegraph e tracemalloc) e grava os resultados na pasta"
+    )
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="Executa todas as etapas para um PDF (padrão quando só o PDF é informado)")
+    run_parser.add_argument("pdf_path", help="Caminho do PDF de especificação")
+    run_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Compara com a última extração do mesmo documento e envia ao Gemini apenas as seções alteradas"
+    )
+    run_parser.add_argument(
+        "--document-id",
+        metavar="ID",
+        help="Identificador do documento no modo incremental, igual em todas as revisões (padrão: caminho absoluto do PDF)"
+    )
+
+    extract_parser = subparsers.add_parser("extract", parents=[common], help="ETAPA 1: extrai PDFs para <nome>.extracted.json")
+    extract_parser.add_argument("inputs", nargs="+", help="PDFs ou pastas com PDFs")
+    extract_parser.add_argument(
+        "--workers",
+        type=int,
+        default=EXTRACT_WORKERS,
+        metavar="N",
+        help="Extrai em um pool de N processos já aquecidos, maiores PDFs primeiro (padrão: PDF_EXTRACT_WORKERS; 0 = sequencial)"
+    )
+
+    generate_parser = subparsers.add_parser("generate", parents=[common], help="ETAPAS 2-3: gera <nome>.cards.jsonl a partir das extrações")
+    generate_parser.add_argument("inputs", nargs="+", help=f"Arquivos {EXTRACTED_SUFFIX} ou pastas que os contenham")
+    generate_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Envia ao Gemini apenas as seções alteradas desde a última revisão de cada documento"
+    )
+    generate_parser.add_argument(
+        "--document-id",
+        metavar="ID",
+        help="Identificador do documento no modo incremental, quando há uma única extração (padrão: caminho absoluto do PDF de origem)"
+    )
+    generate_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Envia todos os documentos como um único job de predição em lote (mais barato, sem latência garantida)"
+    )
+
+    publish_parser = subparsers.add_parser("publish", parents=[common], help="ETAPAS 4-5: cria issues e as adiciona ao Project")
+    publish_parser.add_argument("inputs", nargs="+", help=f"Arquivos {CARDS_SUFFIX} ou pastas que os contenham")
+
+    for stage_parser in (extract_parser, generate_parser, publish_parser):
+        stage_parser.add_argument(
+            "--out",
+            type=Path,
+            default=default_artifacts_dir(),
+            help="Pasta dos artefatos de saída (padrão: artifacts/ ou CARD_CREATOR_ARTIFACTS_DIR)"
+        )
+        stage_parser.add_argument("--force", action="store_true", help="Refaz a etapa mesmo com saídas atualizadas")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] not in SUBCOMMANDS and argv[0] not in ("-h", "--help"):
+        # Compatibilidade: `python main.py arquivo.pdf` equivale a `python main.py run arquivo.pdf`
+        argv.insert(0, "run")
+    return parser.parse_args(argv)
+
+
+def prepare_incremental(pdf_path: str, pdf_content: PDFContent, document_id: Optional[str] = None):
+    """
+    Compara a extração com a última revisão processada do mesmo documento
+    (identificado por `document_id` ou, sem ele, pelo caminho absoluto do PDF).
+
+    Returns:
+        (conteúdo a enviar ao Gemini ou None se nada mudou, função que grava a revisão atual)
+    """
+    revision_store = RevisionStore()
+    document_key = revision_store.document_key(pdf_path, document_id)
+    sections = split_sections(pdf_content.pages)
+    snapshot = build_snapshot(pdf_content, sections)
+
+    def save():
+        revision_store.save(document_key, snapshot)
+
+    if not sections:
+        # Sem texto por página (ex.: extração de uma versão anterior): não há como comparar
+        print("Modo incremental: extração sem texto por página; processando o documento inteiro.")
+        return pdf_content, save
+
+    previous = revision_store.load(document_key)
+    if previous is None:
+        print(f"Modo incremental: nenhuma revisão anterior encontrada; processando as {len(sections)} seções do documento.")
+        return pdf_content, save
+
+    diff = diff_revision(previous, snapshot, sections)
+    print(f"Modo incremental: {len(diff.changed)}/{len(sections)} seções alteradas desde a última revisão.")
+    for section in diff.changed:
+        print(f"  - {section.title or '(início do documento)'}")
+    if diff.removed:
+        print(f"  ({len(diff.removed)} seções removidas; nenhum card novo é gerado para elas)")
+    if not diff.has_changes:
+        print("Nenhuma seção alterada: as seções já foram cobertas na revisão anterior.")
+        return None, save
+    return diff.changed_content(pdf_content), save
+
+
+def publish_cards(
+    github_client: GitHubClient,
+    project_client: GitHubProjectClient,
+    cards: List[Card],
+    state: PublishState,
+    save: Optional[Callable[[], None]] = None
+) -> None:
+    """
+    Cria as issues dos cards que ainda não têm issue e as adiciona ao Project (ETAPAS 4 e 5),
+    atualizando `state`. Cards cuja criação ficou incerta numa execução anterior são procurados
+    no repositório antes; se a consulta falhar de novo, continuam incertos e não são recriados.
+    `save` grava o estado a cada lote de issues confirmado e a cada issue adicionada ao Project,
+    para que uma interrupção não leve à criação das mesmas issues de novo.
+    """
+    save = save or (lambda: None)
+    if state.uncertain:
+        unverified = sorted(state.uncertain)
+        print(f"Conferindo {len(unverified)} issues com resultado incerto na publicação anterior...")
+        found = github_client.find_created_issues([cards[i] for i in unverified], state.uncertain_since)
+        if found is not None:
+            for i, issue in zip(unverified, found):
+                if issue:
+                    state.issues[i] = str(issue["number"])
+                    state.project_pending.add(i)
+                    if issue.get("node_id"):
+                        github_client.issue_node_ids[state.issues[i]] = issue["node_id"]
+                    print(f"Issue já existente: #{state.issues[i]} - {cards[i].title}")
+            state.uncertain = set()
+            state.uncertain_since = 0.0
+            save()
+
+    def on_created(index: int, number: str) -> None:
+        state.issues[index] = number
+        state.project_pending.add(index)
+        save()
+
+    started = time.time()
+    numbers, uncertain = github_client.create_issues_from_cards(
+        cards,
+        numbers=list(state.issues),
+        only=[i for i in state.pending() if i not in state.uncertain],
+        on_created=on_created
+    )
+    if uncertain:
+        state.uncertain_since = state.uncertain_since if state.uncertain else started
+        state.uncertain.update(uncertain)
+    state.issues = numbers
+    save()
+
+    to_add = sorted(state.project_pending)
+    if to_add:
+        print(f"\nAdicionando {len(to_add)} issues ao GitHub Project...")
+        added = 0
+        for i in to_add:
+            number = state.issues[i]
+            if project_client.add_issue_to_project(number, cards[i], issue_id=github_client.issue_node_ids.get(number)):
+                added += 1
+                state.added_to_project += 1
+                state.project_pending.discard(i)
+                save()
+        print(f"\nTotal de issues adicionadas ao Project: {added}/{len(to_add)}")
+
+
+def run_command(args: argparse.Namespace, profiler: StageProfiler):
+    pdf_path = args.pdf_path
+
+    if not os.path.exists(pdf_path):
+        print(f"Erro: arquivo PDF não encontrado: {pdf_path}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Sistema de Automação: PDF → GitHub Projects")
+    print("=" * 60)
+    print()
+
+    env = load_environment()
+    asyncio.run(run_pipeline(args, env, profiler))
+
+
+async def run_pipeline(args: argparse.Namespace, env: dict, profiler: StageProfiler):
+    """
+    Executa as etapas num único event loop: a extração do PDF (ETAPA 1, numa thread) corre
+    junto com a listagem das issues do Project (ETAPA 2), e as issues de cada lote criado
+    (ETAPA 4) são adicionadas ao Project (ETAPA 5) enquanto os próximos lotes são criados.
+    """
+    pdf_path = args.pdf_path
+    limiters = ServiceLimiters()
+    session = AsyncGitHubSession(limiters.github)
+    project_client = AsyncProjectClient(build_project_client(env), session)
+
     try:
-        print("ETAPA 1: Extraindo conteúdo do PDF...")
-        pdf_content = read_pdf(pdf_path)
-        
+        print("ETAPAS 1 e 2: Extraindo conteúdo do PDF e listando issues já existentes no GitHub Project...")
+        async def list_existing_issues():
+            with profiler.stage("etapa2-issues-existentes"):
+                return await project_client.list_existing_project_issues()
+
+        # A extração é perfilada dentro da sua thread (cProfile só vê a thread em que começou)
+        # e a listagem no event loop, cada uma com o seu perfil
+        pdf_content, existing_issues = await asyncio.gather(
+            asyncio.to_thread(profiler.run, "etapa1-extracao", read_pdf, pdf_path),
+            list_existing_issues()
+        )
+        print(f"Encontradas {len(existing_issues)} issues no Project (serão usadas como contexto para evitar duplicatas).")
+
         if not pdf_content.text.strip() and not pdf_content.tables_json:
             print("Erro: nenhum conteúdo encontrado no PDF")
             sys.exit(1)
-        
-        print()
-        print("ETAPA 2: Listando issues já existentes no GitHub Project...")
-        existing_issues = project_client.list_existing_project_issues()
-        print(f"Encontradas {len(existing_issues)} issues no Project (serão usadas como contexto para evitar duplicatas).")
-        
+
+        save_revision = None
+        if args.incremental:
+            pdf_content, save_revision = prepare_incremental(pdf_path, pdf_content, args.document_id)
+            if pdf_content is None:
+                save_revision()
+                print("=" * 60)
+                sys.exit(0)
+
         print()
         print("ETAPA 3: Gerando cards com Gemini (com contexto de issues existentes)...")
-        cards = generate_cards(
-            pdf_content,
-            env["gemini_api_key"],
-            existing_issues=existing_issues if existing_issues else None
-        )
-        
+        with profiler.stage("etapa3-geracao"):
+            cards = await generate_cards_async(
+                pdf_content,
+                env["gemini_api_key"],
+                existing_issues=existing_issues if existing_issues else None,
+                limiter=limiters.gemini
+            )
+        get_default_router().print_summary()
+
+        if cards:
+            cards_by_key, report = dedupe_batch([(pdf_path, cards)], existing_issues)
+            cards = cards_by_key[pdf_path]
+            if report.merged or report.existing:
+                report.print_summary()
+
         if not cards:
+            if save_revision:
+                save_revision()
             print("Nenhum card novo gerado (especificação já coberta ou sem requisitos adicionais).")
             print("=" * 60)
             sys.exit(0)
-        
+
         print()
-        print("ETAPA 4: Criando issues no GitHub...")
-        github_client = GitHubClient(
-            token=env["github_token"],
-            owner=env["github_owner"],
-            repo=env["github_repo"]
-        )
-        
-        issue_numbers = github_client.create_issues_from_cards(
-            cards=cards
-        )
-        
+        print("ETAPAS 4 e 5: Criando issues no GitHub e adicionando ao Project...")
+        github_client = build_github_client(env)
+        issue_numbers, _ = await create_and_add_issues(github_client, project_client, cards, profiler=profiler)
+
         if not issue_numbers:
             print("Erro: nenhuma issue foi criada")
             sys.exit(1)
-        
-        print()
-        print("ETAPA 5: Adicionando issues ao GitHub Project...")
-        project_client.add_issues_to_project(issue_numbers, cards)
-        
-        print()
-        print("=" * 60)
-        print("Processo concluído com sucesso!")
-        print("=" * 60)
-        print(f"Total de cards gerados (novos): {len(cards)}")
-        print(f"Total de issues criadas: {len(issue_numbers)}")
-        
-        frontend_count = sum(1 for c in cards if c.type.value == "Front-End")
-        backend_count = sum(1 for c in cards if c.type.value == "Back-End")
-        print(f"  - Front-End: {frontend_count}")
-        print(f"  - Back-End: {backend_count}")
-    
+
+        if save_revision:
+            save_revision()
+    finally:
+        await session.aclose()
+
+    print()
+    print("=" * 60)
+    print("Processo concluído com sucesso!")
+    print("=" * 60)
+    print(f"Total de cards gerados (novos): {len(cards)}")
+    print(f"Total de issues criadas: {len(issue_numbers)}")
+
+    frontend_count = sum(1 for c in cards if c.type.value == "Front-End")
+    backend_count = sum(1 for c in cards if c.type.value == "Back-End")
+    print(f"  - Front-End: {frontend_count}")
+    print(f"  - Back-End: {backend_count}")
+
+
+def extract_command(args: argparse.Namespace, profiler: StageProfiler):
+    pdf_paths = collect_inputs(args.inputs, ".pdf")
+    print(f"ETAPA 1: Extraindo {len(pdf_paths)} PDF(s) para {args.out}...")
+    with profiler.stage("extract"):
+        if args.workers > 0 and len(pdf_paths) > 1:
+            with ExtractionPool(workers=args.workers) as pool:
+                outputs = extract_stage(pdf_paths, args.out, read_pdf, force=args.force, read_many=pool.extract_many)
+            pool.metrics.print_summary()
+        else:
+            outputs = extract_stage(pdf_paths, args.out, read_pdf, force=args.force)
+    print(f"\nExtrações disponíveis: {len(outputs)}/{len(pdf_paths)}")
+
+
+def generate_command(args: argparse.Namespace, profiler: StageProfiler):
+    extracted_paths = collect_inputs(args.inputs, EXTRACTED_SUFFIX)
+    if args.document_id and len(extracted_paths) > 1:
+        print("Erro: --document-id identifica um único documento; informe uma extração por vez.")
+        sys.exit(1)
+    env = load_environment(GEMINI_VARS + GITHUB_VARS + ["GITHUB_PROJECT_ID"])
+    project_client = build_project_client(env)
+
+    print("ETAPA 2: Listando issues já existentes no GitHub Project...")
+    with profiler.stage("generate-issues-existentes"):
+        existing_issues = project_client.list_existing_project_issues()
+    print(f"Encontradas {len(existing_issues)} issues no Project.")
+
+    existing_block: Optional[str] = None
+
+    def shared_existing_block() -> str:
+        # Dimensionado uma única vez, para a maior extração, para o prefixo do prompt (e o
+        # cache de contexto) ser o mesmo em todos os documentos
+        nonlocal existing_block
+        if existing_block is None:
+            largest = max(document_tokens(read_extracted(path)[1]) for path in extracted_paths)
+            existing_block = fit_existing_block(existing_issues if existing_issues else None, largest, get_default_router())
+        return existing_block
+
+    def generate(pdf_content: PDFContent, source_pdf: str) -> Optional[List[Card]]:
+        save_revision = None
+        if args.incremental:
+            pdf_content, save_revision = prepare_incremental(source_pdf, pdf_content, args.document_id)
+            if pdf_content is None:
+                save_revision()
+                return []
+        try:
+            cards = generate_cards(
+                pdf_content,
+                env["gemini_api_key"],
+                existing_issues=existing_issues if existing_issues else None,
+                existing_block=shared_existing_block()
+            )
+        except Exception as e:
+            print(f"Erro ao gerar cards para {source_pdf}: {e}")
+            return None
+        if save_revision:
+            save_revision()
+        return cards
+
+    def generate_many(documents: List[Tuple[str, PDFContent, str]]) -> Dict[str, Optional[List[Card]]]:
+        results: Dict[str, Optional[List[Card]]] = {}
+        prepared = []
+        save_revisions = {}
+        for key, pdf_content, source_pdf in documents:
+            if args.incremental:
+                print(f"\n{source_pdf}:")
+                pdf_content, save_revisions[key] = prepare_incremental(source_pdf, pdf_content, args.document_id)
+                if pdf_content is None:
+                    save_revisions.pop(key)()
+                    results[key] = []
+                    continue
+            prepared.append((key, pdf_content))
+        try:
+            results.update(generate_cards_in_batch(
+                prepared,
+                env["gemini_api_key"],
+                existing_issues=existing_issues if existing_issues else None
+            ))
+        except Exception as e:
+            print(f"Erro no job de predição em lote: {e}")
+        for key, save_revision in save_revisions.items():
+            if results.get(key) is not None:
+                save_revision()
+        return results
+
+    print(f"\nETAPA 3: Gerando cards para {len(extracted_paths)} documento(s)...")
+    with profiler.stage("generate"):
+        if args.batch:
+            outputs = generate_stage_batch(extracted_paths, args.out, generate_many, force=args.force)
+        else:
+            outputs = generate_stage(extracted_paths, args.out, generate, force=args.force)
+    get_default_router().print_summary()
+    print(f"\nArquivos de cards disponíveis: {len(outputs)}/{len(extracted_paths)}")
+
+
+def publish_command(args: argparse.Namespace, profiler: StageProfiler):
+    cards_paths = collect_inputs(args.inputs, CARDS_SUFFIX)
+    env = load_environment(GITHUB_VARS + PROJECT_VARS)
+    github_client = build_github_client(env)
+    project_client = build_project_client(env)
+
+    def dedupe(documents: List[Tuple[str, List[Card]]]) -> Dict[str, List[Card]]:
+        print("Verificando duplicatas entre os documentos do lote e o Project...")
+        remaining, report = dedupe_batch(documents, project_client.list_existing_project_issues())
+        report.print_summary()
+        return remaining
+
+    print(f"ETAPAS 4-5: Publicando {len(cards_paths)} arquivo(s) de cards...")
+    with profiler.stage("publish"):
+        outputs = publish_stage(
+            cards_paths,
+            args.out,
+            lambda cards, state, save: publish_cards(github_client, project_client, cards, state, save),
+            force=args.force,
+            dedupe=dedupe
+        )
+    print(f"\nResultados de publicação disponíveis: {len(outputs)}/{len(cards_paths)}")
+
+
+COMMANDS = {
+    "run": run_command,
+    "extract": extract_command,
+    "generate": generate_command,
+    "publish": publish_command
+}
+
+
+def main():
+    args = parse_args()
+    profiler = StageProfiler(args.profile)
+
+    try:
+        COMMANDS[args.command](args, profiler)
     except KeyboardInterrupt:
         print("\n\nProcesso interrompido pelo usuário")
         sys.exit(1)
@@ -150,6 +544,10 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        get_governor().print_summary()
+        print_http_cache_summary()
+        profiler.print_summary()
 
 
 if __name__ == "__main__":
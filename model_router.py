@@ -0,0 +1,202 @@
+import os
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from local_cache import cache_dir
+
+
+DEFAULT_MODEL_TOKEN_LIMIT = 1_000_000
+RATE_LIMIT_COOLDOWN_S = float(os.getenv("GEMINI_RATE_LIMIT_COOLDOWN_S", "60"))
+SLOW_LATENCY_S = float(os.getenv("GEMINI_SLOW_LATENCY_S", "60"))
+LATENCY_EWMA_ALPHA = 0.3
+# Média de latência herdada de execuções anteriores só vale por este tempo após a última amostra
+LATENCY_MAX_AGE_S = float(os.getenv("GEMINI_LATENCY_MAX_AGE_S", "3600"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa rápida de tokens (~4 caracteres por token), suficiente para roteamento."""
+    return len(text or "") // 4 + 1
+
+
+@dataclass
+class ModelSpec:
+    name: str
+    max_prompt_tokens: int = DEFAULT_MODEL_TOKEN_LIMIT
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    successes: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    timeouts: int = 0
+    total_latency_s: float = 0.0
+    ewma_latency_s: Optional[float] = None
+    latency_sampled_at: float = 0.0  # epoch (time.time) da última amostra incluída em ewma_latency_s
+    cooldown_until: float = 0.0  # epoch (time.time) até quando o modelo fica de lado após 429
+
+    def observe_latency(self, latency_s: float) -> None:
+        self.total_latency_s += latency_s
+        self.latency_sampled_at = time.time()
+        if self.ewma_latency_s is None:
+            self.ewma_latency_s = latency_s
+        else:
+            self.ewma_latency_s = LATENCY_EWMA_ALPHA * latency_s + (1 - LATENCY_EWMA_ALPHA) * self.ewma_latency_s
+
+
+def parse_model_specs(raw: str) -> List[ModelSpec]:
+    """
+    Lê a lista de modelos no formato "modelo[:max_tokens],modelo[:max_tokens],...".
+
+    Args:
+        raw: Valor da variável GEMINI_MODELS
+
+    Returns:
+        Lista de ModelSpec na ordem de preferência
+    """
+    specs = []
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, limit = entry.rpartition(":")
+        if sep and limit.isdigit():
+            specs.append(ModelSpec(name=name, max_prompt_tokens=int(limit)))
+        else:
+            specs.append(ModelSpec(name=entry))
+    return specs
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo do Gemini para cada chamada a partir de uma lista ordenada de preferência.
+
+    - Descarta modelos cujo limite de tokens de prompt não comporta a requisição
+    - Coloca por último modelos em cooldown (429 recente) e modelos lentos (latência média acima do limite)
+    - Mantém estatísticas de latência e erros por modelo entre as chamadas do lote
+    """
+
+    def __init__(self, models: List[ModelSpec], state_path: Optional[str] = None):
+        if not models:
+            raise ValueError("ModelRouter precisa de pelo menos um modelo")
+        self.models = models
+        self.state_path = state_path
+        self.stats: Dict[str, ModelStats] = {m.name: ModelStats() for m in models}
+        self.decisions: List[str] = []
+        self._load_state()
+
+    @classmethod
+    def from_env(cls, default_model: str) -> "ModelRouter":
+        """Cria o roteador a partir de GEMINI_MODELS (ou só do modelo padrão), persistindo o estado no cache local."""
+        specs = parse_model_specs(os.getenv("GEMINI_MODELS", "")) or [ModelSpec(name=default_model)]
+        return cls(specs, state_path=str(cache_dir() / "model_router.json"))
+
+    def budget_for(self, prompt_tokens: int) -> ModelSpec:
+        """
+        Modelo preferido para um prompt do tamanho dado, sem considerar cooldown nem latência
+        (usado para definir o orçamento de tokens antes do roteamento de fato).
+        """
+        for spec in self.models:
+            if spec.max_prompt_tokens >= prompt_tokens:
+                return spec
+        return max(self.models, key=lambda m: m.max_prompt_tokens)
+
+    def route(self, prompt_tokens: int) -> List[str]:
+        """
+        Retorna os modelos candidatos, na ordem em que devem ser tentados, para um prompt do tamanho dado.
+        """
+        fitting = [m for m in self.models if m.max_prompt_tokens >= prompt_tokens]
+        if not fitting:
+            fitting = [max(self.models, key=lambda m: m.max_prompt_tokens)]
+
+        now = time.time()
+
+        def rank(item):
+            position, spec = item
+            st = self.stats[spec.name]
+            cooling = st.cooldown_until > now
+            slow = st.ewma_latency_s is not None and st.ewma_latency_s > SLOW_LATENCY_S
+            return (cooling, st.cooldown_until if cooling else 0.0, slow, position)
+
+        ordered = [spec.name for _, spec in sorted(enumerate(fitting), key=rank)]
+        skipped = [m.name for m in self.models if m.name not in ordered]
+        decision = f"~{prompt_tokens} tokens → {ordered[0]}"
+        if len(ordered) > 1:
+            decision += f" (reservas: {', '.join(ordered[1:])})"
+        if skipped:
+            decision += f" [fora do limite de tokens: {', '.join(skipped)}]"
+        self.decisions.append(decision)
+        print(f"Roteamento de modelo: {decision}")
+        return ordered
+
+    def record_success(self, model: str, latency_s: float) -> None:
+        st = self.stats.setdefault(model, ModelStats())
+        st.calls += 1
+        st.successes += 1
+        st.observe_latency(latency_s)
+        if latency_s > SLOW_LATENCY_S:
+            self.decisions.append(f"{model} lento ({latency_s:.1f}s) → rebaixado nas próximas chamadas")
+        self._save_state()
+
+    def record_failure(self, model: str, latency_s: float, rate_limited: bool = False, timeout: bool = False) -> None:
+        st = self.stats.setdefault(model, ModelStats())
+        st.calls += 1
+        st.errors += 1
+        if rate_limited:
+            st.rate_limited += 1
+            st.cooldown_until = time.time() + RATE_LIMIT_COOLDOWN_S
+        if timeout:
+            st.timeouts += 1
+            st.observe_latency(latency_s)
+        self._save_state()
+
+    def record_fallback(self, from_model: str, to_model: str, reason: str) -> None:
+        decision = f"{from_model} {reason} → {to_model}"
+        self.decisions.append(decision)
+        print(f"Roteamento de modelo: {decision}")
+
+    def print_summary(self) -> None:
+        """Imprime as decisões de roteamento e as estatísticas por modelo."""
+        if self.decisions:
+            print("Decisões de roteamento de modelo:")
+            for decision in self.decisions:
+                print(f"  - {decision}")
+        print("Estatísticas por modelo:")
+        for name, st in self.stats.items():
+            if not st.calls:
+                continue
+            avg = st.total_latency_s / st.calls
+            print(
+                f"  - {name}: {st.calls} chamadas, {st.successes} ok, {st.errors} erros "
+                f"({st.rate_limited}x 429, {st.timeouts}x timeout), latência média {avg:.1f}s"
+            )
+
+    def _load_state(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            for name, raw in data.items():
+                if name in self.stats:
+                    # Só o estado que importa para rotear é herdado de execuções anteriores;
+                    # a média de latência expira como o cooldown (sem data = estado antigo, descartado)
+                    self.stats[name].cooldown_until = float(raw.get("cooldown_until", 0.0))
+                    sampled_at = float(raw.get("latency_sampled_at") or 0.0)
+                    if raw.get("ewma_latency_s") is not None and now - sampled_at <= LATENCY_MAX_AGE_S:
+                        self.stats[name].ewma_latency_s = float(raw["ewma_latency_s"])
+                        self.stats[name].latency_sampled_at = sampled_at
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Aviso: não foi possível ler o estado do roteador de modelos: {e}")
+
+    def _save_state(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "w", encoding="utf-8") as f:
+                json.dump({name: asdict(st) for name, st in self.stats.items()}, f)
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o estado do roteador de modelos: {e}")
@@ -1,5 +1,7 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import json
+from dataclasses import dataclass, field, fields, MISSING
+from json.encoder import encode_basestring
+from typing import Iterable, List, Optional, get_args, get_origin, get_type_hints, Union
 from enum import Enum
 
 
@@ -8,7 +10,7 @@ class CardType(str, Enum):
     BACKEND = "Back-End"
 
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     title: str
     description: str
@@ -44,15 +46,168 @@ class Card:
             parent_index=parent_index
         )
 
+    @classmethod
+    def response_schema(cls) -> dict:
+        """
+        Schema de resposta (formato do Gemini) de uma lista de cards, derivado dos campos do dataclass.
+        """
+        hints = get_type_hints(cls)
+        properties = {}
+        required = []
+        for f in fields(cls):
+            properties[f.name] = _schema_for_type(hints[f.name])
+            if f.default is MISSING and f.default_factory is MISSING:
+                required.append(f.name)
+        return {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": properties,
+                "required": required,
+                "property_ordering": [f.name for f in fields(cls)]
+            }
+        }
+
+
+def _schema_for_type(tp) -> dict:
+    if get_origin(tp) is Union:
+        args = [a for a in get_args(tp) if a is not type(None)]
+        schema = _schema_for_type(args[0])
+        schema["nullable"] = True
+        return schema
+    if get_origin(tp) in (list, List):
+        return {"type": "ARRAY", "items": _schema_for_type(get_args(tp)[0])}
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return {"type": "STRING", "enum": [member.value for member in tp]}
+    if tp is bool:
+        return {"type": "BOOLEAN"}
+    if tp is int:
+        return {"type": "INTEGER"}
+    if tp is float:
+        return {"type": "NUMBER"}
+    return {"type": "STRING"}
+
+
+# ---------------------------------------------------------------------------
+# Serialização em lote (JSONL)
+# ---------------------------------------------------------------------------
+
+_TYPE_BY_VALUE = {member.value: member for member in CardType}
+_TYPE_JSON = {member: encode_basestring(member.value) for member in CardType}
+_CARD_TYPES = frozenset(CardType)
+_PARENT_TYPES = frozenset((int, type(None)))
+
+
+def _coerce_parent_index(raw) -> Optional[int]:
+    # Mesma tolerância de Card.from_dict para valores que não são int nem null
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _card_from_object(obj) -> Card:
+    """Monta o Card a partir do objeto de uma linha (só o nível de cima; objetos aninhados ficam como dict)."""
+    if type(obj) is not dict:
+        raise ValueError("linha de card não é um objeto JSON")
+    title = obj.get("title")
+    description = obj.get("description")
+    card_type = obj.get("type")
+    if title is None or description is None or card_type is None:
+        raise ValueError("card sem title, description ou type")
+    return Card(
+        title,
+        description,
+        _TYPE_BY_VALUE.get(card_type, card_type),
+        obj.get("acceptance_criteria", []),
+        obj.get("parent_index")
+    )
+
+
+_CARD_DECODER = json.JSONDecoder()
+
+
+def _validate_batch(cards: List[Card]) -> None:
+    unknown = {card.type for card in cards} - _CARD_TYPES
+    if unknown:
+        raise ValueError(f"Tipo de card inválido: {', '.join(sorted(map(str, unknown)))}")
+    if not {type(card.parent_index) for card in cards} <= _PARENT_TYPES:
+        for card in cards:
+            if type(card.parent_index) not in _PARENT_TYPES:
+                card.parent_index = _coerce_parent_index(card.parent_index)
+
+
+def encode_cards_jsonl(cards: List[Card]) -> str:
+    """
+    Serializa os cards em JSONL (uma linha por card, mesmo conteúdo de `json.dumps(card.to_dict())`
+    com ensure_ascii=False), sem montar um dict por card. Tipos e parent_index são validados
+    uma vez para o lote; cards com campos que não são texto caem no `json.dumps`.
+    """
+    _validate_batch(cards)
+    type_json = _TYPE_JSON
+    lines = []
+    for card in cards:
+        try:
+            if type(card.acceptance_criteria) is not list:
+                raise TypeError("acceptance_criteria não é lista")
+            line = (
+                '{"title": ' + encode_basestring(card.title)
+                + ', "description": ' + encode_basestring(card.description)
+                + ', "type": ' + type_json[card.type]
+                + ', "acceptance_criteria": [' + ", ".join(map(encode_basestring, card.acceptance_criteria)) + "]"
+            )
+        except TypeError:
+            # Valores que não são texto (ex.: critério numérico aceito por from_dict) saem como no json.dumps
+            lines.append(json.dumps(card.to_dict(), ensure_ascii=False) + "\n")
+            continue
+        if card.parent_index is not None:
+            line += f', "parent_index": {card.parent_index}'
+        lines.append(line + "}\n")
+    return "".join(lines)
+
+
+def decode_cards_jsonl(lines: Iterable[str]) -> List[Card]:
+    """
+    Lê cards em JSONL (linhas vazias são ignoradas). Cada linha vira um Card a partir do
+    objeto de nível mais alto, e tipos e parent_index são validados uma vez para o lote.
+
+    Raises:
+        ValueError: JSON inválido, campo obrigatório ausente ou tipo de card desconhecido
+    """
+    decode = _CARD_DECODER.decode
+    cards = [_card_from_object(decode(line)) for line in lines if line and not line.isspace()]
+    _validate_batch(cards)
+    return cards
+
 
 @dataclass
 class PDFContent:
     text: str
     tables_json: List[dict]
+    pages: List[str] = field(default_factory=list)  # texto de cada página (índice 0 = página 1); vazio se não extraído
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text,
+            "tables_json": self.tables_json,
+            "pages": self.pages
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PDFContent":
+        return cls(
+            text=data.get("text", ""),
+            tables_json=data.get("tables_json", []),
+            pages=data.get("pages", [])
+        )
 
     def to_prompt(self) -> str:
+        return self.format_prompt(self.text, str(self.tables_json))
+
+    @staticmethod
+    def format_prompt(text: str, tables_text: str) -> str:
         prompt = "=== TEXTO DO PDF ===\n\n"
-        prompt += self.text
+        prompt += text
         prompt += "\n\n=== TABELAS DO PDF ===\n\n"
-        prompt += str(self.tables_json)
+        prompt += tables_text
         return prompt
@@ -1,9 +1,74 @@
+import os
 import pdfplumber
 import json
-from typing import List, Dict
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Tuple
 from models import PDFContent
 
 
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pdfplumber")
+# Páginas com ao menos esta quantidade de objetos de desenho (linhas/retângulos) são tratadas
+# como candidatas a ter tabela no modo híbrido
+HYBRID_MIN_PATH_OBJECTS = int(os.getenv("PDF_HYBRID_MIN_PATH_OBJECTS", "4"))
+
+
+def _tables_to_dicts(page_num: int, page_tables: List[List]) -> List[Dict]:
+    tables = []
+    for table_num, table in enumerate(page_tables, start=1):
+        if not table or len(table) == 0:
+            continue
+        
+        table_dict = {
+            "page": page_num,
+            "table_number": table_num,
+            "headers": table[0] if table else [],
+            "rows": table[1:] if len(table) > 1 else [],
+            "row_count": len(table) - 1 if len(table) > 1 else 0
+        }
+        tables.append(table_dict)
+    return tables
+
+
+class PDFExtractor(ABC):
+    """
+    Backend de extração de PDF usado por `read_pdf`.
+    Implementações: pdfplumber (padrão, preciso em tabelas), pypdfium2 (rápido, só texto)
+    e hybrid (texto pelo pypdfium2, tabelas pelo pdfplumber só nas páginas com desenhos).
+    """
+    
+    name = ""
+    
+    @abstractmethod
+    def extract(self, pdf_path: str) -> Tuple[List[str], List[Dict]]:
+        """
+        Returns:
+            (texto de cada página, tabelas no formato de `extract_tables_from_pdf`)
+        """
+
+
+class PdfplumberExtractor(PDFExtractor):
+    """Texto e tabelas pelo pdfplumber, abrindo o arquivo uma única vez."""
+    
+    name = "pdfplumber"
+    
+    def extract(self, pdf_path: str) -> Tuple[List[str], List[Dict]]:
+        pages = []
+        tables = []
+        try:
+            with pdfplumber.open(pdf_path) as pdf:
+                for page_num, page in enumerate(pdf.pages, start=1):
+                    pages.append(page.extract_text() or "")
+                    # Falha nas tabelas de uma página não descarta o texto já extraído
+                    try:
+                        tables.extend(_tables_to_dicts(page_num, page.extract_tables()))
+                    except Exception as e:
+                        print(f"Erro ao extrair tabelas da página {page_num}: {e}")
+        except Exception as e:
+            print(f"Erro ao extrair PDF com pdfplumber: {e}")
+            return [], []
+        return pages, tables
+
+
 def extract_tables_from_pdf(pdf_path: str) -> List[Dict]:
     """
     Extrai tabelas do PDF usando pdfplumber e converte para JSON.
@@ -14,36 +79,12 @@ def extract_tables_from_pdf(pdf_path: str) -> List[Dict]:
     Returns:
         Lista de dicionários representando as tabelas
     """
-    tables = []
-    
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                page_tables = page.extract_tables()
-                
-                for table_num, table in enumerate(page_tables, start=1):
-                    if not table or len(table) == 0:
-                        continue
-                    
-                    table_dict = {
-                        "page": page_num,
-                        "table_number": table_num,
-                        "headers": table[0] if table else [],
-                        "rows": table[1:] if len(table) > 1 else [],
-                        "row_count": len(table) - 1 if len(table) > 1 else 0
-                    }
-                    tables.append(table_dict)
-    
-    except Exception as e:
-        print(f"Erro ao extrair tabelas: {e}")
-        return []
-    
-    return tables
+    return PdfplumberExtractor().extract(pdf_path)[1]
 
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
-    Extrai todo o texto do PDF.
+    Extrai todo o texto do PDF usando pdfplumber.
     
     Args:
         pdf_path: Caminho para o arquivo PDF
@@ -51,38 +92,134 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     Returns:
         Texto completo do PDF
     """
-    text_content = []
-    
+    pages, _ = PdfplumberExtractor().extract(pdf_path)
+    return "\n\n".join(text for text in pages if text)
+
+
+def _require_pdfium():
+    try:
+        import pypdfium2
+        import pypdfium2.raw
+    except ImportError as e:
+        raise RuntimeError("Backend de PDF requer pypdfium2 (instalado junto com pdfplumber>=0.10)") from e
+    return pypdfium2
+
+
+def _pdfium_page_text(page) -> str:
+    textpage = page.get_textpage()
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
+        return (textpage.get_text_range() or "").replace("\r\n", "\n").strip()
+    finally:
+        textpage.close()
+
+
+class PdfiumExtractor(PDFExtractor):
+    """Só texto, pelo pypdfium2 (PDFium): bem mais rápido que o pdfplumber, sem tabelas."""
+    
+    name = "pypdfium2"
+    
+    def extract(self, pdf_path: str) -> Tuple[List[str], List[Dict]]:
+        pdfium = _require_pdfium()
+        pages = []
+        try:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                for index in range(len(pdf)):
+                    page = pdf[index]
+                    pages.append(_pdfium_page_text(page))
+                    page.close()
+            finally:
+                pdf.close()
+        except Exception as e:
+            print(f"Erro ao extrair texto com pypdfium2: {e}")
+            return [], []
+        return pages, []
+
+
+class HybridExtractor(PDFExtractor):
+    """
+    Texto pelo pypdfium2 e tabelas pelo pdfplumber apenas nas páginas que têm objetos de
+    desenho (linhas e retângulos, que formam as bordas de tabelas). Páginas só de texto
+    não passam pelo pdfplumber.
+    """
     
-    except Exception as e:
-        print(f"Erro ao extrair texto: {e}")
-        return ""
+    name = "hybrid"
     
-    return "\n\n".join(text_content)
+    def __init__(self, min_path_objects: int = HYBRID_MIN_PATH_OBJECTS):
+        self.min_path_objects = min_path_objects
+    
+    def extract(self, pdf_path: str) -> Tuple[List[str], List[Dict]]:
+        pdfium = _require_pdfium()
+        pages = []
+        table_pages = []
+        try:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                for index in range(len(pdf)):
+                    page = pdf[index]
+                    pages.append(_pdfium_page_text(page))
+                    paths = 0
+                    for _ in page.get_objects(filter=(pdfium.raw.FPDF_PAGEOBJ_PATH,)):
+                        paths += 1
+                        if paths >= self.min_path_objects:
+                            table_pages.append(index)
+                            break
+                    page.close()
+            finally:
+                pdf.close()
+        except Exception as e:
+            print(f"Erro ao extrair texto com pypdfium2: {e}")
+            return [], []
+        
+        tables = []
+        if table_pages:
+            try:
+                with pdfplumber.open(pdf_path, pages=[i + 1 for i in table_pages]) as plumber_pdf:
+                    for page in plumber_pdf.pages:
+                        try:
+                            tables.extend(_tables_to_dicts(page.page_number, page.extract_tables()))
+                        except Exception as e:
+                            print(f"Erro ao extrair tabelas da página {page.page_number}: {e}")
+            except Exception as e:
+                print(f"Erro ao extrair tabelas: {e}")
+        return pages, tables
+
+
+EXTRACTORS = {
+    PdfplumberExtractor.name: PdfplumberExtractor,
+    PdfiumExtractor.name: PdfiumExtractor,
+    HybridExtractor.name: HybridExtractor
+}
+
+
+def get_extractor(name: Optional[str] = None) -> PDFExtractor:
+    """
+    Retorna o backend de extração pelo nome (padrão: PDF_BACKEND do ambiente ou pdfplumber).
+    """
+    name = (name or PDF_BACKEND).strip().lower()
+    if name not in EXTRACTORS:
+        raise ValueError(f"Backend de PDF desconhecido: {name} (opções: {', '.join(EXTRACTORS)})")
+    return EXTRACTORS[name]()
 
 
-def read_pdf(pdf_path: str) -> PDFContent:
+def read_pdf(pdf_path: str, extractor: Optional[PDFExtractor] = None) -> PDFContent:
     """
     Lê o PDF e extrai tanto texto quanto tabelas.
     
     Args:
         pdf_path: Caminho para o arquivo PDF
+        extractor: Backend de extração (padrão: definido por PDF_BACKEND)
         
     Returns:
         PDFContent com texto e tabelas em JSON
     """
-    print(f"Lendo PDF: {pdf_path}")
+    extractor = extractor or get_extractor()
+    print(f"Lendo PDF: {pdf_path} (backend: {extractor.name})")
     
-    text = extract_text_from_pdf(pdf_path)
-    tables = extract_tables_from_pdf(pdf_path)
+    pages, tables = extractor.extract(pdf_path)
+    text = "\n\n".join(page_text for page_text in pages if page_text)
     
     print(f"Texto extraído: {len(text)} caracteres")
     print(f"Tabelas encontradas: {len(tables)}")
     
-    return PDFContent(text=text, tables_json=tables)
+    return PDFContent(text=text, tables_json=tables, pages=pages)
@@ -0,0 +1,428 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from models import Card, PDFContent, decode_cards_jsonl, encode_cards_jsonl
+
+
+ARTIFACT_VERSION = 1
+
+EXTRACTED_SUFFIX = ".extracted.json"
+CARDS_SUFFIX = ".cards.jsonl"
+PUBLISH_SUFFIX = ".publish.json"
+
+EXTRACTED_FORMAT = "card-creator/extracted"
+CARDS_FORMAT = "card-creator/cards"
+PUBLISH_FORMAT = "card-creator/publish"
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def artifact_stem(path) -> str:
+    """Nome base comum aos artefatos de um documento (ex.: "spec.cards.jsonl" → "spec")."""
+    name = Path(path).name
+    for suffix in (EXTRACTED_SUFFIX, CARDS_SUFFIX, PUBLISH_SUFFIX, ".pdf"):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return Path(path).stem
+
+
+def collect_inputs(inputs: List[str], suffix: str) -> List[Path]:
+    """
+    Expande as entradas de uma etapa: arquivos são usados como estão, pastas contribuem
+    com todos os arquivos terminados em `suffix`.
+    """
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(sorted(f for f in p.iterdir() if f.name.lower().endswith(suffix)))
+        elif p.exists():
+            paths.append(p)
+        else:
+            print(f"Aviso: entrada não encontrada: {item}")
+    return paths
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _read_header(path: Path) -> Optional[dict]:
+    """Lê o cabeçalho de um artefato (objeto JSON inteiro ou primeira linha de um JSONL)."""
+    if not path.exists():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            if path.name.endswith(".jsonl"):
+                return json.loads(f.readline())
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(output: Path, fmt: str, source_sha256: str) -> bool:
+    """
+    Um artefato está atualizado se tem o formato/versão atuais e foi gerado a partir da mesma
+    entrada; um resultado de publicação também precisa estar completo.
+    """
+    header = _read_header(output)
+    return bool(
+        header
+        and header.get("format") == fmt
+        and header.get("version") == ARTIFACT_VERSION
+        and header.get("source_sha256") == source_sha256
+        and (fmt != PUBLISH_FORMAT or header.get("complete") is True)
+    )
+
+
+@dataclass
+class PublishState:
+    """
+    Situação de cada card de um arquivo de cards na publicação, gravada em `<nome>.publish.json`
+    para que uma publicação parcial seja retomada apenas com os cards que ficaram sem issue.
+    """
+    issues: List[Optional[str]]                          # número da issue de cada card do arquivo, ou None
+    deduplicated: Set[int] = field(default_factory=set)  # descartados pela deduplicação (não são publicados)
+    uncertain: Set[int] = field(default_factory=set)     # criação com resultado incerto: conferir antes de recriar
+    uncertain_since: float = 0.0                         # instante (epoch) da tentativa incerta mais antiga
+    added_to_project: int = 0
+    project_pending: Set[int] = field(default_factory=set)  # com issue, ainda não adicionados ao Project
+
+    def pending(self) -> List[int]:
+        """Índices dos cards que ainda não têm issue (incluindo os de resultado incerto)."""
+        return [i for i, number in enumerate(self.issues) if number is None and i not in self.deduplicated]
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending() and not self.project_pending
+
+    def to_dict(self) -> dict:
+        return {
+            "complete": self.complete,
+            "issues": self.issues,
+            "deduplicated_cards": sorted(self.deduplicated),
+            "uncertain": sorted(self.uncertain),
+            "uncertain_since": self.uncertain_since,
+            "added_to_project": self.added_to_project,
+            "project_pending": sorted(self.project_pending),
+            "deduplicated": len(self.deduplicated)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, card_count: int) -> Optional["PublishState"]:
+        """Estado de um resultado anterior, ou None se ele não tem o registro por card."""
+        issues = data.get("issues")
+        if "deduplicated_cards" not in data or not isinstance(issues, list) or len(issues) != card_count:
+            return None
+        return cls(
+            issues=[str(n) if n is not None else None for n in issues],
+            deduplicated=set(data.get("deduplicated_cards") or []),
+            uncertain=set(data.get("uncertain") or []),
+            uncertain_since=float(data.get("uncertain_since") or 0.0),
+            added_to_project=int(data.get("added_to_project") or 0),
+            project_pending=set(data.get("project_pending") or [])
+        )
+
+
+# ---------------------------------------------------------------------------
+# Leitura e escrita dos artefatos
+# ---------------------------------------------------------------------------
+
+def write_extracted(path: Path, source: Path, source_sha256: str, content: PDFContent) -> None:
+    _write_json_atomic(path, {
+        "format": EXTRACTED_FORMAT,
+        "version": ARTIFACT_VERSION,
+        # Caminho absoluto: identifica o documento no modo incremental de `generate`
+        "source": str(Path(source).resolve()),
+        "source_sha256": source_sha256,
+        "content": content.to_dict()
+    })
+
+
+def read_extracted(path: Path) -> Tuple[dict, PDFContent]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data.get("format") != EXTRACTED_FORMAT or data.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"{path} não é um artefato de extração compatível (versão {ARTIFACT_VERSION})")
+    return data, PDFContent.from_dict(data["content"])
+
+
+def write_cards(path: Path, source: Path, source_sha256: str, cards: List[Card]) -> None:
+    header = {
+        "format": CARDS_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "source": str(source),
+        "source_sha256": source_sha256,
+        "count": len(cards)
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        f.write(encode_cards_jsonl(cards))
+    tmp.replace(path)
+
+
+def read_cards(path: Path) -> Tuple[dict, List[Card]]:
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != CARDS_FORMAT or header.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"{path} não é um artefato de cards compatível (versão {ARTIFACT_VERSION})")
+        cards = decode_cards_jsonl(f)
+    return header, cards
+
+
+# ---------------------------------------------------------------------------
+# Etapas
+# ---------------------------------------------------------------------------
+
+def extract_stage(
+    pdf_paths: List[Path],
+    out_dir: Path,
+    read_pdf: Callable[[str], PDFContent],
+    force: bool = False,
+    read_many: Optional[Callable[[List[Path]], Iterable[Tuple[Path, Optional[PDFContent]]]]] = None
+) -> List[Path]:
+    """
+    Extrai texto e tabelas de cada PDF para `<nome>.extracted.json` em `out_dir`.
+
+    Args:
+        read_many: Extração de vários PDFs de uma vez (ex.: ExtractionPool.extract_many),
+            devolvendo (caminho, conteúdo ou None) na ordem em que terminam; sem ela, cada
+            PDF é lido em sequência com `read_pdf`
+
+    Returns:
+        Caminhos dos artefatos de extração (novos ou já atualizados), na ordem dos PDFs
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    outputs: Dict[Path, Path] = {}
+    pending: Dict[Path, Tuple[Path, str]] = {}
+    for pdf_path in pdf_paths:
+        output = out_dir / f"{artifact_stem(pdf_path)}{EXTRACTED_SUFFIX}"
+        source_sha = file_sha256(pdf_path)
+        if not force and is_up_to_date(output, EXTRACTED_FORMAT, source_sha):
+            print(f"Extração atualizada, pulando: {pdf_path}")
+            outputs[pdf_path] = output
+            continue
+        pending[pdf_path] = (output, source_sha)
+
+    if read_many is not None and pending:
+        results = read_many(list(pending))
+    else:
+        results = ((pdf_path, read_pdf(str(pdf_path))) for pdf_path in pending)
+
+    for pdf_path, content in results:
+        if content is None:
+            continue
+        if not content.text.strip() and not content.tables_json:
+            print(f"Aviso: nenhum conteúdo encontrado em {pdf_path}; artefato não gerado")
+            continue
+        output, source_sha = pending[pdf_path]
+        write_extracted(output, pdf_path, source_sha, content)
+        print(f"Extração salva: {output}")
+        outputs[pdf_path] = output
+    return [outputs[pdf_path] for pdf_path in pdf_paths if pdf_path in outputs]
+
+
+def _pending_generation(
+    extracted_paths: List[Path],
+    out_dir: Path,
+    force: bool
+) -> Tuple[List[Path], List[Tuple[Path, Path, str]]]:
+    """
+    Separa os artefatos de extração cujos cards já estão atualizados dos que precisam ser gerados.
+
+    Returns:
+        (saídas atualizadas, lista de (extração, saída, sha256 da extração) a gerar)
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    up_to_date = []
+    pending = []
+    for extracted_path in extracted_paths:
+        output = out_dir / f"{artifact_stem(extracted_path)}{CARDS_SUFFIX}"
+        source_sha = file_sha256(extracted_path)
+        if not force and is_up_to_date(output, CARDS_FORMAT, source_sha):
+            print(f"Cards atualizados, pulando: {extracted_path}")
+            up_to_date.append(output)
+            continue
+        pending.append((extracted_path, output, source_sha))
+    return up_to_date, pending
+
+
+def generate_stage(
+    extracted_paths: List[Path],
+    out_dir: Path,
+    generate: Callable[[PDFContent, str], Optional[List[Card]]],
+    force: bool = False
+) -> List[Path]:
+    """
+    Gera os cards de cada artefato de extração para `<nome>.cards.jsonl` em `out_dir`.
+    `generate` recebe o conteúdo e o caminho do PDF original; retornar None pula o documento
+    sem gravar saída (ex.: falha que deve ser refeita na próxima execução).
+
+    Returns:
+        Caminhos dos artefatos de cards (novos ou já atualizados)
+    """
+    outputs, pending = _pending_generation(extracted_paths, out_dir, force)
+    for extracted_path, output, source_sha in pending:
+        data, content = read_extracted(extracted_path)
+        print(f"\nGerando cards: {extracted_path}")
+        cards = generate(content, data["source"])
+        if cards is None:
+            continue
+        write_cards(output, extracted_path, source_sha, cards)
+        print(f"Cards salvos: {output} ({len(cards)})")
+        outputs.append(output)
+    return outputs
+
+
+def generate_stage_batch(
+    extracted_paths: List[Path],
+    out_dir: Path,
+    generate_many: Callable[[List[Tuple[str, PDFContent, str]]], Dict[str, Optional[List[Card]]]],
+    force: bool = False
+) -> List[Path]:
+    """
+    Variante de `generate_stage` que entrega todos os documentos pendentes de uma vez
+    (ex.: um único job de predição em lote).
+
+    Args:
+        generate_many: Recebe (caminho da extração, conteúdo, caminho do PDF original) de cada
+            documento e retorna os cards por caminho da extração (None ou ausente pula o
+            documento sem gravar saída)
+
+    Returns:
+        Caminhos dos artefatos de cards (novos ou já atualizados)
+    """
+    outputs, pending = _pending_generation(extracted_paths, out_dir, force)
+    if not pending:
+        return outputs
+
+    documents = []
+    for extracted_path, _, _ in pending:
+        data, content = read_extracted(extracted_path)
+        documents.append((str(extracted_path), content, data["source"]))
+
+    print(f"\nGerando cards em lote para {len(documents)} documento(s)...")
+    cards_by_key = generate_many(documents)
+
+    for extracted_path, output, source_sha in pending:
+        cards = cards_by_key.get(str(extracted_path))
+        if cards is None:
+            print(f"Aviso: cards não gerados para {extracted_path}")
+            continue
+        write_cards(output, extracted_path, source_sha, cards)
+        print(f"Cards salvos: {output} ({len(cards)})")
+        outputs.append(output)
+    return outputs
+
+
+def _state_after_dedupe(cards: List[Card], kept: List[Card]) -> PublishState:
+    """
+    Estado inicial de um arquivo de cards após a deduplicação: os cards descartados ficam
+    de fora e o parent_index dos mantidos volta a se referir à posição no arquivo.
+    """
+    position = {id(card): i for i, card in enumerate(cards)}
+    kept_positions = [position[id(card)] for card in kept]
+    for card in kept:
+        if card.parent_index is not None:
+            card.parent_index = kept_positions[card.parent_index]
+    return PublishState(issues=[None] * len(cards), deduplicated=set(range(len(cards))) - set(kept_positions))
+
+
+def publish_stage(
+    cards_paths: List[Path],
+    out_dir: Path,
+    publish: Callable[[List[Card], PublishState, Callable[[], None]], None],
+    force: bool = False,
+    dedupe: Optional[Callable[[List[Tuple[str, List[Card]]]], Dict[str, List[Card]]]] = None
+) -> List[Path]:
+    """
+    Cria as issues e as adiciona ao Project para cada artefato de cards, gravando
+    `<nome>.publish.json` com a issue de cada card. Um artefato já publicado por completo
+    a partir do mesmo arquivo de cards é pulado; um publicado em parte é retomado só com os
+    cards que ficaram sem issue, para que executar a etapa de novo não duplique issues.
+    O resultado é gravado também durante a publicação e quando ela é interrompida.
+
+    Args:
+        publish: Recebe os cards do arquivo, o PublishState e uma função que grava o estado
+            atual; cria as issues de `state.pending()`, atualiza o estado (issues, resultados
+            incertos, adicionadas ao Project) e grava-o a cada lote confirmado
+        dedupe: Recebe (caminho, cards) dos arquivos publicados pela primeira vez e retorna os
+            cards restantes (os mesmos objetos) por caminho, antes de qualquer issue ser criada
+
+    Returns:
+        Caminhos dos resultados de publicação
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    outputs = []
+    pending = []
+    for cards_path in cards_paths:
+        output = out_dir / f"{artifact_stem(cards_path)}{PUBLISH_SUFFIX}"
+        source_sha = file_sha256(cards_path)
+        if not force and is_up_to_date(output, PUBLISH_FORMAT, source_sha):
+            print(f"Já publicado, pulando: {cards_path}")
+            outputs.append(output)
+            continue
+        _, cards = read_cards(cards_path)
+        state = None
+        previous = None if force else _read_header(output)
+        if previous and previous.get("format") == PUBLISH_FORMAT and previous.get("version") == ARTIFACT_VERSION \
+                and previous.get("source_sha256") == source_sha:
+            state = PublishState.from_dict(previous, len(cards))
+            if state is None:
+                print(f"Aviso: {output} é uma publicação parcial sem registro por card; use --force para publicar {cards_path} de novo.")
+                outputs.append(output)
+                continue
+        pending.append((cards_path, output, source_sha, cards, state))
+
+    fresh = [(str(cards_path), cards) for cards_path, _, _, cards, state in pending if state is None]
+    remaining = dedupe(fresh) if dedupe and fresh else {}
+
+    for cards_path, output, source_sha, cards, state in pending:
+        if state is not None:
+            print(f"\nRetomando publicação: {len(state.pending())} cards sem issue em {cards_path}")
+        else:
+            if dedupe:
+                state = _state_after_dedupe(cards, remaining.get(str(cards_path), []))
+            else:
+                state = PublishState(issues=[None] * len(cards))
+            print(f"\nPublicando {len(state.pending())} cards: {cards_path}")
+
+        def save(output=output, cards_path=cards_path, source_sha=source_sha, state=state) -> None:
+            _write_json_atomic(output, {
+                "format": PUBLISH_FORMAT,
+                "version": ARTIFACT_VERSION,
+                "source": str(cards_path),
+                "source_sha256": source_sha,
+                **state.to_dict()
+            })
+
+        try:
+            if not state.complete:
+                publish(cards, state, save)
+        finally:
+            # Grava mesmo se a publicação for interrompida, para a próxima execução não recriar as issues
+            save()
+        if not state.complete:
+            print(
+                f"Aviso: {len(state.pending())} cards sem issue em {cards_path} "
+                f"({len(state.uncertain)} com resultado incerto, {len(state.project_pending)} fora do Project); "
+                "a próxima execução retoma só esses cards"
+            )
+        print(f"Resultado salvo: {output}")
+        outputs.append(output)
+    return outputs
+
+
+def default_artifacts_dir() -> Path:
+    return Path(os.getenv("CARD_CREATOR_ARTIFACTS_DIR", "artifacts"))
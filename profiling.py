@@ -0,0 +1,164 @@
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+
+SAMPLE_INTERVAL_S = 0.005
+TOP_ALLOCATIONS = 25
+PEAK_SNAPSHOT_GROWTH = 1.1  # novo snapshot quando a memória alocada cresce 10% acima do maior já visto
+
+
+class _StackSampler(threading.Thread):
+    """
+    Amostra periodicamente a pilha de uma thread e acumula pilhas no formato "collapsed"
+    (funções separadas por ";", da raiz para a folha), usado por flamegraph.pl/speedscope.
+    Também guarda um snapshot do tracemalloc próximo ao pico de memória da etapa.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = SAMPLE_INTERVAL_S):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_seen = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self._peak_seen * PEAK_SNAPSHOT_GROWTH:
+                self._peak_seen = current
+                self.peak_snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class StageProfiler:
+    """
+    Perfila cada etapa do pipeline com cProfile, amostragem de pilha e tracemalloc.
+
+    Para cada etapa são gravados em `out_dir`:
+      - <etapa>.pstats      estatísticas do cProfile (abrir com pstats/snakeviz)
+      - <etapa>.collapsed   pilhas amostradas no formato collapsed (flamegraph)
+      - <etapa>.mem.txt     pico de memória e maiores alocações (tracemalloc)
+
+    Desabilitado (out_dir=None), `stage()` não faz nada além de um yield.
+    """
+
+    def __init__(self, out_dir: Optional[Path] = None):
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.summary: List[str] = []
+        # Etapas podem rodar em paralelo (threads e event loop): o tracemalloc só é
+        # parado quando a última etapa ativa termina
+        self._lock = threading.Lock()
+        self._active = 0
+        self._started_tracing = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.out_dir is not None
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.out_dir is None:
+            yield
+            return
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._active == 0:
+                self._started_tracing = not tracemalloc.is_tracing()
+                if self._started_tracing:
+                    tracemalloc.start(25)
+                tracemalloc.reset_peak()
+            self._active += 1
+
+        sampler = _StackSampler(threading.get_ident())
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            profile.enable()
+        except ValueError:
+            # A partir do Python 3.12 só um cProfile fica ativo por vez no processo: a etapa
+            # que começou depois fica só com a amostragem de pilha e a memória
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = sampler.peak_snapshot or tracemalloc.take_snapshot()
+            with self._lock:
+                self._active -= 1
+                if self._active == 0 and self._started_tracing:
+                    tracemalloc.stop()
+            self._write(name, profile, sampler, snapshot, peak, elapsed)
+
+    def run(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Executa `fn(*args, **kwargs)` dentro de `stage(name)` na thread atual.
+
+        O cProfile e a amostragem de pilha só enxergam a thread em que a etapa começou;
+        trabalho enviado a `asyncio.to_thread` deve ser perfilado assim, dentro da própria
+        thread: `asyncio.to_thread(profiler.run, nome, fn, ...)`.
+        """
+        with self.stage(name):
+            return fn(*args, **kwargs)
+
+    def _write(self, name, profile, sampler, snapshot, peak, elapsed):
+        if profile is not None:
+            profile.dump_stats(str(self.out_dir / f"{name}.pstats"))
+
+        with open(self.out_dir / f"{name}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, threading.__file__),
+            tracemalloc.Filter(False, __file__)
+        ))
+        with open(self.out_dir / f"{name}.mem.txt", "w", encoding="utf-8") as f:
+            f.write(f"Etapa: {name}\n")
+            f.write(f"Tempo: {elapsed:.3f}s\n")
+            f.write(f"Pico de memória alocada (tracemalloc): {peak / 1024 / 1024:.2f} MiB\n\n")
+            f.write(f"Maiores alocações no snapshot mais próximo do pico (top {TOP_ALLOCATIONS}):\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"  {stat}\n")
+
+        calls = f"{pstats.Stats(profile).total_calls} chamadas" if profile is not None else "sem cProfile (outra etapa em paralelo)"
+        self.summary.append(
+            f"{name}: {elapsed:.2f}s, pico {peak / 1024 / 1024:.1f} MiB, "
+            f"{calls}, {sum(sampler.stacks.values())} amostras"
+        )
+
+    def print_summary(self) -> None:
+        if not self.enabled or not self.summary:
+            return
+        print(f"\nPerfis gravados em {self.out_dir}:")
+        for line in self.summary:
+            print(f"  - {line}")
@@ -1,37 +1,102 @@
 import os
-import requests
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from models import Card
+from rate_limit import RateLimitGovernor, get_governor
+from http_cache import HTTPCache, get_http_cache
+from issue_table import IssueRow, IssueTable, build_issue_table
 
 
-def _normalize_for_compare(s: str) -> str:
-    if not s:
-        return ""
-    return " ".join(s.lower().split())
+PROJECT_ITEMS_QUERY = """
+query($projectId: ID!, $first: Int!, $after: String) {
+    rateLimit {
+        cost
+        remaining
+        resetAt
+    }
+    node(id: $projectId) {
+        ... on ProjectV2 {
+            items(first: $first, after: $after) {
+                nodes {
+                    id
+                    content {
+                        ... on Issue {
+                            id
+                            updatedAt
+                            title
+                            body
+                        }
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+    }
+}
+"""
 
+ADD_ITEM_MUTATION = """
+mutation($projectId: ID!, $contentId: ID!) {
+    addProjectV2ItemById(input: {
+        projectId: $projectId
+        contentId: $contentId
+    }) {
+        item {
+            id
+        }
+    }
+}
+"""
 
-def _is_similar_title(existing_title: str, new_title: str) -> bool:
-    a = _normalize_for_compare(existing_title)
-    b = _normalize_for_compare(new_title)
-    if not a or not b:
-        return False
-    if a == b:
-        return True
-    if a in b or b in a:
-        return True
-    return False
+UPDATE_FIELD_MUTATION = """
+mutation($projectId: ID!, $itemId: ID!, $fieldId: ID!, $optionId: String!) {
+    updateProjectV2ItemFieldValue(input: {
+        projectId: $projectId
+        itemId: $itemId
+        fieldId: $fieldId
+        value: {
+            singleSelectOptionId: $optionId
+        }
+    }) {
+        projectV2Item {
+            id
+        }
+    }
+}
+"""
 
 
-def _is_similar_description(existing_desc: str, new_desc: str) -> bool:
-    a = _normalize_for_compare((existing_desc or "")[:500])
-    b = _normalize_for_compare((new_desc or "")[:500])
-    if not a or not b:
-        return False
-    if a == b:
-        return True
-    if len(a) > 50 and len(b) > 50 and (a in b or b in a):
-        return True
-    return False
+def parse_project_items_page(data: dict) -> Tuple[Optional[List[IssueRow]], Optional[str]]:
+    """
+    Interpreta uma página de PROJECT_ITEMS_QUERY.
+    
+    Returns:
+        ((id, updatedAt, title, body) das issues da página ou None em caso de erro, cursor da próxima página ou None)
+    """
+    if "errors" in data:
+        print(f"Aviso: erro ao listar issues do Project: {data['errors']}")
+        return None, None
+    
+    node = (data.get("data") or {}).get("node")
+    if not node:
+        return None, None
+    
+    items = node.get("items", {})
+    rows = []
+    for item in items.get("nodes", []):
+        content = item.get("content")
+        if content and content.get("title") is not None:
+            rows.append((
+                content.get("id"),
+                content.get("updatedAt"),
+                content.get("title") or "",
+                content.get("body") or ""
+            ))
+    
+    page_info = items.get("pageInfo", {})
+    return rows, page_info.get("endCursor") if page_info.get("hasNextPage") else None
 
 
 class GitHubProjectClient:
@@ -45,7 +110,12 @@ class GitHubProjectClient:
         status_backlog_option_id: str,
         area_field_id: str,
         area_frontend_option_id: str,
-        area_backend_option_id: str
+        area_backend_option_id: str,
+        governor: Optional[RateLimitGovernor] = None,
+        project_number: Optional[str] = None,
+        project_owner: Optional[str] = None,
+        project_owner_type: str = "orgs",
+        http_cache: Optional[HTTPCache] = None
     ):
         """
         Inicializa o cliente do GitHub Projects v2.
@@ -60,6 +130,11 @@ class GitHubProjectClient:
             area_field_id: ID do campo de área no Project
             area_frontend_option_id: ID da opção Front-End no campo Area
             area_backend_option_id: ID da opção Back-End no campo Area
+            governor: Controle de rate limit (padrão: o compartilhado do processo)
+            project_number: Número do Project (habilita a leitura via REST com cache condicional)
+            project_owner: Dono do Project (padrão: owner)
+            project_owner_type: "orgs" ou "users", conforme o dono do Project
+            http_cache: Cache de leituras REST (padrão: o compartilhado do processo)
         """
         self.token = token
         self.owner = owner
@@ -75,10 +150,27 @@ class GitHubProjectClient:
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
+        self.governor = governor or get_governor()
+        self.project_number = project_number
+        self.project_owner = project_owner or owner
+        self.project_owner_type = project_owner_type
+        self.http_cache = http_cache
+        self.rest_url = "https://api.github.com"
+        self.rest_headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        }
+    
+    def _rest_get(self, url: str):
+        if self.http_cache is None:
+            self.http_cache = get_http_cache()
+        return self.http_cache.get(self.governor, url, self.rest_headers)
     
     def get_project_item_id(self, issue_number: str) -> Optional[str]:
         """
-        Obtém o ID do item do Project associado a uma issue.
+        Obtém o node ID de uma issue (necessário para adicioná-la ao Project).
+        Lê pela API REST com cache condicional (ETag); usa GraphQL se a leitura REST falhar.
         
         Args:
             issue_number: Número da issue
@@ -86,8 +178,25 @@ class GitHubProjectClient:
         Returns:
             ID do item do Project ou None
         """
+        try:
+            response = self._rest_get(f"{self.rest_url}/repos/{self.owner}/{self.repo}/issues/{int(issue_number)}")
+            if response.status_code == 200:
+                node_id = response.json().get("node_id")
+                if node_id:
+                    return node_id
+        except Exception as e:
+            print(f"Aviso: leitura REST da issue #{issue_number} falhou ({e}); usando GraphQL")
+        
+        return self._get_issue_id_graphql(issue_number)
+    
+    def _get_issue_id_graphql(self, issue_number: str) -> Optional[str]:
         query = """
         query($owner: String!, $repo: String!, $issueNumber: Int!) {
+            rateLimit {
+                cost
+                remaining
+                resetAt
+            }
             repository(owner: $owner, name: $repo) {
                 issue(number: $issueNumber) {
                     id
@@ -111,10 +220,11 @@ class GitHubProjectClient:
         }
         
         try:
-            response = requests.post(
+            response = self.governor.post_graphql(
                 self.graphql_url,
-                json={"query": query, "variables": variables},
-                headers=self.headers
+                query,
+                variables,
+                self.headers
             )
             response.raise_for_status()
             
@@ -135,42 +245,63 @@ class GitHubProjectClient:
             print(f"Erro ao buscar issue #{issue_number}: {e}")
             return None
     
-    def list_existing_project_issues(self) -> List[Tuple[str, str]]:
+    def list_existing_project_issues(self) -> IssueTable:
+        """
+        Lista as issues já presentes no Project, já normalizadas para comparação e com o
+        resumo do prompt pronto. Usado para evitar criar issues duplicadas.
+        
+        Com o número do Project configurado, lê pela API REST de Projects com cache
+        condicional (páginas inalteradas voltam como 304); senão, ou se a leitura REST
+        falhar, usa a API GraphQL. Issues com o mesmo updatedAt da execução anterior
+        reaproveitam o registro do cache local.
+        
+        Returns:
+            IssueTable das issues no Project
+        """
+        rows = self._list_project_issues_rest() if self.project_number else None
+        if rows is None:
+            rows = self._list_project_issues_graphql()
+        return build_issue_table(rows, cache_key=self.project_id)
+    
+    def _list_project_issues_rest(self) -> Optional[List[IssueRow]]:
         """
-        Lista título e descrição das issues já presentes no Project (via API GraphQL).
-        Usado para evitar criar issues duplicadas.
+        Lista as issues do Project pela API REST (com ETag por página).
         
         Returns:
-            Lista de (title, body) das issues no Project
+            Lista de (id, updatedAt, title, body) ou None se a leitura REST não estiver disponível
         """
+        result = []
+        url = (
+            f"{self.rest_url}/{self.project_owner_type}/{self.project_owner}"
+            f"/projectsV2/{self.project_number}/items?per_page=100"
+        )
+        
+        try:
+            while url:
+                response = self._rest_get(url)
+                if response.status_code != 200:
+                    print(f"Aviso: leitura REST do Project respondeu {response.status_code}; usando GraphQL")
+                    return None
+                for item in response.json():
+                    content = item.get("content") or {}
+                    if item.get("content_type") == "Issue" and content.get("title") is not None:
+                        result.append((
+                            content.get("node_id"),
+                            content.get("updated_at"),
+                            content.get("title") or "",
+                            content.get("body") or ""
+                        ))
+                url = response.next_url
+            return result
+        except Exception as e:
+            print(f"Aviso: leitura REST do Project falhou ({e}); usando GraphQL")
+            return None
+    
+    def _list_project_issues_graphql(self) -> List[IssueRow]:
         result = []
         cursor = None
         page_size = 100
         
-        query = """
-        query($projectId: ID!, $first: Int!, $after: String) {
-            node(id: $projectId) {
-                ... on ProjectV2 {
-                    items(first: $first, after: $after) {
-                        nodes {
-                            id
-                            content {
-                                ... on Issue {
-                                    title
-                                    body
-                                }
-                            }
-                        }
-                        pageInfo {
-                            hasNextPage
-                            endCursor
-                        }
-                    }
-                }
-            }
-        }
-        """
-        
         try:
             while True:
                 variables = {
@@ -178,105 +309,55 @@ class GitHubProjectClient:
                     "first": page_size,
                     "after": cursor
                 }
-                response = requests.post(
+                response = self.governor.post_graphql(
                     self.graphql_url,
-                    json={"query": query, "variables": variables},
-                    headers=self.headers
+                    PROJECT_ITEMS_QUERY,
+                    variables,
+                    self.headers
                 )
                 response.raise_for_status()
-                data = response.json()
-                
-                if "errors" in data:
-                    print(f"Aviso: erro ao listar issues do Project: {data['errors']}")
+                rows, cursor = parse_project_items_page(response.json())
+                if rows is None:
                     return result
-                
-                node = data.get("data", {}).get("node")
-                if not node:
-                    return result
-                
-                items = node.get("items", {})
-                nodes = items.get("nodes", [])
-                page_info = items.get("pageInfo", {})
-                
-                for item in nodes:
-                    content = item.get("content")
-                    if content and content.get("title") is not None:
-                        result.append((
-                            content.get("title") or "",
-                            content.get("body") or ""
-                        ))
-                
-                if not page_info.get("hasNextPage"):
+                result.extend(rows)
+                if not cursor:
                     break
-                cursor = page_info.get("endCursor")
             
             return result
         except Exception as e:
             print(f"Aviso: não foi possível listar issues do Project: {e}")
             return result
     
-    def filter_cards_duplicates(self, cards: List[Card]) -> List[Card]:
-        """
-        Compara os cards com as issues já existentes no Project (título e descrição).
-        Retorna apenas os cards que não são claramente similares a nenhuma issue existente.
-        """
-        existing = self.list_existing_project_issues()
-        if not existing:
-            return list(cards)
-        to_create = []
-        for c in cards:
-            is_dup = False
-            for (ext, exb) in existing:
-                if _is_similar_title(ext, c.title) and _is_similar_description(exb, c.description):
-                    is_dup = True
-                    break
-            if is_dup:
-                print(f"Pulando possível duplicata (já existe no Project): \"{c.title}\"")
-            else:
-                to_create.append(c)
-        return to_create
-    
-    def add_issue_to_project(self, issue_number: str, card: Card) -> bool:
+    def add_issue_to_project(self, issue_number: str, card: Card, issue_id: Optional[str] = None) -> bool:
         """
         Adiciona uma issue ao Project e configura seus campos.
         
         Args:
             issue_number: Número da issue
             card: Card associado à issue
+            issue_id: Node ID da issue, se já conhecido (evita uma consulta)
             
         Returns:
             True se bem-sucedido, False caso contrário
         """
-        issue_id = self.get_project_item_id(issue_number)
+        issue_id = issue_id or self.get_project_item_id(issue_number)
         if not issue_id:
             print(f"Não foi possível obter ID da issue #{issue_number}")
             return False
         
         area_option_id = self.area_frontend_option_id if card.type.value == "Front-End" else self.area_backend_option_id
         
-        add_item_mutation = """
-        mutation($projectId: ID!, $contentId: ID!) {
-            addProjectV2ItemById(input: {
-                projectId: $projectId
-                contentId: $contentId
-            }) {
-                item {
-                    id
-                }
-            }
-        }
-        """
-        
         try:
             add_variables = {
                 "projectId": self.project_id,
                 "contentId": issue_id
             }
             
-            add_response = requests.post(
+            add_response = self.governor.post_graphql(
                 self.graphql_url,
-                json={"query": add_item_mutation, "variables": add_variables},
-                headers=self.headers
+                ADD_ITEM_MUTATION,
+                add_variables,
+                self.headers
             )
             add_response.raise_for_status()
             
@@ -296,23 +377,6 @@ class GitHubProjectClient:
                 print(f"Erro: não foi possível obter ID do item do Project para issue #{issue_number}")
                 return False
             
-            update_status_mutation = """
-            mutation($projectId: ID!, $itemId: ID!, $fieldId: ID!, $optionId: String!) {
-                updateProjectV2ItemFieldValue(input: {
-                    projectId: $projectId
-                    itemId: $itemId
-                    fieldId: $fieldId
-                    value: {
-                        singleSelectOptionId: $optionId
-                    }
-                }) {
-                    projectV2Item {
-                        id
-                    }
-                }
-            }
-            """
-            
             status_variables = {
                 "projectId": self.project_id,
                 "itemId": item_id,
@@ -320,10 +384,11 @@ class GitHubProjectClient:
                 "optionId": self.status_backlog_option_id
             }
             
-            status_response = requests.post(
+            status_response = self.governor.post_graphql(
                 self.graphql_url,
-                json={"query": update_status_mutation, "variables": status_variables},
-                headers=self.headers
+                UPDATE_FIELD_MUTATION,
+                status_variables,
+                self.headers
             )
             status_response.raise_for_status()
             
@@ -338,10 +403,11 @@ class GitHubProjectClient:
                 "optionId": area_option_id
             }
             
-            area_response = requests.post(
+            area_response = self.governor.post_graphql(
                 self.graphql_url,
-                json={"query": update_status_mutation, "variables": area_variables},
-                headers=self.headers
+                UPDATE_FIELD_MUTATION,
+                area_variables,
+                self.headers
             )
             area_response.raise_for_status()
             
@@ -363,13 +429,19 @@ class GitHubProjectClient:
                     print(f"Resposta: {e.response.text}")
             return False
     
-    def add_issues_to_project(self, issue_numbers: List[str], cards: List[Card]) -> int:
+    def add_issues_to_project(
+        self,
+        issue_numbers: List[str],
+        cards: List[Card],
+        issue_node_ids: Optional[Dict[str, str]] = None
+    ) -> int:
         """
         Adiciona múltiplas issues ao Project.
         
         Args:
             issue_numbers: Lista de números de issues
             cards: Lista de cards correspondentes
+            issue_node_ids: Node IDs já conhecidos (número -> ID), ex.: retornados na criação em lote
             
         Returns:
             Número de issues adicionadas com sucesso
@@ -382,7 +454,8 @@ class GitHubProjectClient:
         
         success_count = 0
         for issue_number, card in zip(issue_numbers, cards):
-            if self.add_issue_to_project(issue_number, card):
+            issue_id = (issue_node_ids or {}).get(issue_number)
+            if self.add_issue_to_project(issue_number, card, issue_id=issue_id):
                 success_count += 1
         
         print(f"\nTotal de issues adicionadas ao Project: {success_count}/{len(issue_numbers)}")
@@ -0,0 +1,351 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+import requests
+
+
+REST = "rest"
+GRAPHQL = "graphql"
+
+MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+BASE_BACKOFF_S = float(os.getenv("GITHUB_BASE_BACKOFF_S", "1"))
+MAX_BACKOFF_S = float(os.getenv("GITHUB_MAX_BACKOFF_S", "120"))
+# GitHub recomenda ao menos 1s entre requisições que criam conteúdo (POST/PATCH/PUT/DELETE e mutations)
+MIN_WRITE_INTERVAL_S = float(os.getenv("GITHUB_MIN_WRITE_INTERVAL_S", "1"))
+# Abaixo desta fração do limite, as requisições são espaçadas até o reset da janela
+LOW_BUDGET_FRACTION = 0.1
+REQUEST_TIMEOUT_S = 30
+SECONDARY_LIMIT_WAIT_S = 60
+
+# Limites secundários documentados (pontos por minuto): GET/query = 1 ponto, escrita/mutation = 5
+SECONDARY_POINTS_PER_MINUTE = {REST: 900, GRAPHQL: 2000}
+READ_POINTS = 1
+WRITE_POINTS = 5
+
+
+@dataclass
+class BucketState:
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None  # epoch
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    throttled_s: float = 0.0
+    graphql_cost: int = 0
+    last_write_at: float = 0.0
+    window: Deque[Tuple[float, int]] = field(default_factory=deque)  # (instante, pontos) do último minuto
+
+
+def _parse_reset_at(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class RateLimitGovernor:
+    """
+    Controla o orçamento de rate limit do GitHub, separado entre REST e GraphQL.
+
+    - Lê X-RateLimit-*, Retry-After e o objeto `rateLimit { cost remaining resetAt }` do GraphQL
+    - Espaça as requisições quando o orçamento está baixo e respeita os limites secundários
+      (pontos por minuto e intervalo mínimo entre escritas)
+    - Repete 403/429 de rate limit e 5xx com backoff exponencial com jitter
+    - Escritas (POST/PATCH/PUT/DELETE e mutations) só são repetidas quando a resposta mostra
+      que foram recusadas por rate limit (Retry-After ou X-RateLimit-Remaining zerado); depois
+      de uma falha de conexão ou de um 5xx a escrita pode ter sido aplicada, então não é repetida
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.session = session or requests.Session()
+        self.buckets: Dict[str, BucketState] = {REST: BucketState(), GRAPHQL: BucketState()}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Requisições
+    # ------------------------------------------------------------------
+
+    def request(self, method: str, url: str, bucket: str, **kwargs) -> requests.Response:
+        """
+        Faz a requisição respeitando o orçamento do bucket e repetindo falhas transitórias.
+
+        Args:
+            method: Método HTTP
+            url: URL da API
+            bucket: REST ou GRAPHQL
+            kwargs: Repassados para requests (json, headers, params...)
+
+        Returns:
+            A última resposta recebida (o chamador decide como tratar erros HTTP)
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: Falha de conexão (escritas falham
+                na primeira, sem nova tentativa)
+        """
+        write = self.is_write(method, kwargs.get("json"))
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT_S)
+        state = self.buckets[bucket]
+
+        for attempt in range(MAX_RETRIES + 1):
+            self.sleep(self.delay_before(bucket, write))
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # A escrita pode ter chegado ao GitHub antes da falha: repetir arriscaria duplicá-la
+                if write or attempt >= MAX_RETRIES:
+                    state.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                state.retries += 1
+                print(f"Aviso: falha de conexão com o GitHub ({e}); nova tentativa em {delay:.1f}s")
+                self.sleep(delay)
+                continue
+
+            self.observe(bucket, response)
+            delay = self.retry_delay(bucket, response, attempt, write)
+            if delay is None:
+                return response
+            if attempt >= MAX_RETRIES:
+                state.failures += 1
+                return response
+            state.retries += 1
+            print(f"Aviso: GitHub respondeu {response.status_code} ({bucket}); nova tentativa em {delay:.1f}s")
+            self.sleep(delay)
+
+        return response
+
+    def post_graphql(self, url: str, query: str, variables: dict, headers: dict) -> requests.Response:
+        return self.request("POST", url, GRAPHQL, json={"query": query, "variables": variables}, headers=headers)
+
+    async def request_async(self, client, method: str, url: str, bucket: str, **kwargs):
+        """
+        Versão assíncrona de `request` para um `httpx.AsyncClient`: mesmo orçamento, pacing
+        e política de novas tentativas, esperando com asyncio.sleep em vez de bloquear a thread.
+
+        Returns:
+            A última resposta recebida (httpx.Response)
+        """
+        import asyncio
+        import httpx
+
+        write = self.is_write(method, kwargs.get("json"))
+        state = self.buckets[bucket]
+
+        for attempt in range(MAX_RETRIES + 1):
+            await asyncio.sleep(self.delay_before(bucket, write))
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if write or attempt >= MAX_RETRIES:
+                    state.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                state.retries += 1
+                print(f"Aviso: falha de conexão com o GitHub ({e}); nova tentativa em {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.observe(bucket, response)
+            delay = self.retry_delay(bucket, response, attempt, write)
+            if delay is None:
+                return response
+            if attempt >= MAX_RETRIES:
+                state.failures += 1
+                return response
+            state.retries += 1
+            print(f"Aviso: GitHub respondeu {response.status_code} ({bucket}); nova tentativa em {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        return response
+
+    @staticmethod
+    def is_write(method: str, payload=None) -> bool:
+        """Escritas (e mutations GraphQL) custam mais nos limites secundários e exigem intervalo mínimo."""
+        if isinstance(payload, dict) and "query" in payload:
+            return str(payload["query"]).lstrip().startswith("mutation")
+        return method.upper() not in ("GET", "HEAD", "OPTIONS")
+
+    # ------------------------------------------------------------------
+    # Orçamento e pacing
+    # ------------------------------------------------------------------
+
+    def delay_before(self, bucket: str, write: bool) -> float:
+        """
+        Calcula quanto esperar antes da próxima requisição do bucket e já a registra na janela.
+        """
+        with self._lock:
+            state = self.buckets[bucket]
+            now = time.time()
+            delay = 0.0
+
+            if state.remaining is not None and state.reset_at and state.reset_at > now:
+                if state.remaining <= 0:
+                    delay = state.reset_at - now + 1
+                elif state.limit and state.remaining < state.limit * LOW_BUDGET_FRACTION:
+                    # Espalha o orçamento restante até o reset em vez de esgotá-lo de uma vez
+                    delay = (state.reset_at - now) / state.remaining
+
+            if write and state.last_write_at:
+                delay = max(delay, state.last_write_at + MIN_WRITE_INTERVAL_S - now)
+
+            points = WRITE_POINTS if write else READ_POINTS
+            while state.window and state.window[0][0] <= now - 60:
+                state.window.popleft()
+            used = sum(p for _, p in state.window)
+            if state.window and used + points > SECONDARY_POINTS_PER_MINUTE[bucket]:
+                delay = max(delay, state.window[0][0] + 60 - now)
+
+            delay = max(delay, 0.0)
+            at = now + delay
+            state.window.append((at, points))
+            if write:
+                state.last_write_at = at
+            state.requests += 1
+            state.throttled_s += delay
+            return delay
+
+    def observe(self, bucket: str, response: requests.Response) -> None:
+        """Atualiza o orçamento a partir dos headers e, no GraphQL, do objeto rateLimit da resposta."""
+        with self._lock:
+            state = self.buckets[bucket]
+            headers = response.headers
+            if headers.get("X-RateLimit-Remaining") is not None:
+                try:
+                    state.remaining = int(headers["X-RateLimit-Remaining"])
+                    state.limit = int(headers.get("X-RateLimit-Limit", state.limit or 0)) or state.limit
+                    state.reset_at = _parse_reset_at(headers.get("X-RateLimit-Reset")) or state.reset_at
+                except ValueError:
+                    pass
+
+        if bucket == GRAPHQL and response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                return
+            self.observe_graphql(data)
+
+    def observe_graphql(self, data: dict) -> None:
+        rate = ((data or {}).get("data") or {}).get("rateLimit")
+        if not rate:
+            return
+        with self._lock:
+            state = self.buckets[GRAPHQL]
+            state.graphql_cost += int(rate.get("cost") or 0)
+            if rate.get("remaining") is not None:
+                state.remaining = int(rate["remaining"])
+            if rate.get("limit") is not None:
+                state.limit = int(rate["limit"])
+            state.reset_at = _parse_reset_at(rate.get("resetAt")) or state.reset_at
+
+    def retry_delay(self, bucket: str, response: requests.Response, attempt: int, write: bool = False) -> Optional[float]:
+        """
+        Retorna quanto esperar antes de repetir a requisição, ou None se ela não deve ser repetida.
+        Com `write`, só repete recusas explícitas por rate limit, em que a escrita não foi aplicada.
+        """
+        status = response.status_code
+        retry_after = response.headers.get("Retry-After")
+
+        if status in (403, 429):
+            body = response.text.lower() if response.text else ""
+            remaining = response.headers.get("X-RateLimit-Remaining")
+            if retry_after is not None:
+                try:
+                    return float(retry_after) + random.uniform(0, 1)
+                except ValueError:
+                    pass
+            if remaining == "0":
+                reset_at = _parse_reset_at(response.headers.get("X-RateLimit-Reset"))
+                if reset_at:
+                    return max(reset_at - time.time(), 0) + random.uniform(1, 3)
+            if write:
+                return None
+            if status == 429 or "rate limit" in body:
+                # Limite secundário sem Retry-After: a documentação pede ao menos 1 minuto
+                return max(SECONDARY_LIMIT_WAIT_S, self.backoff(attempt))
+            return None
+
+        if status >= 500:
+            return None if write else self.backoff(attempt)
+
+        if bucket == GRAPHQL and status == 200:
+            try:
+                data = response.json()
+                errors = data.get("errors") or []
+            except (ValueError, AttributeError):
+                return None
+            # Mutation com `data` preenchido chegou a executar ao menos em parte
+            if write and data.get("data") is not None:
+                return None
+            if any((e or {}).get("type") == "RATE_LIMITED" for e in errors):
+                state = self.buckets[GRAPHQL]
+                if state.reset_at and state.reset_at > time.time():
+                    return state.reset_at - time.time() + random.uniform(1, 3)
+                return max(SECONDARY_LIMIT_WAIT_S, self.backoff(attempt))
+        return None
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        """Backoff exponencial com jitter ("equal jitter"): metade fixa, metade aleatória."""
+        ceiling = min(MAX_BACKOFF_S, BASE_BACKOFF_S * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, state in self.buckets.items():
+            if not state.requests:
+                continue
+            budget = "orçamento desconhecido"
+            if state.remaining is not None:
+                budget = f"restante {state.remaining}"
+                if state.limit:
+                    budget += f"/{state.limit}"
+                if state.reset_at:
+                    budget += f" (reset {datetime.fromtimestamp(state.reset_at).strftime('%H:%M:%S')})"
+            line = (
+                f"{name.upper()}: {state.requests} requisições, {state.retries} novas tentativas, "
+                f"{state.failures} falhas, {state.throttled_s:.1f}s de espera, {budget}"
+            )
+            if name == GRAPHQL and state.graphql_cost:
+                line += f", custo GraphQL {state.graphql_cost}"
+            lines.append(line)
+        return lines
+
+    def print_summary(self) -> None:
+        lines = self.summary_lines()
+        if not lines:
+            return
+        print("Rate limit do GitHub:")
+        for line in lines:
+            print(f"  - {line}")
+
+
+_default_governor: Optional[RateLimitGovernor] = None
+
+
+def get_governor() -> RateLimitGovernor:
+    """Governor compartilhado por todos os clientes do GitHub do processo."""
+    global _default_governor
+    if _default_governor is None:
+        _default_governor = RateLimitGovernor()
+    return _default_governor
@@ -0,0 +1,177 @@
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+from local_cache import cache_dir
+from models import Card
+
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_decoder = json.JSONDecoder(strict=False)
+
+
+@dataclass
+class ParseReport:
+    recovered: int = 0
+    skipped: int = 0            # objetos completos, mas inválidos (JSON ou campos do Card)
+    truncated: bool = False     # a resposta terminou no meio de um objeto
+    repaired: bool = False      # precisou de reparo (vírgulas sobrando, texto fora do array etc.)
+    no_json: bool = False       # a resposta não contém nenhum JSON
+    messages: List[str] = field(default_factory=list)
+
+    @property
+    def clean(self) -> bool:
+        return not (self.skipped or self.truncated or self.repaired or self.no_json)
+
+
+def strip_code_fences(text: str) -> str:
+    text = (text or "").strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _object_end(text: str, start: int) -> Optional[int]:
+    """
+    Retorna o índice logo após o "}" que fecha o objeto iniciado em `start`,
+    respeitando strings e escapes. Retorna None se o objeto não termina (resposta truncada).
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def iter_json_objects(text: str, report: ParseReport) -> Iterator[Tuple[int, dict]]:
+    """
+    Percorre um array JSON de objetos de forma tolerante, devolvendo (posição, objeto) de cada
+    objeto recuperável. Objetos malformados são reparados quando possível ou ignorados;
+    um objeto final incompleto (resposta truncada) é descartado.
+    """
+    start = text.find("[")
+    first_obj = text.find("{")
+    if first_obj != -1 and (start == -1 or first_obj < start):
+        # Objeto antes do array: objeto solto ou objeto que embrulha a lista (ex.: {"cards": [...]})
+        report.repaired = True
+        try:
+            value = _decoder.decode(text)
+        except ValueError:
+            value = None
+        if isinstance(value, dict):
+            items = next((v for v in value.values() if isinstance(v, list)), [value])
+            for position, item in enumerate(items):
+                if isinstance(item, dict):
+                    yield position, item
+            return
+        # Sem "[" inicial (ou embrulho truncado): trata o texto como o corpo de um array
+        pos = start + 1 if start != -1 else first_obj
+    elif start == -1:
+        report.no_json = True
+        report.messages.append("Nenhum JSON encontrado na resposta")
+        return
+    else:
+        if text[:start].strip():
+            report.repaired = True
+        pos = start + 1
+
+    position = 0
+    length = len(text)
+    while pos < length:
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length:
+            report.truncated = True
+            return
+        if text[pos] == "]":
+            if text[pos + 1:].strip():
+                report.repaired = True
+            return
+        if text[pos] != "{":
+            # Lixo entre objetos: pula até o próximo objeto
+            next_obj = text.find("{", pos)
+            report.repaired = True
+            if next_obj == -1:
+                return
+            pos = next_obj
+        end = _object_end(text, pos)
+        if end is None:
+            report.truncated = True
+            report.messages.append(f"Objeto {position} incompleto (resposta truncada) descartado")
+            return
+        chunk = text[pos:end]
+        try:
+            obj = _decoder.decode(chunk)
+        except ValueError:
+            try:
+                obj = _decoder.decode(_TRAILING_COMMA_RE.sub(r"\1", chunk))
+                report.repaired = True
+            except ValueError as e:
+                obj = None
+                report.skipped += 1
+                report.messages.append(f"Objeto {position} com JSON inválido ignorado: {e}")
+        if isinstance(obj, dict):
+            yield position, obj
+        pos = end
+        position += 1
+
+
+def parse_cards_tolerant(response_text: str) -> Tuple[List[Card], ParseReport]:
+    """
+    Converte a resposta do Gemini em Cards recuperando o máximo possível de objetos válidos,
+    mesmo com a resposta truncada ou levemente malformada.
+    O parent_index é remapeado para as novas posições; pais descartados viram null.
+
+    Args:
+        response_text: Texto retornado pelo modelo
+
+    Returns:
+        (cards recuperados, relatório do parse)
+    """
+    report = ParseReport()
+    text = strip_code_fences(response_text)
+
+    cards: List[Card] = []
+    new_index = {}
+    for position, data in iter_json_objects(text, report):
+        try:
+            card = Card.from_dict(data)
+        except (KeyError, ValueError, TypeError) as e:
+            report.skipped += 1
+            report.messages.append(f"Objeto {position} não é um card válido: {e!r}")
+            continue
+        if card.parent_index is not None:
+            card.parent_index = new_index.get(card.parent_index)
+        new_index[position] = len(cards)
+        cards.append(card)
+
+    report.recovered = len(cards)
+    return cards, report
+
+
+def save_raw_response(response_text: str) -> str:
+    """Guarda a resposta bruta no cache local para inspeção (usado quando foi preciso reparar)."""
+    path = cache_dir("responses") / f"{time.strftime('%Y%m%d-%H%M%S')}-{time.monotonic_ns() % 10**6}.txt"
+    path.write_text(response_text or "", encoding="utf-8")
+    return str(path)
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+from local_cache import cache_dir
+from models import PDFContent
+
+
+SNAPSHOT_VERSION = 1
+
+# Linhas como "3. Fluxo de Cobrança" ou "2.1 Regras de negócio" abrem uma nova seção
+_HEADING_RE = re.compile(r"^\s*(\d+(?:\.\d+)*)([.)]?)\s+(\S.{0,118})$")
+_NUMBERING_RE = re.compile(r"^\s*\d+(?:\.\d+)*[.)]?\s+")
+# Título curto: itens de lista numerada costumam ser frases mais longas
+HEADING_MAX_CHARS = 80
+HEADING_MAX_WORDS = 10
+# Números de seção acima disso (ex.: anos, valores em linhas de tabela) não são títulos
+HEADING_MAX_NUMBER = 99
+# Salto tolerado na numeração entre títulos seguidos (um título pode se perder na extração)
+HEADING_MAX_GAP = 2
+
+
+def _normalize(s: str) -> str:
+    return " ".join((s or "").split())
+
+
+def _hash(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class Section:
+    title: str
+    text: str
+    pages: List[int] = field(default_factory=list)  # números das páginas (1-based) onde a seção aparece
+
+    @property
+    def key(self) -> str:
+        # Ignora a numeração para que renumerar seções numa revisão não as marque como novas
+        return _normalize(_NUMBERING_RE.sub("", self.title)).lower()
+
+    @property
+    def hash(self) -> str:
+        return _hash(_normalize(self.text))
+
+
+@dataclass
+class RevisionSnapshot:
+    page_hashes: List[str]
+    section_hashes: dict  # chave da seção -> hash do conteúdo
+    section_pages: dict   # chave da seção -> páginas
+
+    def to_dict(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "pages": self.page_hashes,
+            "sections": [
+                {"key": key, "hash": h, "pages": self.section_pages.get(key, [])}
+                for key, h in self.section_hashes.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RevisionSnapshot":
+        sections = data.get("sections", [])
+        return cls(
+            page_hashes=list(data.get("pages", [])),
+            section_hashes={s["key"]: s["hash"] for s in sections},
+            section_pages={s["key"]: list(s.get("pages", [])) for s in sections}
+        )
+
+
+@dataclass
+class RevisionDiff:
+    sections: List[Section]
+    changed: List[Section]
+    removed: List[str]
+    changed_pages: Set[int]
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.changed)
+
+    def changed_content(self, pdf_content: PDFContent) -> PDFContent:
+        """
+        Monta um PDFContent apenas com as seções alteradas e as tabelas das páginas que elas ocupam.
+        """
+        pages = set()
+        for section in self.changed:
+            pages.update(section.pages)
+        text = "\n\n".join(section.text for section in self.changed)
+        tables = [t for t in pdf_content.tables_json if t.get("page") in pages]
+        return PDFContent(text=text, tables_json=tables)
+
+
+def _numbered_line(line: str) -> Optional[Tuple[Tuple[int, ...], str, bool]]:
+    """
+    Numeração de uma linha numerada ("2.1 Regras de negócio", "1) Usuário acessa a tela").
+
+    Returns:
+        (números, separador após o número, se o resto tem forma de título) ou None
+    """
+    match = _HEADING_RE.match(line)
+    if not match:
+        return None
+    numbers = tuple(int(n) for n in match.group(1).split("."))
+    title = match.group(3).rstrip()
+    title_like = (
+        title[0].isupper()
+        and not title.endswith((".", ",", ";", ":"))
+        and len(title) <= HEADING_MAX_CHARS
+        and len(title.split()) <= HEADING_MAX_WORDS
+        and all(n <= HEADING_MAX_NUMBER for n in numbers)
+    )
+    return numbers, match.group(2), title_like
+
+
+def _follows(previous: Optional[Tuple[int, ...]], numbers: Tuple[int, ...]) -> bool:
+    """
+    Se `numbers` continua a numeração do título anterior: primeira subseção (3 → 3.1),
+    seção seguinte no mesmo nível ou num nível acima (3.1 → 3.2, 3.2 → 4). Um item de
+    lista "1 ..." dentro da seção 3 não continua a numeração e não abre seção.
+    """
+    if previous is None:
+        return True
+    if len(numbers) == len(previous) + 1:
+        return numbers[:-1] == previous and 1 <= numbers[-1] <= HEADING_MAX_GAP
+    if len(numbers) > len(previous):
+        return False
+    level = len(numbers) - 1
+    return numbers[:level] == previous[:level] and 1 <= numbers[level] - previous[level] <= HEADING_MAX_GAP
+
+
+def split_sections(pages: List[str]) -> List[Section]:
+    """
+    Divide o texto do PDF em seções a partir dos títulos numerados (ex.: "2.1 Regras").
+    Uma linha numerada só é título se for curta, começar com maiúscula, não terminar em
+    pontuação e continuar a numeração do título anterior; itens de lista numerada, linhas
+    de tabela e linhas que começam com um ano ficam no texto da seção.
+    O conteúdo antes do primeiro título vira uma seção sem título, e páginas sem texto
+    (ex.: só com tabelas) entram na seção em curso.
+
+    Args:
+        pages: Texto de cada página do PDF
+
+    Returns:
+        Lista de seções na ordem do documento
+    """
+    sections: List[Section] = []
+    current = Section(title="", text="")
+    lines: List[str] = []
+    previous_numbers: Optional[Tuple[int, ...]] = None
+    # Lista numerada em curso: (quantidade de níveis, separador) e o último número visto
+    list_style: Optional[Tuple[int, str]] = None
+    list_last = 0
+
+    def close() -> List[int]:
+        current.text = "\n".join(lines).strip()
+        if current.text:
+            sections.append(current)
+            return []
+        # Seção inicial sem texto: suas páginas (ex.: capa só com tabela) passam para a seguinte
+        return current.pages
+
+    for page_num, page_text in enumerate(pages, start=1):
+        page_lines = (page_text or "").splitlines()
+        if not any(line.strip() for line in page_lines):
+            # Página sem texto (ex.: só tabelas): pertence à seção em curso, para que uma
+            # mudança nas tabelas dela marque essa seção como alterada
+            current.pages.append(page_num)
+            continue
+        for line in page_lines:
+            numbered = _numbered_line(line)
+            is_heading = False
+            if numbered is not None:
+                numbers, separator, title_like = numbered
+                style = (len(numbers), separator)
+                if style == list_style and numbers[-1] == list_last + 1:
+                    # Próximo item da lista em curso, mesmo que tenha forma de título
+                    list_last = numbers[-1]
+                elif title_like and _follows(previous_numbers, numbers):
+                    is_heading = True
+                else:
+                    list_style, list_last = style, numbers[-1]
+            if is_heading:
+                previous_numbers = numbers
+                list_style = None
+                carried = close()
+                current = Section(title=line.strip(), text="", pages=list(carried))
+                lines = []
+            lines.append(line)
+            if page_num not in current.pages:
+                current.pages.append(page_num)
+    close()
+
+    # Títulos repetidos recebem sufixo para manter a chave única
+    seen = {}
+    for section in sections:
+        count = seen.get(section.key, 0)
+        seen[section.key] = count + 1
+        if count:
+            section.title = f"{section.title} ({count + 1})"
+    return sections
+
+
+def build_snapshot(pdf_content: PDFContent, sections: List[Section]) -> RevisionSnapshot:
+    """
+    Calcula os hashes de páginas (texto + tabelas) e de seções de uma extração.
+    """
+    tables_by_page = {}
+    for table in pdf_content.tables_json:
+        tables_by_page.setdefault(table.get("page"), []).append(table)
+
+    page_hashes = []
+    for page_num, page_text in enumerate(pdf_content.pages, start=1):
+        tables = json.dumps(tables_by_page.get(page_num, []), sort_keys=True, ensure_ascii=False)
+        page_hashes.append(_hash(_normalize(page_text) + "\x00" + tables))
+
+    return RevisionSnapshot(
+        page_hashes=page_hashes,
+        section_hashes={s.key: s.hash for s in sections},
+        section_pages={s.key: list(s.pages) for s in sections}
+    )
+
+
+def diff_revision(
+    previous: RevisionSnapshot,
+    current: RevisionSnapshot,
+    sections: List[Section]
+) -> RevisionDiff:
+    """
+    Compara a extração atual com a anterior do mesmo documento.
+    Uma seção é considerada alterada se for nova, se o hash do texto mudou ou se
+    ocupa uma página cujo hash mudou (ex.: tabela alterada sem mudança no texto).
+    """
+    changed_pages = set()
+    for i, page_hash in enumerate(current.page_hashes):
+        if i >= len(previous.page_hashes) or previous.page_hashes[i] != page_hash:
+            changed_pages.add(i + 1)
+
+    changed = [s for s in sections if previous.section_hashes.get(s.key) != s.hash]
+    changed_keys = {s.key for s in changed}
+
+    # Página alterada sem nenhuma seção alterada nela: a mudança veio de uma tabela
+    for page in sorted(changed_pages):
+        if any(page in s.pages for s in changed):
+            continue
+        for section in sections:
+            if page in section.pages and section.key not in changed_keys:
+                changed.append(section)
+                changed_keys.add(section.key)
+
+    removed = [key for key in previous.section_hashes if key not in current.section_hashes]
+    order = {s.key: i for i, s in enumerate(sections)}
+    changed.sort(key=lambda s: order[s.key])
+    return RevisionDiff(sections=sections, changed=changed, removed=removed, changed_pages=changed_pages)
+
+
+class RevisionStore:
+    """
+    Guarda, por documento, os hashes da última extração processada com sucesso.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        if directory:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        else:
+            self.directory = cache_dir("revisions")
+
+    @staticmethod
+    def document_key(pdf_path: str, document_id: Optional[str] = None) -> str:
+        """
+        Identifica o documento entre execuções: pelo id informado (`--document-id`), que deve
+        ser o mesmo em todas as revisões, ou, sem id, pelo caminho absoluto do PDF (revisões
+        gravadas no mesmo arquivo coincidem; arquivo renomeado ou movido exige o id).
+        """
+        if document_id and document_id.strip():
+            return _hash("id\x00" + _normalize(document_id).lower())
+        return _hash("path\x00" + str(Path(pdf_path).resolve()))
+
+    def _path(self, document_key: str) -> Path:
+        return self.directory / f"{document_key}.json"
+
+    def load(self, document_key: str) -> Optional[RevisionSnapshot]:
+        path = self._path(document_key)
+        if not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != SNAPSHOT_VERSION:
+                return None
+            return RevisionSnapshot.from_dict(data)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Aviso: não foi possível ler a revisão anterior ({path}): {e}")
+            return None
+
+    def save(self, document_key: str, snapshot: RevisionSnapshot) -> None:
+        path = self._path(document_key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot.to_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(path)
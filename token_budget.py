@@ -0,0 +1,128 @@
+import os
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+from model_router import estimate_tokens
+
+
+# Orçamento global de tokens do prompt; 0 = usar só o limite do modelo escolhido (GEMINI_MODELS "modelo:N")
+PROMPT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", "0"))
+# Preço de entrada (US$ por milhão de tokens) para a estimativa de custo; 0 = não estimar
+INPUT_PRICE_PER_MTOK = float(os.getenv("GEMINI_INPUT_PRICE_PER_MTOK", "0"))
+TRUNCATION_MARKER = "\n[... conteúdo truncado para caber no orçamento de tokens ...]"
+MAX_SHRINK_ROUNDS = 16
+
+
+@dataclass
+class PromptPart:
+    name: str
+    text: str
+    # Recebe (texto atual, tokens desejados) e devolve uma versão menor; None = parte fixa
+    shrink: Optional[Callable[[str, int], str]] = None
+    original_tokens: int = 0
+
+    def __post_init__(self):
+        self.original_tokens = self.tokens
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class BudgetReport:
+    budget: Optional[int]
+    model: Optional[str] = None
+    parts: List[Tuple[str, int, int]] = field(default_factory=list)  # (nome, tokens originais, tokens finais)
+    over_budget: bool = False  # nem reduzindo as partes foi possível caber no orçamento
+
+    @property
+    def total(self) -> int:
+        return sum(final for _, _, final in self.parts)
+
+    @property
+    def original_total(self) -> int:
+        return sum(original for _, original, _ in self.parts)
+
+    @property
+    def shrunk(self) -> bool:
+        return any(original != final for _, original, final in self.parts)
+
+    def print_breakdown(self) -> None:
+        header = f"Orçamento do prompt: ~{self.total} tokens estimados"
+        if self.budget:
+            header += f" de {self.budget}"
+        if self.model:
+            header += f" ({self.model})"
+        if INPUT_PRICE_PER_MTOK:
+            header += f", custo de entrada estimado US$ {self.total * INPUT_PRICE_PER_MTOK / 1_000_000:.4f}"
+        print(header)
+        for name, original, final in self.parts:
+            line = f"  - {name}: {final}"
+            if final != original:
+                line += f" (reduzido de {original})"
+            print(line)
+        if self.over_budget:
+            print("Aviso: as partes fixas do prompt já excedem o orçamento de tokens; enviando mesmo assim.")
+
+
+def effective_budget(model_limit: Optional[int]) -> Optional[int]:
+    """Combina o limite do modelo com GEMINI_PROMPT_TOKEN_BUDGET (vale o menor)."""
+    limits = [limit for limit in (model_limit, PROMPT_TOKEN_BUDGET) if limit]
+    return min(limits) if limits else None
+
+
+def truncate_to_tokens(text: str, target_tokens: int) -> str:
+    """Corta o texto no tamanho aproximado de `target_tokens`, marcando o corte."""
+    if estimate_tokens(text) <= target_tokens:
+        return text
+    keep = max((target_tokens - 1) * 4 - len(TRUNCATION_MARKER), 0)
+    return text[:keep] + TRUNCATION_MARKER
+
+
+def _water_level(sizes: List[int], available: int) -> int:
+    """Maior tamanho L tal que sum(min(tamanho, L)) <= available."""
+    remaining = max(available, 0)
+    ordered = sorted(sizes)
+    for i, size in enumerate(ordered):
+        if size * (len(ordered) - i) > remaining:
+            return remaining // (len(ordered) - i)
+        remaining -= size
+    return ordered[-1] if ordered else 0
+
+
+def fit_parts(parts: List[PromptPart], budget: Optional[int], model: Optional[str] = None) -> BudgetReport:
+    """
+    Reduz as partes do prompt até o total estimado caber no orçamento e altera `parts`
+    no lugar. As maiores partes redutíveis são encolhidas primeiro, até um mesmo nível
+    (as menores ficam intactas sempre que possível).
+
+    Args:
+        parts: Partes do prompt, na ordem em que são montadas
+        budget: Limite de tokens (None = sem limite, apenas mede)
+        model: Modelo ao qual o orçamento se refere (só para o log)
+
+    Returns:
+        BudgetReport com os tokens de cada parte antes e depois
+    """
+    report = BudgetReport(budget=budget, model=model)
+    stuck = set()
+    for _ in range(MAX_SHRINK_ROUNDS if budget else 0):
+        if sum(p.tokens for p in parts) <= budget:
+            break
+        shrinkable = [p for p in parts if p.shrink and p.name not in stuck]
+        if not shrinkable:
+            report.over_budget = True
+            break
+        fixed = sum(p.tokens for p in parts if p not in shrinkable)
+        level = _water_level([p.tokens for p in shrinkable], budget - fixed)
+        for part in shrinkable:
+            if part.tokens > level:
+                before = part.tokens
+                part.text = part.shrink(part.text, level)
+                if part.tokens >= before:
+                    stuck.add(part.name)
+    else:
+        report.over_budget = bool(budget) and sum(p.tokens for p in parts) > budget
+
+    report.parts = [(p.name, p.original_tokens, p.tokens) for p in parts]
+    return report